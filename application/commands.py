@@ -1,13 +1,19 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Optional, List
+from collections import OrderedDict, deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, List, Sequence
 from datetime import date
-from domain.entities import Task, Priority, TaskStatus
-from domain.interfaces import ITaskRepository
+from domain.entities import Task, Priority, TaskStatus, CommandJournalEntry
+from domain.interfaces import ITaskRepository, ICommandJournal, IUserVersionTracker
+from domain.specifications import TaskOperation, BulkWriteResult
 
 
 class ICommand(ABC):
     """Interface base para todos os comandos - Command Pattern"""
     
+    __slots__ = ()
+    
     @abstractmethod
     def execute(self) -> Any:
         """Executa o comando"""
@@ -17,11 +23,57 @@ class ICommand(ABC):
     def undo(self) -> Any:
         """Desfaz o comando (opcional)"""
         pass
+    
+    def redo(self) -> Any:
+        """Refaz o comando desfeito; por padrão o executa novamente"""
+        return self.execute()
+    
+    @abstractmethod
+    def to_record(self) -> Dict[str, Any]:
+        """Serializa o estado do comando em um registro compacto para o journal"""
+        pass
+    
+    @classmethod
+    @abstractmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'ICommand':
+        """Reconstrói o comando a partir do registro gravado por to_record"""
+        pass
+
+
+# Conversão dos campos das tarefas para tipos serializáveis em JSON
+_FIELD_DECODERS = {
+    'priority': lambda value: Priority[value],
+    'status': lambda value: TaskStatus[value],
+    'due_date': date.fromisoformat
+}
+
+
+def _encode_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte enums e datas em valores primitivos"""
+    encoded = {}
+    for name, value in fields.items():
+        if isinstance(value, Enum):
+            value = value.name
+        elif isinstance(value, date):
+            value = value.isoformat()
+        encoded[name] = value
+    return encoded
+
+
+def _decode_fields(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte valores primitivos de volta em enums e datas"""
+    return {
+        name: _FIELD_DECODERS[name](value) if value is not None and name in _FIELD_DECODERS else value
+        for name, value in record.items()
+    }
 
 
 class CreateTaskCommand(ICommand):
     """Comando para criar uma nova tarefa"""
     
+    __slots__ = ('_task_repository', '_title', '_description', '_priority',
+                 '_due_date', '_user_id', '_created_task_id')
+    
     def __init__(self, task_repository: ITaskRepository, title: str, 
                  description: Optional[str], priority: Priority, 
                  due_date: Optional[date], user_id: int):
@@ -31,7 +83,7 @@ class CreateTaskCommand(ICommand):
         self._priority = priority
         self._due_date = due_date
         self._user_id = user_id
-        self._created_task: Optional[Task] = None
+        self._created_task_id: Optional[int] = None
     
     def execute(self) -> Task:
         """Executa a criação da tarefa"""
@@ -42,147 +94,569 @@ class CreateTaskCommand(ICommand):
             due_date=self._due_date,
             user_id=self._user_id
         )
-        self._created_task = self._task_repository.save(task)
-        return self._created_task
+        created_task = self._task_repository.save(task)
+        self._created_task_id = created_task.id
+        return created_task
     
     def undo(self) -> bool:
         """Desfaz a criação removendo a tarefa"""
-        if self._created_task and self._created_task.id:
-            return self._task_repository.delete(self._created_task.id)
+        if self._created_task_id:
+            return self._task_repository.delete(self._created_task_id)
         return False
+    
+    def redo(self) -> bool:
+        """Refaz a criação restaurando a mesma tarefa"""
+        if self._created_task_id:
+            return bool(self._task_repository.restore_if_owned(self._created_task_id, self._user_id))
+        return False
+    
+    def to_record(self) -> Dict[str, Any]:
+        return _encode_fields({
+            'title': self._title,
+            'description': self._description,
+            'priority': self._priority,
+            'due_date': self._due_date,
+            'user_id': self._user_id,
+            'task_id': self._created_task_id
+        })
+    
+    @classmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'CreateTaskCommand':
+        fields = _decode_fields(record)
+        command = cls(task_repository, fields['title'], fields['description'],
+                      fields['priority'], fields['due_date'], fields['user_id'])
+        command._created_task_id = fields['task_id']
+        return command
 
 
 class UpdateTaskCommand(ICommand):
-    """Comando para atualizar uma tarefa"""
+    """Comando para atualizar uma tarefa
     
-    def __init__(self, task_repository: ITaskRepository, task_id: int,
+    Guarda apenas um delta antes/depois dos campos que de fato mudaram, o
+    suficiente para undo e redo sem recarregar a tarefa do banco.
+    """
+    
+    __slots__ = ('_task_repository', '_task_id', '_user_id', '_changes', '_fields', '_before', '_after')
+    
+    def __init__(self, task_repository: ITaskRepository, task_id: int, user_id: int,
                  title: Optional[str] = None, description: Optional[str] = None,
                  priority: Optional[Priority] = None, due_date: Optional[date] = None):
         self._task_repository = task_repository
         self._task_id = task_id
-        self._title = title
-        self._description = description
-        self._priority = priority
-        self._due_date = due_date
-        self._original_task: Optional[Task] = None
+        self._user_id = user_id
+        requested = {'title': title, 'description': description, 'priority': priority, 'due_date': due_date}
+        self._changes: Optional[Dict[str, Any]] = {
+            name: value for name, value in requested.items() if value is not None
+        }
+        self._fields: Optional[tuple] = None
+        self._before: Optional[tuple] = None
+        self._after: Optional[tuple] = None
     
     def execute(self) -> Optional[Task]:
         """Executa a atualização da tarefa"""
         task = self._task_repository.find_by_id(self._task_id)
-        if not task:
+        if not task or task.user_id != self._user_id:
             return None
         
-        # Salva o estado original para undo
-        self._original_task = Task(
-            title=task.title,
-            description=task.description,
-            priority=task.priority,
-            due_date=task.due_date,
-            user_id=task.user_id,
-            id=task.id
-        )
+        # Delta apenas dos campos cujo valor muda; os valores pedidos deixam de ser necessários
+        changed = [name for name, value in self._changes.items() if getattr(task, name) != value]
+        self._fields = tuple(changed)
+        self._before = tuple(getattr(task, name) for name in changed)
+        self._after = tuple(self._changes[name] for name in changed)
+        task.update(**self._changes)
+        self._changes = None
         
-        # Atualiza a tarefa
-        task.update(self._title, self._description, self._priority, self._due_date)
-        return self._task_repository.update(task)
+        # Atualiza a tarefa com um UPDATE condicional à posse
+        if not self._task_repository.update_fields_if_owned(
+                self._task_id, self._user_id, self._delta(self._after)):
+            return None
+        return task
     
-    def undo(self) -> Optional[Task]:
+    def undo(self) -> bool:
         """Desfaz a atualização restaurando os valores originais"""
-        if self._original_task:
-            return self._task_repository.update(self._original_task)
-        return None
+        if self._before is not None:
+            return bool(self._task_repository.update_fields_if_owned(
+                self._task_id, self._user_id, self._delta(self._before)
+            ))
+        return False
+    
+    def redo(self) -> bool:
+        """Reaplica o delta sem recarregar a tarefa"""
+        if self._after is not None:
+            return bool(self._task_repository.update_fields_if_owned(
+                self._task_id, self._user_id, self._delta(self._after)
+            ))
+        return False
+    
+    def _delta(self, values: tuple) -> Dict[str, Any]:
+        """Associa os valores do delta aos nomes dos campos alterados"""
+        return dict(zip(self._fields, values))
+    
+    def to_record(self) -> Dict[str, Any]:
+        record = {'task_id': self._task_id, 'user_id': self._user_id, 'before': None, 'after': None}
+        if self._fields is not None:
+            record['before'] = _encode_fields(self._delta(self._before))
+            record['after'] = _encode_fields(self._delta(self._after))
+        return record
+    
+    @classmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'UpdateTaskCommand':
+        command = cls(task_repository, record['task_id'], record['user_id'])
+        if record.get('after') is not None:
+            before = _decode_fields(record['before'])
+            after = _decode_fields(record['after'])
+            command._changes = None
+            command._fields = tuple(after)
+            command._before = tuple(before[name] for name in command._fields)
+            command._after = tuple(after.values())
+        return command
 
 
 class CompleteTaskCommand(ICommand):
     """Comando para marcar uma tarefa como concluída"""
     
-    def __init__(self, task_repository: ITaskRepository, task_id: int):
+    __slots__ = ('_task_repository', '_task_id', '_user_id', '_original_status')
+    
+    def __init__(self, task_repository: ITaskRepository, task_id: int, user_id: int):
         self._task_repository = task_repository
         self._task_id = task_id
+        self._user_id = user_id
         self._original_status: Optional[TaskStatus] = None
     
-    def execute(self) -> Optional[Task]:
-        """Executa a marcação da tarefa como concluída"""
-        task = self._task_repository.find_by_id(self._task_id)
-        if not task:
-            return None
+    def execute(self) -> bool:
+        """Executa a marcação da tarefa como concluída
         
-        self._original_status = task.status
-        task.mark_as_completed()
-        return self._task_repository.update(task)
+        Um único UPDATE condicional conclui a tarefa e devolve o status
+        anterior, guardado para o undo, sem leitura prévia.
+        """
+        self._original_status = self._task_repository.complete_if_owned(self._task_id, self._user_id)
+        return self._original_status is not None
     
-    def undo(self) -> Optional[Task]:
+    def undo(self) -> bool:
         """Desfaz a marcação, restaurando o status original"""
         if self._original_status:
-            task = self._task_repository.find_by_id(self._task_id)
-            if task:
-                task.status = self._original_status
-                return self._task_repository.update(task)
-        return None
+            return bool(self._task_repository.update_status_if(
+                self._task_id, self._user_id, TaskStatus.COMPLETED, self._original_status
+            ))
+        return False
+    
+    def redo(self) -> bool:
+        """Conclui novamente a partir do status original já conhecido"""
+        if self._original_status:
+            return bool(self._task_repository.update_status_if(
+                self._task_id, self._user_id, self._original_status, TaskStatus.COMPLETED
+            ))
+        return False
+    
+    def to_record(self) -> Dict[str, Any]:
+        return _encode_fields({
+            'task_id': self._task_id,
+            'user_id': self._user_id,
+            'status': self._original_status
+        })
+    
+    @classmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'CompleteTaskCommand':
+        fields = _decode_fields(record)
+        command = cls(task_repository, fields['task_id'], fields['user_id'])
+        command._original_status = fields['status']
+        return command
 
 
 class DeleteTaskCommand(ICommand):
-    """Comando para remover uma tarefa"""
+    """Comando para remover uma tarefa
+    
+    A remoção é lógica (lápide), então undo e redo apenas limpam ou gravam
+    a lápide; o comando não precisa guardar os campos da tarefa.
+    """
     
-    def __init__(self, task_repository: ITaskRepository, task_id: int):
+    __slots__ = ('_task_repository', '_task_id', '_user_id')
+    
+    def __init__(self, task_repository: ITaskRepository, task_id: int, user_id: int):
         self._task_repository = task_repository
         self._task_id = task_id
-        self._deleted_task: Optional[Task] = None
+        self._user_id = user_id
     
     def execute(self) -> bool:
         """Executa a remoção da tarefa"""
-        # Salva a tarefa para possível undo
-        self._deleted_task = self._task_repository.find_by_id(self._task_id)
-        return self._task_repository.delete(self._task_id)
+        return self._task_repository.delete_if_owned(self._task_id, self._user_id) > 0
     
-    def undo(self) -> Optional[Task]:
+    def undo(self) -> bool:
         """Desfaz a remoção restaurando a tarefa"""
-        if self._deleted_task:
-            return self._task_repository.save(self._deleted_task)
-        return None
+        return self._task_repository.restore_if_owned(self._task_id, self._user_id) > 0
+    
+    def to_record(self) -> Dict[str, Any]:
+        return {'task_id': self._task_id, 'user_id': self._user_id}
+    
+    @classmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'DeleteTaskCommand':
+        return cls(task_repository, record['task_id'], record['user_id'])
 
 
-class CommandInvoker:
-    """Invoker do padrão Command - gerencia execução e histórico de comandos"""
+class BulkTaskCommand(ICommand):
+    """Comando composto que aplica um lote de operações como uma única ação
     
-    def __init__(self):
-        self._history: List[ICommand] = []
-        self._current_position = -1
+    Cada tipo de operação vira uma única escrita em lote no repositório, e o
+    lote inteiro entra no histórico como um comando só: undo desfaz tudo, na
+    ordem inversa. Os valores anteriores vêm das tarefas já lidas na
+    verificação de posse; tarefas já concluídas são ignoradas ao concluir.
+    """
     
-    def execute_command(self, command: ICommand) -> Any:
-        """Executa um comando e o adiciona ao histórico"""
-        result = command.execute()
+    __slots__ = ('_task_repository', '_user_id', '_new_tasks', '_created_ids',
+                 '_updates', '_completed', '_deleted')
+    
+    def __init__(self, task_repository: ITaskRepository, user_id: int,
+                 operations: Sequence[TaskOperation] = (), tasks_by_id: Optional[Dict[int, Task]] = None):
+        self._task_repository = task_repository
+        self._user_id = user_id
+        self._new_tasks: List[Task] = []
+        self._created_ids: List[int] = []
+        self._updates: Dict[int, tuple] = {}
+        self._completed: Dict[int, TaskStatus] = {}
+        self._deleted: List[int] = []
         
-        # Remove comandos após a posição atual (para redo limpo)
-        self._history = self._history[:self._current_position + 1]
+        for operation in operations:
+            if operation.kind == 'create':
+                self._new_tasks.append(Task(user_id=user_id, **operation.fields))
+                continue
+            
+            task = tasks_by_id[operation.task_id]
+            if operation.kind == 'update':
+                # Delta antes/depois apenas dos campos que mudam, como em UpdateTaskCommand
+                changed = {name: value for name, value in operation.fields.items()
+                           if value is not None and getattr(task, name) != value}
+                if changed:
+                    before = {name: getattr(task, name) for name in changed}
+                    self._updates[task.id] = (before, changed)
+            elif operation.kind == 'complete':
+                if task.status != TaskStatus.COMPLETED:
+                    self._completed[task.id] = task.status
+            else:
+                self._deleted.append(task.id)
+    
+    def execute(self) -> Optional[BulkWriteResult]:
+        """Executa as escritas do lote: criações, edições, conclusões e remoções"""
+        created = self._task_repository.save_many(self._new_tasks) if self._new_tasks else []
+        self._created_ids = [task.id for task in created]
+        self._new_tasks = []
         
-        # Adiciona o novo comando
-        self._history.append(command)
-        self._current_position += 1
+        result = BulkWriteResult(
+            created=created,
+            updated=self._update_fields(forward=True),
+            completed=self._change_status(forward=True),
+            deleted=self._task_repository.delete_many_if_owned(self._user_id, self._deleted) if self._deleted else 0
+        )
         
+        if not (result.created or result.updated or result.completed or result.deleted):
+            return None
         return result
     
-    def undo(self) -> Any:
-        """Desfaz o último comando executado"""
-        if self._current_position >= 0:
-            command = self._history[self._current_position]
-            result = command.undo()
-            self._current_position -= 1
+    def undo(self) -> bool:
+        """Desfaz o lote inteiro na ordem inversa da execução"""
+        if self._deleted:
+            self._task_repository.restore_many_if_owned(self._user_id, self._deleted)
+        self._change_status(forward=False)
+        self._update_fields(forward=False)
+        if self._created_ids:
+            self._task_repository.delete_many_if_owned(self._user_id, self._created_ids)
+        return True
+    
+    def redo(self) -> bool:
+        """Reaplica o lote; as tarefas criadas são restauradas com os mesmos IDs"""
+        if self._created_ids:
+            self._task_repository.restore_many_if_owned(self._user_id, self._created_ids)
+        self._update_fields(forward=True)
+        self._change_status(forward=True)
+        if self._deleted:
+            self._task_repository.delete_many_if_owned(self._user_id, self._deleted)
+        return True
+    
+    def _update_fields(self, forward: bool) -> int:
+        """Grava os valores novos das tarefas editadas, ou restaura os anteriores"""
+        if not self._updates:
+            return 0
+        return self._task_repository.update_fields_many_if_owned(self._user_id, {
+            task_id: after if forward else before for task_id, (before, after) in self._updates.items()
+        })
+    
+    def _change_status(self, forward: bool) -> int:
+        """Conclui as tarefas a partir do status original, ou o restaura"""
+        if not self._completed:
+            return 0
+        return self._task_repository.update_status_many_if(self._user_id, [
+            (task_id, status, TaskStatus.COMPLETED) if forward else (task_id, TaskStatus.COMPLETED, status)
+            for task_id, status in self._completed.items()
+        ])
+    
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            'user_id': self._user_id,
+            'created': self._created_ids,
+            'updates': [
+                {'task_id': task_id, 'before': _encode_fields(before), 'after': _encode_fields(after)}
+                for task_id, (before, after) in self._updates.items()
+            ],
+            'completed': [[task_id, status.name] for task_id, status in self._completed.items()],
+            'deleted': self._deleted
+        }
+    
+    @classmethod
+    def from_record(cls, task_repository: ITaskRepository, record: Dict[str, Any]) -> 'BulkTaskCommand':
+        command = cls(task_repository, record['user_id'])
+        command._created_ids = list(record['created'])
+        command._updates = {
+            update['task_id']: (_decode_fields(update['before']), _decode_fields(update['after']))
+            for update in record['updates']
+        }
+        command._completed = {task_id: TaskStatus[status] for task_id, status in record['completed']}
+        command._deleted = list(record['deleted'])
+        return command
+
+
+class ICommandInvoker(ABC):
+    """Interface dos invokers que executam comandos e mantêm o histórico de undo/redo"""
+    
+    @abstractmethod
+    def execute_command(self, command: ICommand, user_id: int) -> Any:
+        """Executa um comando e o adiciona ao histórico do usuário"""
+        pass
+    
+    @abstractmethod
+    def undo(self, user_id: int) -> bool:
+        """Desfaz o último comando executado pelo usuário"""
+        pass
+    
+    @abstractmethod
+    def redo(self, user_id: int) -> bool:
+        """Refaz o último comando desfeito pelo usuário"""
+        pass
+    
+    @abstractmethod
+    def can_undo(self, user_id: int) -> bool:
+        """Verifica se é possível desfazer"""
+        pass
+    
+    @abstractmethod
+    def can_redo(self, user_id: int) -> bool:
+        """Verifica se é possível refazer"""
+        pass
+    
+    def _bump_version(self, user_id: int) -> None:
+        """Avança a versão dos dados do usuário, invalidando caches e ETags que dependem dela"""
+        for version_tracker in self._version_trackers:
+            version_tracker.bump_version(user_id)
+
+
+class _UserCommandHistory:
+    """Histórico de comandos de um usuário: ring buffer de undo e pilha de redo"""
+    
+    __slots__ = ('undo_stack', 'redo_stack', 'lock', 'evicted')
+    
+    def __init__(self, max_depth: int):
+        # deque com maxlen descarta o comando mais antigo em O(1) quando cheio
+        self.undo_stack: Deque[ICommand] = deque(maxlen=max_depth)
+        self.redo_stack: Deque[ICommand] = deque(maxlen=max_depth)
+        self.lock = threading.RLock()
+        self.evicted = False
+    
+    def size(self) -> int:
+        return len(self.undo_stack) + len(self.redo_stack)
+
+
+class CommandInvoker(ICommandInvoker):
+    """Invoker do padrão Command - gerencia execução e histórico de comandos
+    
+    O histórico é separado por usuário e limitado a max_depth comandos. Ao
+    ultrapassar max_total_commands no total, os históricos dos usuários
+    inativos há mais tempo são descartados. Requisições simultâneas do mesmo
+    usuário são serializadas pelo lock do seu histórico.
+    """
+    
+    def __init__(self, max_depth: int = 50, max_total_commands: int = 10000,
+                 version_trackers: Sequence[IUserVersionTracker] = ()):
+        self._version_trackers = list(version_trackers)
+        self._max_depth = max_depth
+        self._max_total_commands = max_total_commands
+        self._histories: "OrderedDict[int, _UserCommandHistory]" = OrderedDict()
+        self._total_commands = 0
+        self._lock = threading.Lock()
+    
+    def execute_command(self, command: ICommand, user_id: int) -> Any:
+        """Executa um comando e o adiciona ao histórico do usuário"""
+        history = self._history_for(user_id)
+        with history.lock:
+            result = command.execute()
+            
+            # Comandos que não alteraram nada não entram no histórico
+            if result is None or result is False:
+                return result
+            
+            self._bump_version(user_id)
+            
+            # Um novo comando invalida o redo; o append descarta o mais antigo se cheio
+            size_before = history.size()
+            history.redo_stack.clear()
+            history.undo_stack.append(command)
+            self._adjust_total(history, user_id, history.size() - size_before)
+        
+        return result
+    
+    def undo(self, user_id: int) -> bool:
+        """Desfaz o último comando executado pelo usuário"""
+        history = self._history_for(user_id)
+        with history.lock:
+            if not history.undo_stack:
+                return False
+            
+            # O comando só troca de pilha se foi aplicado; em falha ou exceção, volta para onde estava
+            command = history.undo_stack.pop()
+            try:
+                applied = command.undo()
+            except Exception:
+                history.undo_stack.append(command)
+                raise
+            if not applied:
+                history.undo_stack.append(command)
+                return False
+            
+            history.redo_stack.append(command)
+            self._bump_version(user_id)
+        return True
+    
+    def redo(self, user_id: int) -> bool:
+        """Refaz o último comando desfeito pelo usuário"""
+        history = self._history_for(user_id)
+        with history.lock:
+            if not history.redo_stack:
+                return False
+            
+            # O comando só troca de pilha se foi aplicado; em falha ou exceção, volta para onde estava
+            command = history.redo_stack.pop()
+            try:
+                applied = command.redo()
+            except Exception:
+                history.redo_stack.append(command)
+                raise
+            if not applied:
+                history.redo_stack.append(command)
+                return False
+            
+            history.undo_stack.append(command)
+            self._bump_version(user_id)
+        return True
+    
+    def can_undo(self, user_id: int) -> bool:
+        """Verifica se é possível desfazer"""
+        history = self._histories.get(user_id)
+        return bool(history and history.undo_stack)
+    
+    def can_redo(self, user_id: int) -> bool:
+        """Verifica se é possível refazer"""
+        history = self._histories.get(user_id)
+        return bool(history and history.redo_stack)
+    
+    def _history_for(self, user_id: int) -> _UserCommandHistory:
+        """Obtém (ou cria) o histórico do usuário, marcando-o como o mais recente"""
+        with self._lock:
+            history = self._histories.get(user_id)
+            if history is None:
+                history = _UserCommandHistory(self._max_depth)
+                self._histories[user_id] = history
+            else:
+                self._histories.move_to_end(user_id)
+            return history
+    
+    def _adjust_total(self, history: _UserCommandHistory, user_id: int, delta: int) -> None:
+        """Atualiza o total de comandos e descarta históricos inativos acima do limite"""
+        with self._lock:
+            if history.evicted:
+                return
+            
+            self._total_commands += delta
+            while self._total_commands > self._max_total_commands:
+                idle_user_id = next(iter(self._histories))
+                if idle_user_id == user_id:
+                    break
+                
+                idle_history = self._histories.pop(idle_user_id)
+                idle_history.evicted = True
+                self._total_commands -= idle_history.size()
+
+
+class JournalCommandInvoker(ICommandInvoker):
+    """Invoker com histórico persistido em um journal no banco
+    
+    Cada comando vira um registro com número de sequência por usuário, gravado
+    na mesma transação da escrita. Undo e redo marcam o registro no lugar em
+    vez de acrescentar outro, e um comando novo descarta os desfeitos. Funcionam
+    em qualquer processo e sobrevivem a reinícios, pois o comando é reconstruído
+    a partir do registro.
+    """
+    
+    COMMAND_TYPES = {
+        command_type.__name__: command_type
+        for command_type in (CreateTaskCommand, UpdateTaskCommand, CompleteTaskCommand, DeleteTaskCommand,
+                             BulkTaskCommand)
+    }
+    
+    def __init__(self, journal: ICommandJournal, task_repository: ITaskRepository,
+                 version_trackers: Sequence[IUserVersionTracker] = ()):
+        self._journal = journal
+        self._task_repository = task_repository
+        self._version_trackers = list(version_trackers)
+    
+    def execute_command(self, command: ICommand, user_id: int) -> Any:
+        """Executa um comando e o registra no journal do usuário"""
+        result = command.execute()
+        
+        # Comandos que não alteraram nada não entram no histórico
+        if result is None or result is False:
             return result
-        return None
+        
+        self._bump_version(user_id)
+        self._journal.append(user_id, type(command).__name__, command.to_record())
+        return result
     
-    def redo(self) -> Any:
-        """Refaz o próximo comando no histórico"""
-        if self._current_position < len(self._history) - 1:
-            self._current_position += 1
-            command = self._history[self._current_position]
-            return command.execute()
-        return None
-    
-    def can_undo(self) -> bool:
+    def undo(self, user_id: int) -> bool:
+        """Desfaz o último comando executado pelo usuário"""
+        entry = self._journal.last_done(user_id)
+        if entry is None:
+            return False
+        
+        # O registro é marcado antes de aplicado: se outra requisição já o desfez, nada muda
+        if not self._journal.mark(entry, undone=True):
+            return False
+        
+        if not self._restore(entry).undo():
+            return False
+        self._bump_version(user_id)
+        return True
+    
+    def redo(self, user_id: int) -> bool:
+        """Refaz o último comando desfeito pelo usuário"""
+        entry = self._journal.first_undone(user_id)
+        if entry is None:
+            return False
+        
+        if not self._journal.mark(entry, undone=False):
+            return False
+        
+        if not self._restore(entry).redo():
+            return False
+        self._bump_version(user_id)
+        return True
+    
+    def can_undo(self, user_id: int) -> bool:
         """Verifica se é possível desfazer"""
-        return self._current_position >= 0
+        return self._journal.last_done(user_id) is not None
     
-    def can_redo(self) -> bool:
+    def can_redo(self, user_id: int) -> bool:
         """Verifica se é possível refazer"""
-        return self._current_position < len(self._history) - 1 
\ No newline at end of file
+        return self._journal.first_undone(user_id) is not None
+    
+    def _restore(self, entry: CommandJournalEntry) -> ICommand:
+        """Reconstrói o comando a partir do registro do journal"""
+        command_type = self.COMMAND_TYPES.get(entry.command_type)
+        if command_type is None:
+            raise ValueError(f"Tipo de comando desconhecido no journal: {entry.command_type}")
+        return command_type.from_record(self._task_repository, entry.payload)
\ No newline at end of file
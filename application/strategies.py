@@ -1,119 +1,312 @@
-from typing import List
-from datetime import date
-from domain.entities import Task, Priority, TaskStatus
+import re
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+from datetime import date, timedelta
+from domain.entities import Task, Priority, TaskStatus, PRIORITY_CODES, STATUS_CODES
 from domain.interfaces import ITaskFilterStrategy, ITaskSortStrategy
+from domain.specifications import TaskCriterion, TaskSortKey
 
 
 # ============= FILTROS (Strategy Pattern) =============
 
-class AllTasksFilterStrategy(ITaskFilterStrategy):
+class PredicateFilterStrategy(ITaskFilterStrategy):
+    """Base dos filtros definidos por um predicado sobre a tarefa"""
+    
+    def filter(self, tasks: List[Task]) -> List[Task]:
+        return list(self.iter_matches(tasks))
+    
+    @abstractmethod
+    def predicate(self) -> Callable[[Task], bool]:
+        pass
+
+
+class AllTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que retorna todas as tarefas sem filtro"""
     
     def filter(self, tasks: List[Task]) -> List[Task]:
         return tasks
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        return lambda task: True
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return []
 
 
-class CompletedTasksFilterStrategy(ITaskFilterStrategy):
+class CompletedTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra apenas tarefas concluídas"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.status == TaskStatus.COMPLETED]
+    def predicate(self) -> Callable[[Task], bool]:
+        return lambda task: task.status == TaskStatus.COMPLETED
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('status', 'eq', TaskStatus.COMPLETED)]
 
 
-class PendingTasksFilterStrategy(ITaskFilterStrategy):
+class PendingTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra apenas tarefas pendentes"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.status == TaskStatus.PENDING]
+    def predicate(self) -> Callable[[Task], bool]:
+        return lambda task: task.status == TaskStatus.PENDING
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('status', 'eq', TaskStatus.PENDING)]
 
 
-class InProgressTasksFilterStrategy(ITaskFilterStrategy):
+class InProgressTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra apenas tarefas em progresso"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.status == TaskStatus.IN_PROGRESS]
+    def predicate(self) -> Callable[[Task], bool]:
+        return lambda task: task.status == TaskStatus.IN_PROGRESS
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('status', 'eq', TaskStatus.IN_PROGRESS)]
 
 
-class HighPriorityFilterStrategy(ITaskFilterStrategy):
+class HighPriorityFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra tarefas de alta prioridade"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.priority in [Priority.HIGH, Priority.URGENT]]
+    def predicate(self) -> Callable[[Task], bool]:
+        return lambda task: task.priority in (Priority.HIGH, Priority.URGENT)
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('priority', 'in', (Priority.HIGH, Priority.URGENT))]
 
 
-class OverdueTasksFilterStrategy(ITaskFilterStrategy):
+class OverdueTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra tarefas atrasadas"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.is_overdue()]
+    def predicate(self) -> Callable[[Task], bool]:
+        # Mesma regra de Task.is_overdue, com a data de hoje lida uma única vez
+        today = date.today()
+        return lambda task: (task.due_date is not None and task.due_date < today
+                             and task.status != TaskStatus.COMPLETED)
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        # Mesma regra de Task.is_overdue: vencida antes de hoje e não concluída
+        return [
+            TaskCriterion('due_date', 'lt', date.today()),
+            TaskCriterion('status', 'ne', TaskStatus.COMPLETED)
+        ]
 
 
-class TodayTasksFilterStrategy(ITaskFilterStrategy):
+class TodayTasksFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra tarefas que vencem hoje"""
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
+    def predicate(self) -> Callable[[Task], bool]:
+        today = date.today()
+        return lambda task: task.due_date == today
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('due_date', 'eq', date.today())]
+
+
+class WeekTasksFilterStrategy(PredicateFilterStrategy):
+    """Estratégia que filtra tarefas que vencem nos próximos 7 dias, incluindo hoje"""
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        today = date.today()
+        week_end = today + timedelta(days=7)
+        return lambda task: task.due_date is not None and today <= task.due_date < week_end
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
         today = date.today()
-        return [task for task in tasks if task.due_date == today]
+        return [
+            TaskCriterion('due_date', 'ge', today),
+            TaskCriterion('due_date', 'lt', today + timedelta(days=7))
+        ]
 
 
-class PriorityFilterStrategy(ITaskFilterStrategy):
+class PriorityFilterStrategy(PredicateFilterStrategy):
     """Estratégia que filtra tarefas por prioridade específica"""
     
     def __init__(self, priority: Priority):
         self._priority = priority
     
-    def filter(self, tasks: List[Task]) -> List[Task]:
-        return [task for task in tasks if task.priority == self._priority]
+    def predicate(self) -> Callable[[Task], bool]:
+        priority = self._priority
+        return lambda task: task.priority == priority
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        return [TaskCriterion('priority', 'eq', self._priority)]
+
+
+# ============= FILTROS COMPOSTOS (Composite Pattern) =============
+
+class AndFilterStrategy(PredicateFilterStrategy):
+    """Filtro que exige todos os filtros componentes"""
+    
+    def __init__(self, strategies: List[ITaskFilterStrategy]):
+        self._strategies = strategies
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        predicates = [strategy.predicate() for strategy in self._strategies]
+        return lambda task: all(predicate(task) for predicate in predicates)
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        criteria = []
+        for strategy in self._strategies:
+            strategy_criteria = strategy.to_criteria()
+            if strategy_criteria is None:
+                return None
+            criteria.extend(strategy_criteria)
+        return criteria
+
+
+class OrFilterStrategy(PredicateFilterStrategy):
+    """Filtro que exige ao menos um dos filtros componentes"""
+    
+    def __init__(self, strategies: List[ITaskFilterStrategy]):
+        self._strategies = strategies
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        predicates = [strategy.predicate() for strategy in self._strategies]
+        return lambda task: any(predicate(task) for predicate in predicates)
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        groups = []
+        for strategy in self._strategies:
+            strategy_criteria = strategy.to_criteria()
+            if strategy_criteria is None:
+                return None
+            if not strategy_criteria:
+                # Um componente sem critérios aceita todas as tarefas
+                return []
+            groups.append(tuple(strategy_criteria))
+        return [TaskCriterion(None, 'or', tuple(groups))]
+
+
+class NotFilterStrategy(PredicateFilterStrategy):
+    """Filtro que aceita as tarefas recusadas pelo filtro componente"""
+    
+    def __init__(self, strategy: ITaskFilterStrategy):
+        self._strategy = strategy
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        predicate = self._strategy.predicate()
+        return lambda task: not predicate(task)
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        strategy_criteria = self._strategy.to_criteria()
+        if strategy_criteria is None:
+            return None
+        if not strategy_criteria:
+            # Negar "todas" não aceita nenhuma tarefa
+            return [TaskCriterion(None, 'or', ())]
+        return [TaskCriterion(None, 'not', tuple(strategy_criteria))]
 
 
 # ============= ORDENAÇÃO (Strategy Pattern) =============
 
+class _Descending:
+    """Inverte a comparação de um valor, para chaves decrescentes em ordenações crescentes"""
+    
+    __slots__ = ('value',)
+    
+    def __init__(self, value: Any):
+        self.value = value
+    
+    def __lt__(self, other: '_Descending') -> bool:
+        return other.value < self.value
+    
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.value == other.value
+
+
 class PrioritySortStrategy(ITaskSortStrategy):
     """Estratégia que ordena tarefas por prioridade (urgente → baixa)"""
     
     def sort(self, tasks: List[Task]) -> List[Task]:
-        priority_order = {
-            Priority.URGENT: 0,
-            Priority.HIGH: 1,
-            Priority.MEDIUM: 2,
-            Priority.LOW: 3
-        }
-        return sorted(tasks, key=lambda task: priority_order[task.priority])
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
+        return PRIORITY_CODES[task.priority]
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        return [TaskSortKey('priority')]
 
 
 class DueDateSortStrategy(ITaskSortStrategy):
     """Estratégia que ordena tarefas por data de vencimento"""
     
     def sort(self, tasks: List[Task]) -> List[Task]:
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
         # Tarefas sem data de vencimento vão para o final
-        return sorted(tasks, key=lambda task: task.due_date or date.max)
+        return task.due_date or date.max
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        return [TaskSortKey('due_date')]
 
 
 class CreationDateSortStrategy(ITaskSortStrategy):
     """Estratégia que ordena tarefas por data de criação (mais recentes primeiro)"""
     
     def sort(self, tasks: List[Task]) -> List[Task]:
-        return sorted(tasks, key=lambda task: task.created_at, reverse=True)
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
+        # Crescente sobre a chave invertida: mesma ordem e mesmos empates de reverse=True
+        return _Descending(task.created_at)
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        return [TaskSortKey('created_at', descending=True)]
 
 
 class AlphabeticalSortStrategy(ITaskSortStrategy):
     """Estratégia que ordena tarefas alfabeticamente por título"""
     
     def sort(self, tasks: List[Task]) -> List[Task]:
-        return sorted(tasks, key=lambda task: task.title.lower())
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
+        return task.title.lower()
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        return [TaskSortKey('title')]
 
 
 class StatusSortStrategy(ITaskSortStrategy):
     """Estratégia que ordena tarefas por status (pendente → em progresso → concluída)"""
     
     def sort(self, tasks: List[Task]) -> List[Task]:
-        status_order = {
-            TaskStatus.PENDING: 0,
-            TaskStatus.IN_PROGRESS: 1,
-            TaskStatus.COMPLETED: 2,
-            TaskStatus.CANCELLED: 3
-        }
-        return sorted(tasks, key=lambda task: status_order[task.status])
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
+        return STATUS_CODES[task.status]
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        return [TaskSortKey('status')]
+
+
+class CompositeSortStrategy(ITaskSortStrategy):
+    """Estratégia que ordena por várias estratégias em sequência, em uma única passada
+    
+    A chave é a tupla das chaves de cada estratégia, então a segunda só
+    desempata a primeira, e assim por diante.
+    """
+    
+    def __init__(self, strategies: List[ITaskSortStrategy]):
+        self._strategies = strategies
+        self._key_functions = [strategy.sort_key for strategy in strategies]
+    
+    def sort(self, tasks: List[Task]) -> List[Task]:
+        return sorted(tasks, key=self.sort_key)
+    
+    def sort_key(self, task: Task) -> Any:
+        return tuple([sort_key(task) for sort_key in self._key_functions])
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        sort_keys = []
+        for strategy in self._strategies:
+            strategy_keys = strategy.to_sort_keys()
+            if strategy_keys is None:
+                return None
+            sort_keys.extend(strategy_keys)
+        return sort_keys
 
 
 # ============= CONTEXT PARA ESTRATÉGIAS =============
@@ -128,9 +321,14 @@ class TaskFilterContext:
         """Altera a estratégia de filtro"""
         self._strategy = strategy
     
-    def apply_filter(self, tasks: List[Task]) -> List[Task]:
-        """Aplica o filtro usando a estratégia atual"""
-        return self._strategy.filter(tasks)
+    def apply_filter(self, tasks: List[Task], limit: Optional[int] = None) -> List[Task]:
+        """Aplica o filtro usando a estratégia atual
+        
+        Com limit, a avaliação é preguiçosa e para ao encontrar limit tarefas.
+        """
+        if limit is None:
+            return self._strategy.filter(tasks)
+        return list(self._strategy.iter_matches(tasks, limit))
 
 
 class TaskSortContext:
@@ -143,31 +341,156 @@ class TaskSortContext:
         """Altera a estratégia de ordenação"""
         self._strategy = strategy
     
-    def apply_sort(self, tasks: List[Task]) -> List[Task]:
-        """Aplica a ordenação usando a estratégia atual"""
-        return self._strategy.sort(tasks)
+    def apply_sort(self, tasks: List[Task], limit: Optional[int] = None) -> List[Task]:
+        """Aplica a ordenação usando a estratégia atual
+        
+        Com limit, devolve só as primeiras tarefas por seleção em heap, sem
+        ordenar a lista inteira.
+        """
+        if limit is None or limit >= len(tasks):
+            return self._strategy.sort(tasks)
+        return self._strategy.sort_top(tasks, limit)
 
 
 # ============= FACTORY PARA ESTRATÉGIAS =============
 
+class FilterExpressionParser:
+    """Interpreta a sintaxe compacta de filtros combinados
+    
+    ',' é AND, '|' é OR, '!' é NOT e parênteses agrupam, com NOT > AND > OR.
+    Os nomes são os tipos de filtro da factory; 'priority:<valor>' filtra
+    por uma prioridade. Ex.: 'high_priority,!completed,(overdue|week)'.
+    """
+    
+    TOKEN_PATTERN = re.compile(r'\s*(?:([(),|!])|([a-z_]+(?::[a-z_]+)?))')
+    
+    def __init__(self, expression: str, **kwargs):
+        self._tokens = self._tokenize(expression)
+        self._position = 0
+        self._kwargs = kwargs
+    
+    def parse(self) -> ITaskFilterStrategy:
+        """Constrói a árvore de estratégias da expressão"""
+        strategy = self._parse_or()
+        if self._position != len(self._tokens):
+            raise ValueError(f"Filtro inválido: '{self._tokens[self._position]}' inesperado")
+        return strategy
+    
+    def _tokenize(self, expression: str) -> List[str]:
+        tokens = []
+        position = 0
+        expression = expression.strip()
+        while position < len(expression):
+            match = self.TOKEN_PATTERN.match(expression, position)
+            if not match:
+                raise ValueError(f"Filtro inválido: '{expression[position:]}'")
+            tokens.append(match.group(1) or match.group(2))
+            position = match.end()
+        return tokens
+    
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+    
+    def _take(self) -> str:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Filtro inválido: expressão incompleta")
+        self._position += 1
+        return token
+    
+    def _parse_or(self) -> ITaskFilterStrategy:
+        strategies = [self._parse_and()]
+        while self._peek() == '|':
+            self._take()
+            strategies.append(self._parse_and())
+        return strategies[0] if len(strategies) == 1 else OrFilterStrategy(strategies)
+    
+    def _parse_and(self) -> ITaskFilterStrategy:
+        strategies = [self._parse_unary()]
+        while self._peek() == ',':
+            self._take()
+            strategies.append(self._parse_unary())
+        return strategies[0] if len(strategies) == 1 else AndFilterStrategy(strategies)
+    
+    def _parse_unary(self) -> ITaskFilterStrategy:
+        token = self._take()
+        if token == '!':
+            return NotFilterStrategy(self._parse_unary())
+        if token == '(':
+            strategy = self._parse_or()
+            if self._take() != ')':
+                raise ValueError("Filtro inválido: parêntese não fechado")
+            return strategy
+        if token in '),|':
+            raise ValueError(f"Filtro inválido: '{token}' inesperado")
+        return self._parse_name(token)
+    
+    def _parse_name(self, name: str) -> ITaskFilterStrategy:
+        filter_type, _, argument = name.partition(':')
+        if filter_type == 'priority' and argument:
+            try:
+                return PriorityFilterStrategy(Priority(argument))
+            except ValueError:
+                raise ValueError(f"Prioridade de filtro inválida: {argument}")
+        
+        if argument or filter_type not in FilterStrategyFactory.FILTER_TYPES:
+            raise ValueError(f"Filtro desconhecido: {name}")
+        return FilterStrategyFactory.create_filter_strategy(filter_type, **self._kwargs)
+
+
 class FilterStrategyFactory:
-    """Factory para criar estratégias de filtro"""
+    """Factory para criar estratégias de filtro
+    
+    Só a estratégia pedida é instanciada. Expressões combinadas passam pelo
+    FilterExpressionParser e a árvore resultante fica em cache pela expressão.
+    """
+    
+    FILTER_TYPES = {
+        'all': AllTasksFilterStrategy,
+        'completed': CompletedTasksFilterStrategy,
+        'pending': PendingTasksFilterStrategy,
+        'in_progress': InProgressTasksFilterStrategy,
+        'high_priority': HighPriorityFilterStrategy,
+        'overdue': OverdueTasksFilterStrategy,
+        'today': TodayTasksFilterStrategy,
+        'week': WeekTasksFilterStrategy,
+        'priority': PriorityFilterStrategy
+    }
+    EXPRESSION_OPERATORS = frozenset('(),|!:')
+    MAX_CACHED_PLANS = 256
+    
+    _plans: "OrderedDict[tuple, ITaskFilterStrategy]" = OrderedDict()
+    _plans_lock = threading.Lock()
     
     @staticmethod
     def create_filter_strategy(filter_type: str, **kwargs) -> ITaskFilterStrategy:
-        """Cria uma estratégia de filtro baseada no tipo"""
-        strategies = {
-            'all': AllTasksFilterStrategy(),
-            'completed': CompletedTasksFilterStrategy(),
-            'pending': PendingTasksFilterStrategy(),
-            'in_progress': InProgressTasksFilterStrategy(),
-            'high_priority': HighPriorityFilterStrategy(),
-            'overdue': OverdueTasksFilterStrategy(),
-            'today': TodayTasksFilterStrategy(),
-            'priority': PriorityFilterStrategy(kwargs.get('priority', Priority.MEDIUM))
-        }
+        """Cria uma estratégia de filtro baseada no tipo ou em uma expressão combinada"""
+        if FilterStrategyFactory.EXPRESSION_OPERATORS.isdisjoint(filter_type):
+            strategy_type = FilterStrategyFactory.FILTER_TYPES.get(filter_type, AllTasksFilterStrategy)
+            if filter_type == 'priority':
+                return strategy_type(kwargs.get('priority') or Priority.MEDIUM)
+            return strategy_type()
+        
+        return FilterStrategyFactory._create_plan(filter_type, kwargs.get('priority'))
+    
+    @staticmethod
+    def _create_plan(expression: str, priority: Optional[Priority]) -> ITaskFilterStrategy:
+        """Árvore da expressão, reaproveitada entre requisições com a mesma assinatura"""
+        # As estratégias não guardam estado mutável; datas são lidas ao compilar o predicado
+        key = (expression, priority)
+        plans = FilterStrategyFactory._plans
+        with FilterStrategyFactory._plans_lock:
+            strategy = plans.get(key)
+            if strategy is not None:
+                plans.move_to_end(key)
+                return strategy
         
-        return strategies.get(filter_type, AllTasksFilterStrategy())
+        strategy = FilterExpressionParser(expression, priority=priority).parse()
+        with FilterStrategyFactory._plans_lock:
+            plans[key] = strategy
+            if len(plans) > FilterStrategyFactory.MAX_CACHED_PLANS:
+                plans.popitem(last=False)
+        return strategy
 
 
 class SortStrategyFactory:
@@ -181,7 +504,8 @@ class SortStrategyFactory:
             'due_date': DueDateSortStrategy(),
             'creation_date': CreationDateSortStrategy(),
             'alphabetical': AlphabeticalSortStrategy(),
-            'status': StatusSortStrategy()
+            'status': StatusSortStrategy(),
+            'priority_due_date': CompositeSortStrategy([PrioritySortStrategy(), DueDateSortStrategy()])
         }
         
-        return strategies.get(sort_type, CreationDateSortStrategy()) 
\ No newline at end of file
+        return strategies.get(sort_type, CreationDateSortStrategy())
\ No newline at end of file
@@ -1,10 +1,13 @@
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from datetime import date
 from domain.entities import Task, User, Priority, TaskStatus
-from domain.interfaces import ITaskRepository, IUserRepository, IPasswordHasher
+from domain.interfaces import ITaskRepository, IUserRepository, IPasswordHasher, IUserVersionTracker
+from domain.specifications import (
+    TaskPage, TaskOperation, TaskProjection, BulkWriteResult, encode_cursor, decode_cursor, reaches_archive
+)
 from .commands import (
     CreateTaskCommand, UpdateTaskCommand, CompleteTaskCommand, 
-    DeleteTaskCommand, CommandInvoker
+    DeleteTaskCommand, BulkTaskCommand, ICommandInvoker
 )
 from .strategies import (
     TaskFilterContext, TaskSortContext, 
@@ -15,7 +18,7 @@ from .strategies import (
 class CreateTaskUseCase:
     """Caso de uso para criar uma nova tarefa"""
     
-    def __init__(self, task_repository: ITaskRepository, command_invoker: CommandInvoker):
+    def __init__(self, task_repository: ITaskRepository, command_invoker: ICommandInvoker):
         self._task_repository = task_repository
         self._command_invoker = command_invoker
     
@@ -33,28 +36,33 @@ class CreateTaskUseCase:
             priority, due_date, user_id
         )
         
-        return self._command_invoker.execute_command(command)
+        return self._command_invoker.execute_command(command, user_id)
 
 
-class UpdateTaskUseCase:
-    """Caso de uso para atualizar uma tarefa"""
+class TaskWriteUseCase:
+    """Base dos casos de uso que alteram tarefas existentes por meio de comandos"""
     
-    def __init__(self, task_repository: ITaskRepository, command_invoker: CommandInvoker):
+    def __init__(self, task_repository: ITaskRepository, command_invoker: ICommandInvoker):
         self._task_repository = task_repository
         self._command_invoker = command_invoker
     
-    def execute(self, task_id: int, user_id: int, title: Optional[str] = None,
-                description: Optional[str] = None, priority: Optional[Priority] = None,
-                due_date: Optional[date] = None) -> Optional[Task]:
-        """Executa a atualização de uma tarefa"""
-        # Verificar se a tarefa existe e pertence ao usuário
+    def _explain_failed_write(self, task_id: int, user_id: int, permission_message: str) -> None:
+        """Reproduz as mensagens de erro quando uma escrita condicional não afeta nenhuma linha"""
         existing_task = self._task_repository.find_by_id(task_id)
         if not existing_task:
             raise ValueError("Tarefa não encontrada")
         
         if existing_task.user_id != user_id:
-            raise ValueError("Você não tem permissão para editar esta tarefa")
-        
+            raise ValueError(permission_message)
+
+
+class UpdateTaskUseCase(TaskWriteUseCase):
+    """Caso de uso para atualizar uma tarefa"""
+    
+    def execute(self, task_id: int, user_id: int, title: Optional[str] = None,
+                description: Optional[str] = None, priority: Optional[Priority] = None,
+                due_date: Optional[date] = None) -> Optional[Task]:
+        """Executa a atualização de uma tarefa"""
         if title is not None and len(title.strip()) == 0:
             raise ValueError("Título da tarefa não pode estar vazio")
         
@@ -62,83 +70,263 @@ class UpdateTaskUseCase:
             raise ValueError("Data de vencimento não pode ser no passado")
         
         command = UpdateTaskCommand(
-            self._task_repository, task_id, 
+            self._task_repository, task_id, user_id,
             title.strip() if title else None, description, priority, due_date
         )
         
-        return self._command_invoker.execute_command(command)
+        # Posse verificada no próprio UPDATE condicional
+        task = self._command_invoker.execute_command(command, user_id)
+        if task is None:
+            self._explain_failed_write(task_id, user_id, "Você não tem permissão para editar esta tarefa")
+            raise ValueError("Tarefa não encontrada")
+        
+        return task
 
 
-class CompleteTaskUseCase:
+class CompleteTaskUseCase(TaskWriteUseCase):
     """Caso de uso para marcar uma tarefa como concluída"""
     
-    def __init__(self, task_repository: ITaskRepository, command_invoker: CommandInvoker):
-        self._task_repository = task_repository
-        self._command_invoker = command_invoker
-    
-    def execute(self, task_id: int, user_id: int) -> Optional[Task]:
+    def execute(self, task_id: int, user_id: int) -> bool:
         """Executa a marcação da tarefa como concluída"""
-        # Verificar se a tarefa existe e pertence ao usuário
-        existing_task = self._task_repository.find_by_id(task_id)
-        if not existing_task:
-            raise ValueError("Tarefa não encontrada")
+        command = CompleteTaskCommand(self._task_repository, task_id, user_id)
         
-        if existing_task.user_id != user_id:
-            raise ValueError("Você não tem permissão para alterar esta tarefa")
-        
-        if existing_task.is_completed():
+        # Posse e status verificados pelo próprio UPDATE; a leitura só ocorre em caso de falha
+        if not self._command_invoker.execute_command(command, user_id):
+            self._explain_failed_write(task_id, user_id, "Você não tem permissão para alterar esta tarefa")
             raise ValueError("Tarefa já está concluída")
         
-        command = CompleteTaskCommand(self._task_repository, task_id)
-        return self._command_invoker.execute_command(command)
+        return True
 
 
-class DeleteTaskUseCase:
+class DeleteTaskUseCase(TaskWriteUseCase):
     """Caso de uso para remover uma tarefa"""
     
-    def __init__(self, task_repository: ITaskRepository, command_invoker: CommandInvoker):
-        self._task_repository = task_repository
-        self._command_invoker = command_invoker
-    
     def execute(self, task_id: int, user_id: int) -> bool:
         """Executa a remoção de uma tarefa"""
-        # Verificar se a tarefa existe e pertence ao usuário
-        existing_task = self._task_repository.find_by_id(task_id)
-        if not existing_task:
+        command = DeleteTaskCommand(self._task_repository, task_id, user_id)
+        
+        # Posse verificada no próprio DELETE condicional
+        if not self._command_invoker.execute_command(command, user_id):
+            self._explain_failed_write(task_id, user_id, "Você não tem permissão para remover esta tarefa")
             raise ValueError("Tarefa não encontrada")
         
-        if existing_task.user_id != user_id:
-            raise ValueError("Você não tem permissão para remover esta tarefa")
+        return True
+
+
+class BulkTaskUseCase(TaskWriteUseCase):
+    """Caso de uso para aplicar um lote de operações como uma única ação desfazível"""
+    
+    MAX_OPERATIONS = 500
+    OPERATION_KINDS = ('create', 'update', 'complete', 'delete')
+    
+    def execute(self, user_id: int, operations: List[TaskOperation]) -> BulkWriteResult:
+        """Valida o lote inteiro antes de qualquer escrita e o executa como um único comando"""
+        if not operations:
+            raise ValueError("Nenhuma operação informada")
+        
+        if len(operations) > self.MAX_OPERATIONS:
+            raise ValueError(f"O lote aceita no máximo {self.MAX_OPERATIONS} operações")
+        
+        operations = [self._validate(number, operation) for number, operation in enumerate(operations, 1)]
+        
+        task_ids = [operation.task_id for operation in operations if operation.kind != 'create']
+        if len(set(task_ids)) != len(task_ids):
+            raise ValueError("Cada tarefa pode aparecer em uma única operação do lote")
+        
+        # Posse de todas as tarefas verificada com uma única consulta IN
+        tasks_by_id = {
+            task.id: task for task in self._task_repository.find_by_ids(task_ids, TaskProjection.DETAIL)
+        }
+        for task_id in task_ids:
+            task = tasks_by_id.get(task_id)
+            if task is None:
+                raise ValueError(f"Tarefa {task_id} não encontrada")
+            if task.user_id != user_id:
+                raise ValueError(f"Você não tem permissão para alterar a tarefa {task_id}")
+        
+        command = BulkTaskCommand(self._task_repository, user_id, operations, tasks_by_id)
+        return self._command_invoker.execute_command(command, user_id) or BulkWriteResult(created=[])
+    
+    def _validate(self, number: int, operation: TaskOperation) -> TaskOperation:
+        """Aplica a uma operação as regras dos casos de uso individuais, normalizando o título"""
+        if operation.kind not in self.OPERATION_KINDS:
+            raise ValueError(f"Operação {number}: tipo desconhecido '{operation.kind}'")
+        
+        if operation.kind != 'create' and operation.task_id is None:
+            raise ValueError(f"Operação {number}: ID da tarefa é obrigatório")
+        
+        if operation.kind in ('complete', 'delete'):
+            return TaskOperation(operation.kind, operation.task_id)
         
-        command = DeleteTaskCommand(self._task_repository, task_id)
-        return self._command_invoker.execute_command(command)
+        fields = {name: (operation.fields or {}).get(name) for name in ('title', 'description', 'priority', 'due_date')}
+        title = fields['title']
+        if operation.kind == 'create' and (not title or len(title.strip()) == 0):
+            raise ValueError(f"Operação {number}: Título da tarefa é obrigatório")
+        
+        if title is not None and len(title.strip()) == 0:
+            raise ValueError(f"Operação {number}: Título da tarefa não pode estar vazio")
+        
+        if fields['due_date'] and fields['due_date'] < date.today():
+            raise ValueError(f"Operação {number}: Data de vencimento não pode ser no passado")
+        
+        fields['title'] = title.strip() if title else None
+        if operation.kind == 'create':
+            fields['priority'] = fields['priority'] or Priority.MEDIUM
+            return TaskOperation(operation.kind, None, fields)
+        return TaskOperation(operation.kind, operation.task_id, fields)
 
 
-class ListTasksUseCase:
-    """Caso de uso para listar tarefas com filtros e ordenação"""
+class GetTaskUseCase:
+    """Caso de uso para obter uma única tarefa completa, como no formulário de edição"""
     
     def __init__(self, task_repository: ITaskRepository):
         self._task_repository = task_repository
     
+    def execute(self, task_id: int, user_id: int) -> Task:
+        """Retorna a tarefa com a descrição inteira, se pertencer ao usuário"""
+        task = self._task_repository.find_by_id(task_id)
+        if not task:
+            raise ValueError("Tarefa não encontrada")
+        
+        if task.user_id != user_id:
+            raise ValueError("Você não tem permissão para editar esta tarefa")
+        
+        return task
+
+
+class ListTasksUseCase:
+    """Caso de uso para listar tarefas com filtros e ordenação
+    
+    Com prefer_columnar a paginação filtra e ordena um lote colunar em
+    memória e constrói entidades apenas para a página exibida.
+    """
+    
+    def __init__(self, task_repository: ITaskRepository, prefer_columnar: bool = False):
+        self._task_repository = task_repository
+        self._prefer_columnar = prefer_columnar
+    
     def execute(self, user_id: int, filter_type: str = 'all', 
-                sort_type: str = 'creation_date', priority_filter: Optional[Priority] = None) -> List[Task]:
-        """Executa a listagem de tarefas com filtros e ordenação"""
-        # Buscar todas as tarefas do usuário
-        tasks = self._task_repository.find_by_user_id(user_id)
+                sort_type: str = 'creation_date', priority_filter: Optional[Priority] = None,
+                limit: Optional[int] = None) -> List[Task]:
+        """Executa a listagem de tarefas com filtros e ordenação, opcionalmente só as primeiras limit"""
+        filter_strategy, sort_strategy = self._create_strategies(
+            filter_type, sort_type, priority_filter
+        )
+        
+        # Filtro e ordenação expressáveis em SQL são executados pelo banco
+        criteria = filter_strategy.to_criteria()
+        sort_keys = sort_strategy.to_sort_keys()
+        tasks = self._task_repository.find_by_criteria(
+            user_id, criteria or [], sort_keys or []
+        )
+        
+        # Fallback em memória para estratégias sem equivalente em SQL
+        if criteria is None:
+            # Já ordenadas pelo banco, a filtragem para ao encontrar limit tarefas
+            filter_limit = limit if sort_keys is not None else None
+            tasks = TaskFilterContext(filter_strategy).apply_filter(tasks, filter_limit)
+        
+        if sort_keys is None:
+            # Com limit, seleção top-K em vez de ordenar a lista inteira
+            return TaskSortContext(sort_strategy).apply_sort(tasks, limit)
+        
+        return tasks if limit is None else tasks[:limit]
+    
+    def execute_page(self, user_id: int, filter_type: str = 'all',
+                     sort_type: str = 'creation_date', limit: int = 50,
+                     cursor: Optional[str] = None,
+                     priority_filter: Optional[Priority] = None) -> TaskPage:
+        """Executa a listagem paginada por cursor (keyset)"""
+        filter_strategy, sort_strategy = self._create_strategies(
+            filter_type, sort_type, priority_filter
+        )
+        
+        criteria = filter_strategy.to_criteria()
+        sort_keys = sort_strategy.to_sort_keys()
+        if criteria is not None and sort_keys is not None and not self._prefer_columnar:
+            return self._task_repository.find_page(user_id, criteria, sort_keys, limit, cursor)
         
-        # Aplicar filtro
+        # Caminho colunar: índices filtrados e ordenados, entidades só da página
+        batch = self._task_repository.find_batch(user_id, include_archived=reaches_archive(criteria or []))
+        indices = filter_strategy.filter_indices(batch)
+        if indices is not None:
+            indices = sort_strategy.sort_indices(batch, indices)
+        if indices is not None:
+            task_ids = batch.take_ids(indices)
+            page_ids, next_cursor = self._page_after(task_ids, cursor, limit)
+            return TaskPage(items=self._task_repository.find_by_ids(page_ids), next_cursor=next_cursor)
+        
+        # Fallback em memória com as entidades completas; na primeira página basta
+        # o top-K, com uma tarefa a mais para saber se há página seguinte
+        tasks = self.execute(user_id, filter_type, sort_type, priority_filter,
+                             limit=None if cursor else limit + 1)
+        page_ids, next_cursor = self._page_after([task.id for task in tasks], cursor, limit)
+        tasks_by_id = {task.id: task for task in tasks}
+        return TaskPage(items=[tasks_by_id[task_id] for task_id in page_ids], next_cursor=next_cursor)
+    
+    def execute_stream(self, user_id: int, filter_type: str = 'all',
+                       sort_type: str = 'creation_date', chunk_size: int = 1000,
+                       priority_filter: Optional[Priority] = None) -> Iterator[Task]:
+        """Percorre todas as tarefas da listagem, completas, sem carregá-las de uma vez
+        
+        Filtros e ordenações inválidos falham já na chamada. Um filtro sem
+        equivalente em SQL é aplicado em fluxo; uma ordenação sem equivalente
+        obriga a carregar a listagem inteira para ordená-la em memória.
+        """
+        filter_strategy, sort_strategy = self._create_strategies(
+            filter_type, sort_type, priority_filter
+        )
+        
+        criteria = filter_strategy.to_criteria()
+        sort_keys = sort_strategy.to_sort_keys()
+        tasks = self._task_repository.stream_by_criteria(user_id, criteria or [], sort_keys or [], chunk_size)
+        if criteria is None:
+            tasks = filter_strategy.iter_matches(tasks)
+        if sort_keys is None:
+            return iter(TaskSortContext(sort_strategy).apply_sort(list(tasks)))
+        return tasks
+    
+    def _page_after(self, task_ids: List[int], cursor: Optional[str], limit: int) -> tuple:
+        """Recorta a página seguinte ao cursor, que guarda apenas o ID da última tarefa"""
+        start = 0
+        if cursor:
+            last_id = decode_cursor(cursor)[-1]
+            start = next((index + 1 for index, task_id in enumerate(task_ids) if task_id == last_id),
+                         len(task_ids))
+        
+        page_ids = task_ids[start:start + limit]
+        next_cursor = encode_cursor([page_ids[-1]]) if start + limit < len(task_ids) else None
+        return page_ids, next_cursor
+    
+    def _create_strategies(self, filter_type: str, sort_type: str,
+                           priority_filter: Optional[Priority]) -> tuple:
+        """Cria as estratégias de filtro e ordenação pelas factories"""
         filter_strategy = FilterStrategyFactory.create_filter_strategy(
             filter_type, priority=priority_filter
         )
-        filter_context = TaskFilterContext(filter_strategy)
-        filtered_tasks = filter_context.apply_filter(tasks)
-        
-        # Aplicar ordenação
         sort_strategy = SortStrategyFactory.create_sort_strategy(sort_type)
-        sort_context = TaskSortContext(sort_strategy)
-        sorted_tasks = sort_context.apply_sort(filtered_tasks)
+        return filter_strategy, sort_strategy
+
+
+class SearchTasksUseCase:
+    """Caso de uso para a busca textual nas tarefas do usuário"""
+    
+    MAX_QUERY_LENGTH = 200
+    
+    def __init__(self, task_repository: ITaskRepository):
+        self._task_repository = task_repository
+    
+    def execute(self, user_id: int, query: str, limit: int = 20,
+                cursor: Optional[str] = None) -> TaskPage:
+        """Executa a busca, com os resultados mais relevantes primeiro"""
+        query = (query or '').strip()
+        if not query:
+            raise ValueError("Informe um termo de busca")
+        
+        if len(query) > self.MAX_QUERY_LENGTH:
+            raise ValueError(f"A busca deve ter no máximo {self.MAX_QUERY_LENGTH} caracteres")
         
-        return sorted_tasks
+        return self._task_repository.search(user_id, query, limit, cursor)
 
 
 class GetTaskStatsUseCase:
@@ -149,22 +337,23 @@ class GetTaskStatsUseCase:
     
     def execute(self, user_id: int) -> dict:
         """Executa o cálculo de estatísticas das tarefas"""
-        tasks = self._task_repository.find_by_user_id(user_id)
+        # Contagens agregadas pelo banco, sem carregar as entidades
+        counts = self._task_repository.count_tasks(user_id)
         
-        total_tasks = len(tasks)
-        completed_tasks = len([t for t in tasks if t.is_completed()])
-        pending_tasks = len([t for t in tasks if t.status == TaskStatus.PENDING])
-        in_progress_tasks = len([t for t in tasks if t.status == TaskStatus.IN_PROGRESS])
-        overdue_tasks = len([t for t in tasks if t.is_overdue()])
+        total_tasks = counts.total
+        completed_tasks = counts.by_status[TaskStatus.COMPLETED]
+        pending_tasks = counts.by_status[TaskStatus.PENDING]
+        in_progress_tasks = counts.by_status[TaskStatus.IN_PROGRESS]
+        overdue_tasks = self._task_repository.count_overdue(user_id)
         
         completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
         
         # Tarefas por prioridade
         priority_stats = {
-            'urgent': len([t for t in tasks if t.priority == Priority.URGENT]),
-            'high': len([t for t in tasks if t.priority == Priority.HIGH]),
-            'medium': len([t for t in tasks if t.priority == Priority.MEDIUM]),
-            'low': len([t for t in tasks if t.priority == Priority.LOW])
+            'urgent': counts.by_priority[Priority.URGENT],
+            'high': counts.by_priority[Priority.HIGH],
+            'medium': counts.by_priority[Priority.MEDIUM],
+            'low': counts.by_priority[Priority.LOW]
         }
         
         return {
@@ -227,31 +416,34 @@ class AuthenticateUserUseCase:
         return user
 
 
+class GetDataVersionUseCase:
+    """Caso de uso para obter a versão atual dos dados de tarefas do usuário"""
+    
+    def __init__(self, version_tracker: IUserVersionTracker):
+        self._version_tracker = version_tracker
+    
+    def execute(self, user_id: int) -> int:
+        """Retorna a versão, que muda a cada comando de escrita do usuário"""
+        return self._version_tracker.get_version(user_id)
+
+
 class UndoActionUseCase:
     """Caso de uso para desfazer a última ação"""
     
-    def __init__(self, command_invoker: CommandInvoker):
+    def __init__(self, command_invoker: ICommandInvoker):
         self._command_invoker = command_invoker
     
-    def execute(self) -> bool:
-        """Executa o undo da última ação"""
-        if not self._command_invoker.can_undo():
-            return False
-        
-        self._command_invoker.undo()
-        return True
+    def execute(self, user_id: int) -> bool:
+        """Executa o undo da última ação do usuário"""
+        return self._command_invoker.undo(user_id)
 
 
 class RedoActionUseCase:
     """Caso de uso para refazer uma ação"""
     
-    def __init__(self, command_invoker: CommandInvoker):
+    def __init__(self, command_invoker: ICommandInvoker):
         self._command_invoker = command_invoker
     
-    def execute(self) -> bool:
-        """Executa o redo de uma ação"""
-        if not self._command_invoker.can_redo():
-            return False
-        
-        self._command_invoker.redo()
-        return True 
\ No newline at end of file
+    def execute(self, user_id: int) -> bool:
+        """Executa o redo de uma ação do usuário"""
+        return self._command_invoker.redo(user_id) 
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmarks - Medições de desempenho em bancos temporários (flask benchmark-*)
\ No newline at end of file
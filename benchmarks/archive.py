@@ -0,0 +1,71 @@
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from domain.specifications import TaskCriterion, TaskSortKey, reaches_archive
+from infrastructure.database import db
+from infrastructure.migrations import refresh_planner_statistics
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+@dataclass
+class ArchiveBenchmarkResult:
+    """Tempo médio da primeira página de um filtro antes e depois do arquivamento"""
+    filter_name: str
+    before_ms: float
+    after_ms: float
+    reaches_archive: bool
+    same_first_page: bool
+    
+    @property
+    def speedup(self) -> float:
+        return self.before_ms / self.after_ms if self.after_ms else 0.0
+
+
+def _first_pages(repository: TaskRepositoryImpl, user_ids: List[int], criteria: List[TaskCriterion],
+                 sort_keys: List[TaskSortKey], page_size: int) -> List[List[int]]:
+    """IDs da primeira página de cada usuário"""
+    return [[task.id for task in repository.find_page(user_id, criteria, sort_keys, limit=page_size).items]
+            for user_id in user_ids]
+
+
+def _page_time(repository: TaskRepositoryImpl, user_ids: List[int], criteria: List[TaskCriterion],
+               sort_keys: List[TaskSortKey], page_size: int, repetitions: int) -> float:
+    """Milissegundos por página, na média de repetitions páginas de cada usuário"""
+    started_at = time.perf_counter()
+    for _ in range(repetitions):
+        for user_id in user_ids:
+            repository.find_page(user_id, criteria, sort_keys, limit=page_size)
+    return (time.perf_counter() - started_at) * 1000 / (repetitions * len(user_ids))
+
+
+def benchmark_archiving(filters: Dict[str, List[TaskCriterion]], sort_keys: List[TaskSortKey],
+                        users: int = 10, tasks_per_user: int = 5000, completed_ratio: float = 0.9,
+                        page_size: int = 50, repetitions: int = 20) -> Tuple[List[ArchiveBenchmarkResult], int]:
+    """Compara a primeira página de cada filtro com todas as tarefas em tasks e depois do arquivamento
+    
+    Usa um banco temporário em que completed_ratio das tarefas estão
+    concluídas há mais tempo que a retenção, e arquiva todas elas.
+    Retorna os resultados por filtro e o total de tarefas arquivadas.
+    Os filtros que alcançam o arquivo devem manter a mesma primeira página.
+    """
+    with seeded_database(users, tasks_per_user, completed_ratio=completed_ratio) as user_ids:
+        repository = TaskRepositoryImpl()
+        pages = {name: _first_pages(repository, user_ids, criteria, sort_keys, page_size)
+                 for name, criteria in filters.items()}
+        before = {name: _page_time(repository, user_ids, criteria, sort_keys, page_size, repetitions)
+                  for name, criteria in filters.items()}
+        
+        archived = sum(repository.archive_completed(datetime.now() + timedelta(days=1)).values())
+        refresh_planner_statistics(db.engine)
+        
+        results = [
+            ArchiveBenchmarkResult(
+                name, before[name], _page_time(repository, user_ids, criteria, sort_keys, page_size, repetitions),
+                reaches_archive(criteria),
+                _first_pages(repository, user_ids, criteria, sort_keys, page_size) == pages[name]
+            )
+            for name, criteria in filters.items()
+        ]
+    return results, archived
\ No newline at end of file
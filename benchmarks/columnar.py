@@ -0,0 +1,84 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List
+from unittest import mock
+from application.strategies import FilterStrategyFactory, SortStrategyFactory
+from application.use_cases import ListTasksUseCase
+from domain import task_batch
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+@dataclass
+class ColumnarBenchmarkResult:
+    """Tempo médio da primeira página por entidades, lote colunar e keyset em SQL"""
+    tasks: int
+    entities_ms: float
+    columnar_ms: float
+    columnar_python_ms: float
+    keyset_ms: float
+    kernels_ms: float
+    same_page: bool
+    
+    @property
+    def columnar_speedup(self) -> float:
+        return self.entities_ms / self.columnar_ms if self.columnar_ms else 0.0
+
+
+def _average_ms(compute: Callable[[], Any], repetitions: int) -> float:
+    """Milissegundos por execução, na média de repetitions execuções"""
+    started_at = time.perf_counter()
+    for _ in range(repetitions):
+        compute()
+    return (time.perf_counter() - started_at) * 1000 / repetitions
+
+
+def benchmark_columnar(tasks: int = 10000, filter_type: str = 'overdue', sort_type: str = 'priority',
+                       page_size: int = 50, repetitions: int = 3) -> ColumnarBenchmarkResult:
+    """Compara a primeira página de um usuário com tasks tarefas em um banco temporário
+    
+    As entidades são carregadas por completo e filtradas e ordenadas pelas
+    estratégias, como antes do lote colunar. O lote colunar é medido com e
+    sem NumPy; os kernels, sobre um lote já carregado.
+    """
+    filter_strategy = FilterStrategyFactory.create_filter_strategy(filter_type)
+    sort_strategy = SortStrategyFactory.create_sort_strategy(sort_type)
+    
+    with seeded_database(users=1, tasks_per_user=tasks) as user_ids:
+        user_id = user_ids[0]
+        repository = TaskRepositoryImpl()
+        columnar = ListTasksUseCase(repository, prefer_columnar=True)
+        keyset = ListTasksUseCase(repository)
+        
+        def from_entities() -> List[int]:
+            found = sort_strategy.sort(filter_strategy.filter(repository.find_by_user_id(user_id)))
+            return [task.id for task in found[:page_size]]
+        
+        def from_use_case(use_case: ListTasksUseCase) -> List[int]:
+            return [task.id for task in use_case.execute_page(user_id, filter_type, sort_type, page_size).items]
+        
+        pages = [from_entities(), from_use_case(columnar), from_use_case(keyset)]
+        entities_ms = _average_ms(from_entities, repetitions)
+        columnar_ms = _average_ms(lambda: from_use_case(columnar), repetitions)
+        keyset_ms = _average_ms(lambda: from_use_case(keyset), repetitions)
+        
+        # Sem NumPy os mesmos kernels rodam sobre listas Python
+        with mock.patch.object(task_batch, 'np', None):
+            pages.append(from_use_case(columnar))
+            columnar_python_ms = _average_ms(lambda: from_use_case(columnar), repetitions)
+        
+        batch = repository.find_batch(user_id)
+        kernels_ms = _average_ms(
+            lambda: sort_strategy.sort_indices(batch, filter_strategy.filter_indices(batch)), repetitions
+        )
+    
+    return ColumnarBenchmarkResult(
+        tasks, entities_ms, columnar_ms, columnar_python_ms, keyset_ms, kernels_ms,
+        all(page == pages[0] for page in pages)
+    )
+
+
+def benchmark_columnar_scaling(task_counts: List[int], filter_type: str = 'overdue', sort_type: str = 'priority',
+                               page_size: int = 50, repetitions: int = 3) -> List[ColumnarBenchmarkResult]:
+    """Compara os caminhos da listagem para cada quantidade de tarefas por usuário"""
+    return [benchmark_columnar(tasks, filter_type, sort_type, page_size, repetitions) for tasks in task_counts]
\ No newline at end of file
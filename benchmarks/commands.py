@@ -0,0 +1,189 @@
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from application.commands import ICommand, UpdateTaskCommand, DeleteTaskCommand, _encode_fields, _decode_fields
+from domain.entities import Task, Priority
+
+
+@dataclass
+class CommandMemoryResult:
+    """Memória retida por um histórico de comandos com cópias completas e com deltas"""
+    command: str
+    commands: int
+    full_copy_mib: float
+    delta_mib: float
+    full_copy_redo_reads: int
+    delta_redo_reads: int
+    
+    @property
+    def reduction(self) -> float:
+        return self.full_copy_mib / self.delta_mib if self.delta_mib else 0.0
+
+
+class MemoryTaskRepository:
+    """Repositório em memória que materializa uma Task nova a cada leitura, como o SQL
+    
+    Implementa só o que os comandos de atualização e remoção usam e conta as
+    leituras, para comparar o custo do redo de cada memento.
+    """
+    
+    def __init__(self, description_length: int):
+        self._description_length = description_length
+        self.reads = 0
+    
+    def find_by_id(self, task_id: int) -> Optional[Task]:
+        self.reads += 1
+        description = (str(task_id) * self._description_length)[:self._description_length]
+        return Task(f'Tarefa {task_id}', description, Priority.LOW, None, 1, id=task_id)
+    
+    def update(self, task: Task) -> Task:
+        return task
+    
+    def update_fields_if_owned(self, task_id: int, user_id: int, fields: Dict[str, Any]) -> int:
+        return 1
+    
+    def delete_if_owned(self, task_id: int, user_id: int) -> int:
+        return 1
+    
+    def restore_if_owned(self, task_id: int, user_id: int) -> int:
+        return 1
+    
+    def save(self, task: Task) -> Task:
+        return task
+
+
+def _task_record(task: Optional[Task]) -> Optional[Dict[str, Any]]:
+    """Cópia completa da tarefa em valores serializáveis, como o memento antigo iria ao journal"""
+    if task is None:
+        return None
+    return _encode_fields({
+        'id': task.id, 'title': task.title, 'description': task.description,
+        'priority': task.priority, 'due_date': task.due_date, 'user_id': task.user_id
+    })
+
+
+def _task_from_record(record: Optional[Dict[str, Any]]) -> Optional[Task]:
+    if record is None:
+        return None
+    fields = _decode_fields(record)
+    return Task(fields['title'], fields['description'], fields['priority'], fields['due_date'],
+                fields['user_id'], id=fields['id'])
+
+
+class FullCopyUpdateTaskCommand(ICommand):
+    """Atualização como antes dos deltas: guarda os valores pedidos e uma cópia da tarefa"""
+    
+    def __init__(self, task_repository: MemoryTaskRepository, task_id: int, title: Optional[str] = None):
+        self._task_repository = task_repository
+        self._task_id = task_id
+        self._title = title
+        self._description = None
+        self._priority = None
+        self._due_date = None
+        self._original_task: Optional[Task] = None
+    
+    def execute(self) -> Optional[Task]:
+        task = self._task_repository.find_by_id(self._task_id)
+        if not task:
+            return None
+        self._original_task = Task(
+            title=task.title,
+            description=task.description,
+            priority=task.priority,
+            due_date=task.due_date,
+            user_id=task.user_id,
+            id=task.id
+        )
+        task.update(self._title, self._description, self._priority, self._due_date)
+        return self._task_repository.update(task)
+    
+    def undo(self) -> Optional[Task]:
+        if self._original_task:
+            return self._task_repository.update(self._original_task)
+        return None
+    
+    def to_record(self) -> Dict[str, Any]:
+        return {'task_id': self._task_id, 'title': self._title, 'original': _task_record(self._original_task)}
+    
+    @classmethod
+    def from_record(cls, task_repository: MemoryTaskRepository,
+                    record: Dict[str, Any]) -> 'FullCopyUpdateTaskCommand':
+        command = cls(task_repository, record['task_id'], record['title'])
+        command._original_task = _task_from_record(record['original'])
+        return command
+
+
+class FullCopyDeleteTaskCommand(ICommand):
+    """Remoção como antes dos deltas: guarda a entidade removida inteira"""
+    
+    def __init__(self, task_repository: MemoryTaskRepository, task_id: int):
+        self._task_repository = task_repository
+        self._task_id = task_id
+        self._deleted_task: Optional[Task] = None
+    
+    def execute(self) -> bool:
+        self._deleted_task = self._task_repository.find_by_id(self._task_id)
+        if not self._deleted_task:
+            return False
+        return self._task_repository.delete_if_owned(self._task_id, self._deleted_task.user_id) > 0
+    
+    def undo(self) -> Optional[Task]:
+        if self._deleted_task:
+            return self._task_repository.save(self._deleted_task)
+        return None
+    
+    def to_record(self) -> Dict[str, Any]:
+        return {'task_id': self._task_id, 'deleted': _task_record(self._deleted_task)}
+    
+    @classmethod
+    def from_record(cls, task_repository: MemoryTaskRepository,
+                    record: Dict[str, Any]) -> 'FullCopyDeleteTaskCommand':
+        command = cls(task_repository, record['task_id'])
+        command._deleted_task = _task_from_record(record['deleted'])
+        return command
+
+
+def _history(make_command: Callable[[MemoryTaskRepository, int], ICommand], commands: int,
+             description_length: int) -> tuple:
+    """MiB retidos por commands comandos executados e leituras do banco para refazê-los"""
+    repository = MemoryTaskRepository(description_length)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        history = []
+        for task_id in range(commands):
+            command = make_command(repository, task_id)
+            command.execute()
+            history.append(command)
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    
+    repository.reads = 0
+    for command in history:
+        command.undo()
+        command.redo()
+    return retained / (1024 * 1024), repository.reads
+
+
+def benchmark_command_memory(commands: int = 100000, description_length: int = 1024) -> List[CommandMemoryResult]:
+    """Compara o histórico de atualizações de título e de remoções com cada memento
+    
+    As tarefas têm descrições de description_length caracteres; o histórico
+    fica inteiro em memória, como na pilha de undo de um usuário.
+    """
+    cases = [
+        ('update', lambda repository, task_id: FullCopyUpdateTaskCommand(repository, task_id, title=f'Nova {task_id}'),
+         lambda repository, task_id: UpdateTaskCommand(repository, task_id, 1, title=f'Nova {task_id}')),
+        ('delete', lambda repository, task_id: FullCopyDeleteTaskCommand(repository, task_id),
+         lambda repository, task_id: DeleteTaskCommand(repository, task_id, 1)),
+    ]
+    
+    results = []
+    for name, full_copy, delta in cases:
+        full_copy_mib, full_copy_reads = _history(full_copy, commands, description_length)
+        delta_mib, delta_reads = _history(delta, commands, description_length)
+        results.append(CommandMemoryResult(name, commands, full_copy_mib, delta_mib, full_copy_reads, delta_reads))
+    return results
\ No newline at end of file
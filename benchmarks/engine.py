@@ -0,0 +1,236 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Tuple
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from application.commands import JournalCommandInvoker
+from application.use_cases import CreateTaskUseCase
+from domain.entities import Priority
+from infrastructure.database import (
+    db, db_connection, EngineProfile, TaskModel, UserModel, UserTaskStatsModel, PriorityEnum, TaskStatusEnum
+)
+from infrastructure.migrations import upgrade_schema
+from infrastructure.repositories import CommandJournalRepositoryImpl
+from infrastructure.sharding import (
+    ConsistentHashRing, ShardedTaskRepository, ShardedCommandJournal, create_shard_schema
+)
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@dataclass
+class WriteThroughputResult:
+    """Vazão de escrita de um perfil de engine sob escritores concorrentes"""
+    profile: str
+    writers: int
+    transactions: int
+    seconds: float
+    lock_errors: int
+    
+    @property
+    def transactions_per_second(self) -> float:
+        return self.transactions / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class ShardThroughputResult(WriteThroughputResult):
+    """Vazão de escrita com as tarefas particionadas entre shards"""
+    shards: int = 1
+
+
+def _create_database(profile: EngineProfile, path: str, user_ids: List[int]):
+    """Banco SQLite com o esquema atual, os usuários e as linhas de contadores informados"""
+    url = 'sqlite:///' + path
+    engine = create_engine(url, **profile.engine_options(url))
+    profile.configure(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        if user_ids:
+            connection.execute(UserModel.__table__.insert(), [
+                {'id': user_id, 'email': f'writer{user_id}@example.com', 'password_hash': '-'} for user_id in user_ids
+            ])
+            connection.execute(UserTaskStatsModel.__table__.insert(), [{'user_id': user_id} for user_id in user_ids])
+    return engine
+
+
+def _run_writers(engine_for: Callable[[int], Any], user_for: Callable[[int, int], int],
+                 writers: int, transactions_per_writer: int) -> Tuple[float, int]:
+    """Roda os escritores em paralelo e retorna (segundos, transações recusadas por lock)
+    
+    Cada transação reproduz a escrita da criação de uma tarefa: o INSERT em
+    tasks e o UPDATE dos contadores do usuário, no banco que engine_for
+    indica para ele. Transações recusadas por lock são contadas e repetidas,
+    de modo que todas acabam confirmadas.
+    """
+    tasks = TaskModel.__table__
+    stats = UserTaskStatsModel.__table__
+    lock_errors = [0] * writers
+    start = threading.Barrier(writers + 1)
+    
+    def write(writer: int) -> None:
+        start.wait()
+        for number in range(transactions_per_writer):
+            user_id = user_for(writer, number)
+            engine = engine_for(user_id)
+            while True:
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(tasks.insert().values(
+                            title=f'Tarefa {number}', description='Descrição da tarefa',
+                            priority=PriorityEnum.MEDIUM, status=TaskStatusEnum.PENDING, user_id=user_id
+                        ))
+                        connection.execute(stats.update().where(stats.c.user_id == user_id).values(
+                            total=stats.c.total + 1, pending=stats.c.pending + 1, medium=stats.c.medium + 1
+                        ))
+                    break
+                except OperationalError as error:
+                    if 'locked' not in str(error.orig):
+                        raise
+                    lock_errors[writer] += 1
+    
+    threads = [threading.Thread(target=write, args=(writer,)) for writer in range(writers)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started_at, sum(lock_errors)
+
+
+def benchmark_write_throughput(profile: EngineProfile, writers: int = 4,
+                               transactions_per_writer: int = 200) -> WriteThroughputResult:
+    """Mede os commits por segundo de escritores concorrentes em um banco SQLite temporário
+    
+    Cada escritor grava as tarefas de um único usuário.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        engine = _create_database(
+            profile, os.path.join(directory, 'benchmark.db'), [writer + 1 for writer in range(writers)]
+        )
+        try:
+            elapsed, lock_errors = _run_writers(
+                lambda user_id: engine, lambda writer, number: writer + 1, writers, transactions_per_writer
+            )
+        finally:
+            engine.dispose()
+    
+    return WriteThroughputResult(profile.name, writers, writers * transactions_per_writer, elapsed, lock_errors)
+
+
+def _sharded_app(profile_name: str, directory: str, shards: int) -> Flask:
+    """Aplicação sobre o primário e os shards SQLite do diretório"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directory, 'primary.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DATABASE_SHARD_URLS'] = [
+        'sqlite:///' + os.path.join(directory, f'shard_{number}.db') for number in range(shards)
+    ]
+    db_connection.init_app(app, profile_name)
+    return app
+
+
+def _shard_writer(profile_name: str, directory: str, shards: int, user_ids: List[int],
+                  start, lock_errors) -> None:
+    """Escritor em processo próprio, como um worker da aplicação
+    
+    Cada transação cria uma tarefa pelo mesmo caminho de uma requisição: o
+    caso de uso, o invoker com journal e o Unit of Work, com um único commit.
+    """
+    app = _sharded_app(profile_name, directory, shards)
+    unit_of_work = SqlAlchemyUnitOfWork(db)
+    repository = ShardedTaskRepository(unit_of_work)
+    journal = ShardedCommandJournal(CommandJournalRepositoryImpl(unit_of_work), repository)
+    create_task = CreateTaskUseCase(repository, JournalCommandInvoker(journal, repository, version_trackers=[repository]))
+    
+    with app.app_context():
+        start.wait(timeout=60)
+        for number, user_id in enumerate(user_ids):
+            while True:
+                unit_of_work.begin()
+                try:
+                    create_task.execute(f'Tarefa {number}', 'Descrição da tarefa', Priority.MEDIUM, None, user_id)
+                    unit_of_work.commit()
+                    break
+                except OperationalError as error:
+                    unit_of_work.rollback()
+                    if 'locked' not in str(error.orig):
+                        raise
+                    with lock_errors.get_lock():
+                        lock_errors.value += 1
+                finally:
+                    db.session.remove()
+
+
+def benchmark_shard_throughput(profile: EngineProfile, shards: int, writers: int = 8,
+                               transactions_per_writer: int = 200) -> ShardThroughputResult:
+    """Mede os commits por segundo com as tarefas particionadas entre shards SQLite temporários
+    
+    Os escritores são processos que criam tarefas pelo caso de uso, de modo
+    que toda escrita da requisição entra na medição, inclusive as que vão ao
+    primário. Cada transação é de um usuário diferente, já com o shard do
+    anel gravado no diretório, como depois da sua primeira escrita; um
+    escritor passa, portanto, por todos os shards.
+    """
+    user_ids = list(range(1, writers * transactions_per_writer + 1))
+    context = multiprocessing.get_context('spawn')
+    start = context.Barrier(writers + 1)
+    lock_errors = context.Value('i', 0)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        app = _sharded_app(profile.name, directory, shards)
+        with app.app_context():
+            db.create_all(bind_key=None)
+            upgrade_schema(db)
+            create_shard_schema(db)
+            ring = ConsistentHashRing(db_connection.shard_binds())
+            db.session.execute(UserModel.__table__.insert(), [
+                {'id': user_id, 'email': f'writer{user_id}@example.com', 'password_hash': '-',
+                 'shard': ring.node_for(user_id)}
+                for user_id in user_ids
+            ])
+            db.session.commit()
+            for engine in db.engines.values():
+                engine.dispose()
+        
+        processes = [
+            context.Process(target=_shard_writer, args=(
+                profile.name, directory, shards,
+                user_ids[writer * transactions_per_writer:(writer + 1) * transactions_per_writer],
+                start, lock_errors
+            ))
+            for writer in range(writers)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            start.wait(timeout=60)
+            started_at = time.perf_counter()
+        finally:
+            for process in processes:
+                process.join()
+        elapsed = time.perf_counter() - started_at
+    
+    if any(process.exitcode != 0 for process in processes):
+        raise RuntimeError("Um dos escritores do benchmark terminou com erro")
+    return ShardThroughputResult(
+        profile.name, writers, writers * transactions_per_writer, elapsed, lock_errors.value, shards
+    )
+
+
+def benchmark_shard_scaling(profile: EngineProfile, shard_counts: List[int], writers: int = 8,
+                            transactions_per_writer: int = 200) -> List[ShardThroughputResult]:
+    """Compara a vazão de escrita concorrente para cada quantidade de shards"""
+    return [
+        benchmark_shard_throughput(profile, shards, writers, transactions_per_writer) for shards in shard_counts
+    ]
+
+
+def benchmark_engine_profiles(profiles: List[EngineProfile], writers: int = 4,
+                              transactions_per_writer: int = 200) -> List[WriteThroughputResult]:
+    """Compara a vazão de escrita concorrente dos perfis informados"""
+    return [benchmark_write_throughput(profile, writers, transactions_per_writer) for profile in profiles]
\ No newline at end of file
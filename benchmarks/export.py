@@ -0,0 +1,73 @@
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List
+from domain.entities import Task
+from domain.specifications import TaskCriterion, TaskSortKey
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+# Tarefas exportadas entre duas leituras da memória residente
+RSS_SAMPLE_INTERVAL = 10000
+
+
+@dataclass
+class ExportBenchmarkResult:
+    """Tempo, volume e memória residente de uma exportação em fluxo"""
+    tasks: int
+    bytes_written: int
+    seconds: float
+    rss_before: int
+    rss_peak: int
+    
+    @property
+    def tasks_per_second(self) -> float:
+        return self.tasks / self.seconds if self.seconds else 0.0
+    
+    @property
+    def rss_growth(self) -> int:
+        return self.rss_peak - self.rss_before
+
+
+def resident_memory() -> int:
+    """Memória residente do processo em bytes, lida de /proc; 0 onde não houver /proc"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def benchmark_export(render: Callable[[Iterable[Task]], Iterator[bytes]],
+                     criteria: List[TaskCriterion], sort_keys: List[TaskSortKey],
+                     tasks: int = 1000000, chunk_size: int = 1000) -> ExportBenchmarkResult:
+    """Exporta as tarefas de um único usuário de um banco temporário, medindo a memória residente
+    
+    render converte as tarefas nos bytes do arquivo, como a resposta HTTP
+    faz; os bytes são apenas contados. A memória é amostrada a cada
+    RSS_SAMPLE_INTERVAL tarefas e comparada à de antes da exportação.
+    """
+    with seeded_database(users=1, tasks_per_user=tasks) as user_ids:
+        repository = TaskRepositoryImpl()
+        exported = rss_peak = 0
+        
+        def counted(stream: Iterator[Task]) -> Iterator[Task]:
+            nonlocal exported, rss_peak
+            for task in stream:
+                exported += 1
+                if exported % RSS_SAMPLE_INTERVAL == 0:
+                    rss_peak = max(rss_peak, resident_memory())
+                yield task
+        
+        rss_before = rss_peak = resident_memory()
+        started_at = time.perf_counter()
+        bytes_written = sum(
+            len(data) for data in render(counted(
+                repository.stream_by_criteria(user_ids[0], criteria, sort_keys, chunk_size)
+            ))
+        )
+        seconds = time.perf_counter() - started_at
+        rss_peak = max(rss_peak, resident_memory())
+    
+    return ExportBenchmarkResult(exported, bytes_written, seconds, rss_before, rss_peak)
\ No newline at end of file
@@ -0,0 +1,83 @@
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+from application.commands import ICommandInvoker, CommandInvoker, JournalCommandInvoker
+from application.use_cases import CreateTaskUseCase, UpdateTaskUseCase
+from domain.entities import Priority
+from infrastructure.database import db
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl, CommandJournalRepositoryImpl
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@dataclass
+class JournalBenchmarkResult:
+    """Latência das escritas com um backend de histórico de undo/redo"""
+    backend: str
+    writes: int
+    mean_ms: float
+    median_ms: float
+    p95_ms: float
+
+
+class _WritePath:
+    """Casos de uso de criação e edição sobre um backend de histórico, com um commit por escrita"""
+    
+    def __init__(self, invoker_for: Callable[[SqlAlchemyUnitOfWork, TaskRepositoryImpl], ICommandInvoker]):
+        self.unit_of_work = SqlAlchemyUnitOfWork(db)
+        repository = TaskRepositoryImpl(self.unit_of_work)
+        invoker = invoker_for(self.unit_of_work, repository)
+        self.create_task = CreateTaskUseCase(repository, invoker)
+        self.update_task = UpdateTaskUseCase(repository, invoker)
+        self.latencies: List[float] = []
+    
+    def timed(self, write: Callable[[], object]) -> object:
+        """Executa a escrita como uma requisição: Unit of Work aberto, escrita, um único commit
+        e a sessão descartada ao final"""
+        started_at = time.perf_counter()
+        self.unit_of_work.begin()
+        try:
+            result = write()
+            self.unit_of_work.commit()
+        except Exception:
+            self.unit_of_work.rollback()
+            raise
+        finally:
+            db.session.remove()
+        self.latencies.append((time.perf_counter() - started_at) * 1000)
+        return result
+
+
+def benchmark_command_journal(writes: int = 2000, tasks: int = 10000,
+                              profile: str = 'prod-sqlite') -> List[JournalBenchmarkResult]:
+    """Compara a latência das escritas com o histórico em memória e com o journal
+    
+    Os dois backends escrevem no mesmo banco temporário, no perfil de engine
+    profile e com tasks tarefas prévias por usuário, alternando a cada escrita
+    para que ambos enfrentem o mesmo tamanho de tabela. Metade das escritas
+    cria tarefas; a outra metade edita o título da tarefa recém-criada.
+    """
+    backends: Dict[str, Callable] = {
+        'memory': lambda unit_of_work, repository: CommandInvoker(version_trackers=[repository]),
+        'journal': lambda unit_of_work, repository: JournalCommandInvoker(
+            CommandJournalRepositoryImpl(unit_of_work), repository, version_trackers=[repository]
+        ),
+    }
+    
+    with seeded_database(users=len(backends), tasks_per_user=tasks, profile=profile) as user_ids:
+        paths = {name: _WritePath(invoker_for) for name, invoker_for in backends.items()}
+        for number in range(writes // 2):
+            for (name, path), user_id in zip(paths.items(), user_ids):
+                task = path.timed(lambda: path.create_task.execute(
+                    f'Tarefa {number}', None, Priority.MEDIUM, None, user_id
+                ))
+                path.timed(lambda: path.update_task.execute(task.id, user_id, title=f'Tarefa {number} editada'))
+    
+    return [
+        JournalBenchmarkResult(
+            name, len(path.latencies), statistics.fmean(path.latencies), statistics.median(path.latencies),
+            statistics.quantiles(path.latencies, n=20)[-1]
+        )
+        for name, path in paths.items()
+    ]
\ No newline at end of file
@@ -0,0 +1,87 @@
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, List, Tuple
+from domain.specifications import TaskProjection, TaskSortKey
+from infrastructure.database import db
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+@dataclass
+class ProjectionBenchmarkResult:
+    """Tempo e memória de uma leitura de tarefas nas projeções de lista e de detalhe"""
+    read: str
+    tasks: int
+    list_ms: float
+    detail_ms: float
+    list_peak_mib: float
+    detail_peak_mib: float
+    list_retained_mib: float
+    detail_retained_mib: float
+    
+    @property
+    def memory_reduction(self) -> float:
+        return self.detail_peak_mib / self.list_peak_mib if self.list_peak_mib else 0.0
+
+
+def _measure(read: Callable[[], Any], repetitions: int) -> Tuple[float, float, float]:
+    """Mediana em milissegundos e pico e memória retida (MiB) de uma leitura
+    
+    A sessão é descartada depois de cada leitura, como ao fim de uma
+    requisição; a memória retida inclui o resultado e o mapa de identidade.
+    """
+    read()
+    db.session.remove()
+    
+    timings = []
+    for _ in range(repetitions):
+        started_at = time.perf_counter()
+        read()
+        timings.append((time.perf_counter() - started_at) * 1000)
+        db.session.remove()
+    
+    tracemalloc.start()
+    try:
+        result = read()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    db.session.remove()
+    return statistics.median(timings), peak / (1024 * 1024), retained / (1024 * 1024)
+
+
+def benchmark_projections(tasks: int = 10000, description_length: int = 5000, page_size: int = 50,
+                          repetitions: int = 5) -> List[ProjectionBenchmarkResult]:
+    """Compara LIST e DETAIL na listagem completa e na primeira página de um usuário
+    
+    Todas as tarefas têm descrições de description_length caracteres, que só
+    DETAIL carrega por inteiro.
+    """
+    sort_keys = [TaskSortKey('created_at', True)]
+    with seeded_database(users=1, tasks_per_user=tasks, description_length=description_length) as user_ids:
+        user_id = user_ids[0]
+        repository = TaskRepositoryImpl()
+        reads = [
+            ('find_by_user_id', lambda projection: repository.find_by_user_id(user_id, projection)),
+            (f'find_page({page_size})',
+             lambda projection: repository.find_page(user_id, [], sort_keys, page_size, None, projection)),
+        ]
+        
+        results = []
+        for name, read in reads:
+            list_ms, list_peak, list_retained = _measure(lambda: read(TaskProjection.LIST), repetitions)
+            detail_ms, detail_peak, detail_retained = _measure(lambda: read(TaskProjection.DETAIL), repetitions)
+            results.append(ProjectionBenchmarkResult(
+                name, tasks, list_ms, detail_ms, list_peak, detail_peak, list_retained, detail_retained
+            ))
+    return results
+
+
+def benchmark_projections_scaling(task_counts: List[int], description_length: int = 5000, page_size: int = 50,
+                                  repetitions: int = 5) -> List[ProjectionBenchmarkResult]:
+    """Compara as projeções para cada quantidade de tarefas por usuário"""
+    return [result for tasks in task_counts
+            for result in benchmark_projections(tasks, description_length, page_size, repetitions)]
\ No newline at end of file
@@ -0,0 +1,61 @@
+import statistics
+import time
+from dataclasses import dataclass
+from typing import List
+from application.use_cases import SearchTasksUseCase
+from infrastructure.database import db
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+# Buscas medidas: termo presente em todas as tarefas, prefixos curtos e longos que
+# casam com todas elas, uma busca seletiva e uma sem resultados
+SEARCH_QUERIES = ['exemplo', 'ta', 'tar', 'tare', 'descr', 'descricao', 'tarefa 4242', 'inexistente']
+
+# Latência alvo de uma busca, na mediana
+SEARCH_TARGET_MS = 10.0
+
+
+@dataclass
+class SearchBenchmarkResult:
+    """Latência de uma busca textual, pelo caso de uso, na primeira página"""
+    query: str
+    tasks: int
+    users: int
+    results: int
+    median_ms: float
+    p95_ms: float
+    
+    @property
+    def meets_target(self) -> bool:
+        return self.median_ms <= SEARCH_TARGET_MS
+
+
+def benchmark_search(tasks: int = 10000, users: int = 10, page_size: int = 20,
+                     repetitions: int = 20) -> List[SearchBenchmarkResult]:
+    """Mede as buscas de SEARCH_QUERIES de um usuário entre users usuários com tasks tarefas cada
+    
+    Todos os usuários têm tarefas com os mesmos termos, de modo que o índice
+    guarda as ocorrências de todos e a busca precisa isolar as do usuário.
+    """
+    with seeded_database(users=users, tasks_per_user=tasks) as user_ids:
+        user_id = user_ids[0]
+        use_case = SearchTasksUseCase(TaskRepositoryImpl())
+        
+        results = []
+        for query in SEARCH_QUERIES:
+            page = use_case.execute(user_id, query, page_size)
+            db.session.remove()
+            
+            timings = []
+            for _ in range(repetitions):
+                started_at = time.perf_counter()
+                use_case.execute(user_id, query, page_size)
+                timings.append((time.perf_counter() - started_at) * 1000)
+                db.session.remove()
+            
+            results.append(SearchBenchmarkResult(
+                query, tasks, users, len(page.items), statistics.median(timings),
+                statistics.quantiles(timings, n=20)[-1]
+            ))
+    return results
\ No newline at end of file
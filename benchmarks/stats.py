@@ -0,0 +1,90 @@
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+from application.use_cases import GetTaskStatsUseCase
+from domain.entities import Task, Priority, TaskStatus
+from domain.specifications import TaskProjection
+from infrastructure.query_plans import seeded_database
+from infrastructure.repositories import TaskRepositoryImpl
+
+
+@dataclass
+class StatsBenchmarkResult:
+    """Tempo médio das estatísticas de um usuário por entidades, GROUP BY e contadores"""
+    tasks: int
+    entities_ms: float
+    aggregate_ms: float
+    counters_ms: float
+    same_stats: bool
+    
+    @property
+    def aggregate_speedup(self) -> float:
+        return self.entities_ms / self.aggregate_ms if self.aggregate_ms else 0.0
+    
+    @property
+    def counters_speedup(self) -> float:
+        return self.entities_ms / self.counters_ms if self.counters_ms else 0.0
+
+
+def stats_from_entities(tasks: List[Task]) -> Dict[str, Any]:
+    """Estatísticas calculadas como antes das consultas agregadas: uma passada por contador"""
+    total_tasks = len(tasks)
+    completed_tasks = len([task for task in tasks if task.is_completed()])
+    
+    return {
+        'total_tasks': total_tasks,
+        'completed_tasks': completed_tasks,
+        'pending_tasks': len([task for task in tasks if task.status == TaskStatus.PENDING]),
+        'in_progress_tasks': len([task for task in tasks if task.status == TaskStatus.IN_PROGRESS]),
+        'overdue_tasks': len([task for task in tasks if task.is_overdue()]),
+        'completion_rate': round((completed_tasks / total_tasks * 100) if total_tasks > 0 else 0, 2),
+        'priority_stats': {
+            'urgent': len([task for task in tasks if task.priority == Priority.URGENT]),
+            'high': len([task for task in tasks if task.priority == Priority.HIGH]),
+            'medium': len([task for task in tasks if task.priority == Priority.MEDIUM]),
+            'low': len([task for task in tasks if task.priority == Priority.LOW])
+        }
+    }
+
+
+def _average_ms(compute: Callable[[], Any], repetitions: int) -> float:
+    """Milissegundos por execução, na média de repetitions execuções"""
+    started_at = time.perf_counter()
+    for _ in range(repetitions):
+        compute()
+    return (time.perf_counter() - started_at) * 1000 / repetitions
+
+
+def benchmark_stats(tasks: int = 10000, repetitions: int = 5) -> StatsBenchmarkResult:
+    """Compara as estatísticas de um usuário com tasks tarefas em um banco temporário
+    
+    As entidades são carregadas por completo, como fazia o caso de uso antes
+    das consultas agregadas. O GROUP BY é o caminho sem linha em
+    user_task_stats; os contadores, o caminho depois de rebuild_stats.
+    """
+    with seeded_database(users=1, tasks_per_user=tasks) as user_ids:
+        user_id = user_ids[0]
+        repository = TaskRepositoryImpl()
+        use_case = GetTaskStatsUseCase(repository)
+        
+        def from_entities() -> Dict[str, Any]:
+            return stats_from_entities(repository.find_by_user_id(user_id, TaskProjection.DETAIL))
+        
+        expected = from_entities()
+        entities_ms = _average_ms(from_entities, repetitions)
+        
+        aggregated = use_case.execute(user_id)
+        aggregate_ms = _average_ms(lambda: use_case.execute(user_id), repetitions)
+        
+        repository.rebuild_stats()
+        counted = use_case.execute(user_id)
+        counters_ms = _average_ms(lambda: use_case.execute(user_id), repetitions)
+    
+    return StatsBenchmarkResult(
+        tasks, entities_ms, aggregate_ms, counters_ms, aggregated == expected and counted == expected
+    )
+
+
+def benchmark_stats_scaling(task_counts: List[int], repetitions: int = 5) -> List[StatsBenchmarkResult]:
+    """Compara os três caminhos para cada quantidade de tarefas por usuário"""
+    return [benchmark_stats(tasks, repetitions) for tasks in task_counts]
\ No newline at end of file
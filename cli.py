@@ -0,0 +1,293 @@
+from flask import Flask
+from typing import TYPE_CHECKING, Dict
+from datetime import datetime, timedelta
+import click
+
+from infrastructure.database import db_connection, ENGINE_PROFILES
+from infrastructure.sharding import TaskShardRebalancer
+from infrastructure.query_plans import check_repository_query_plans, seeded_database
+from benchmarks.engine import benchmark_engine_profiles, benchmark_shard_scaling
+from benchmarks.archive import benchmark_archiving
+from benchmarks.export import benchmark_export
+from benchmarks.stats import benchmark_stats_scaling
+from benchmarks.commands import benchmark_command_memory
+from benchmarks.journal import benchmark_command_journal
+from benchmarks.columnar import benchmark_columnar_scaling
+from benchmarks.projections import benchmark_projections_scaling
+from benchmarks.search import benchmark_search, SEARCH_TARGET_MS
+from application.strategies import FilterStrategyFactory, SortStrategyFactory
+from presentation.exporters import TaskExporterFactory, encode_chunks
+from domain.entities import Priority
+
+if TYPE_CHECKING:
+    from main import DependencyContainer
+
+# Ordenações do dashboard cobertas pela verificação de planos de consulta
+QUERY_PLAN_SORTS = ['priority', 'due_date', 'creation_date', 'alphabetical', 'status', 'priority_due_date']
+
+
+def check_query_plans_for(user_id: int) -> list:
+    """Verifica os planos de todos os filtros e ordenações do dashboard no banco semeado ativo"""
+    return check_repository_query_plans(
+        {name: FilterStrategyFactory.create_filter_strategy(name, priority=Priority.HIGH).to_criteria()
+         for name in FilterStrategyFactory.FILTER_TYPES},
+        {name: SortStrategyFactory.create_sort_strategy(name).to_sort_keys()
+         for name in QUERY_PLAN_SORTS},
+        user_id
+    )
+
+
+def register_commands(app: Flask, container: 'DependencyContainer'):
+    """Registra os comandos de linha de comando (flask <comando>)"""
+    
+    @app.cli.command('rebuild-task-stats')
+    def rebuild_task_stats():
+        """Reconstrói os contadores de user_task_stats e relata divergências"""
+        drift = container.sql_task_repository.rebuild_stats()
+        
+        if not drift:
+            print("Contadores consistentes: nenhuma divergência encontrada")
+            return
+        
+        for user_id, column, stored, actual in drift:
+            print(f"Usuário {user_id}: {column} armazenado={stored} real={actual}")
+        print(f"{len(drift)} divergência(s) corrigida(s)")
+    
+    @app.cli.command('compact-command-journal')
+    def compact_command_journal():
+        """Remove do journal de comandos os registros além da profundidade de undo"""
+        removed = container.command_journal.compact(app.config['COMMAND_HISTORY_DEPTH'])
+        print(f"{removed} registro(s) removido(s) do journal de comandos")
+    
+    @app.cli.command('purge-deleted-tasks')
+    def purge_deleted_tasks():
+        """Apaga definitivamente as tarefas com lápide além do tempo de retenção"""
+        removed = purge_expired_tombstones(app, container)
+        print(f"{removed} tarefa(s) removida(s) definitivamente")
+    
+    @app.cli.command('archive-completed-tasks')
+    def archive_completed_tasks_command():
+        """Move para tasks_archive as tarefas concluídas há mais tempo que a retenção"""
+        archived = archive_completed_tasks(app, container)
+        print(f"{sum(archived.values())} tarefa(s) arquivada(s) de {len(archived)} usuário(s)")
+    
+    @app.cli.command('check-query-plans')
+    def check_query_plans():
+        """Verifica em um banco temporário se as consultas de tarefas usam índices"""
+        with seeded_database() as user_ids:
+            reports = check_query_plans_for(user_ids[0])
+        
+        failures = [report for report in reports if not report.ok]
+        for report in reports:
+            print(f"{'OK   ' if report.ok else 'FALHA'} {report.name}")
+            for line in report.problems:
+                print(f"      {line}")
+        
+        print(f"{len(reports)} consulta(s) verificada(s), {len(failures)} com varredura completa ou ordenação temporária")
+        if failures:
+            raise SystemExit(1)
+    
+    @app.cli.command('benchmark-engine-profiles')
+    @click.option('--writers', default=4, show_default=True, help='Escritores concorrentes')
+    @click.option('--transactions', default=200, show_default=True, help='Transações por escritor')
+    @click.option('--profile', 'profiles', multiple=True, type=click.Choice(list(ENGINE_PROFILES)),
+                  help='Perfil a medir (repetível; padrão: todos)')
+    def benchmark_engine_profiles_command(writers, transactions, profiles):
+        """Compara a vazão de escrita concorrente dos perfis de engine em bancos temporários"""
+        results = benchmark_engine_profiles(
+            [ENGINE_PROFILES[name] for name in profiles or ENGINE_PROFILES], writers, transactions
+        )
+        
+        print(f"{'Perfil':<14}{'Escritores':>12}{'Transações':>12}{'Tempo (s)':>12}{'Transações/s':>14}{'Locks':>8}")
+        for result in results:
+            print(f"{result.profile:<14}{result.writers:>12}{result.transactions:>12}"
+                  f"{result.seconds:>12.2f}{result.transactions_per_second:>14.0f}{result.lock_errors:>8}")
+    
+    @app.cli.command('benchmark-task-shards')
+    @click.option('--shards', 'shard_counts', multiple=True, type=int, help='Quantidade de shards (repetível; padrão: 1, 2 e 4)')
+    @click.option('--writers', default=8, show_default=True, help='Escritores concorrentes')
+    @click.option('--transactions', default=200, show_default=True, help='Transações por escritor')
+    @click.option('--profile', default='dev', show_default=True, type=click.Choice(list(ENGINE_PROFILES)))
+    def benchmark_task_shards(shard_counts, writers, transactions, profile):
+        """Mede a vazão de escrita concorrente conforme a quantidade de shards de tarefas"""
+        results = benchmark_shard_scaling(
+            ENGINE_PROFILES[profile], list(shard_counts) or [1, 2, 4], writers, transactions
+        )
+        
+        print(f"{'Shards':<8}{'Escritores':>12}{'Transações':>12}{'Tempo (s)':>12}{'Transações/s':>14}{'Locks':>8}")
+        for result in results:
+            print(f"{result.shards:<8}{result.writers:>12}{result.transactions:>12}"
+                  f"{result.seconds:>12.2f}{result.transactions_per_second:>14.0f}{result.lock_errors:>8}")
+    
+    @app.cli.command('rebalance-task-shards')
+    @click.option('--batch-size', default=100, show_default=True, help='Usuários lidos e movidos por lote')
+    def rebalance_task_shards(batch_size):
+        """Move as tarefas de cada usuário para o shard indicado pelo anel de hash consistente"""
+        if not app.config['DATABASE_SHARD_URLS']:
+            print("Nenhum shard configurado (DATABASE_SHARD_URLS)")
+            return
+        moved = TaskShardRebalancer(container.sql_task_repository).rebalance(batch_size)
+        print(f"{moved} usuário(s) movido(s) de shard")
+    
+    @app.cli.command('benchmark-task-export')
+    @click.option('--tasks', default=1000000, show_default=True, help='Tarefas do usuário exportado')
+    @click.option('--format', 'export_format', default='csv', show_default=True,
+                  type=click.Choice(list(TaskExporterFactory.EXPORTERS)))
+    @click.option('--gzip', 'compress', is_flag=True, help='Comprime a exportação')
+    @click.option('--chunk-size', default=1000, show_default=True, help='Linhas lidas do cursor por lote')
+    def benchmark_task_export(tasks, export_format, compress, chunk_size):
+        """Exporta em fluxo as tarefas de um banco temporário e mede a memória residente"""
+        exporter = TaskExporterFactory.create_exporter(export_format, container.task_controller.serialize_task)
+        result = benchmark_export(
+            lambda stream: encode_chunks(exporter.export(stream), compress),
+            [], SortStrategyFactory.create_sort_strategy('creation_date').to_sort_keys(),
+            tasks, chunk_size
+        )
+        
+        megabyte = 1024 * 1024
+        print(f"{result.tasks} tarefa(s) exportada(s) em {result.seconds:.1f}s "
+              f"({result.tasks_per_second:.0f}/s), {result.bytes_written / megabyte:.1f} MB gerados")
+        print(f"Memória residente: {result.rss_before / megabyte:.1f} MB antes, "
+              f"pico de {result.rss_peak / megabyte:.1f} MB (+{result.rss_growth / megabyte:.1f} MB)")
+    
+    @app.cli.command('benchmark-task-archive')
+    @click.option('--users', default=10, show_default=True, help='Usuários no banco temporário')
+    @click.option('--tasks', default=5000, show_default=True, help='Tarefas por usuário')
+    @click.option('--completed-ratio', default=0.9, show_default=True, help='Fração de tarefas concluídas')
+    @click.option('--sort', default='creation_date', show_default=True, type=click.Choice(QUERY_PLAN_SORTS))
+    def benchmark_task_archive(users, tasks, completed_ratio, sort):
+        """Mede a primeira página de cada filtro antes e depois de arquivar as concluídas"""
+        results, archived = benchmark_archiving(
+            {name: FilterStrategyFactory.create_filter_strategy(name, priority=Priority.HIGH).to_criteria()
+             for name in FilterStrategyFactory.FILTER_TYPES},
+            SortStrategyFactory.create_sort_strategy(sort).to_sort_keys(),
+            users, tasks, completed_ratio
+        )
+        
+        print(f"{archived} de {users * tasks} tarefa(s) arquivada(s)")
+        print(f"{'Filtro':<14}{'Antes (ms)':>12}{'Depois (ms)':>13}{'Ganho':>8}{'Arquivo':>9}{'Mesma página':>14}")
+        for result in results:
+            print(f"{result.filter_name:<14}{result.before_ms:>12.2f}{result.after_ms:>13.2f}"
+                  f"{result.speedup:>7.1f}x{'sim' if result.reaches_archive else 'não':>9}"
+                  f"{'sim' if result.same_first_page else 'não':>14}")
+    
+    @app.cli.command('benchmark-task-stats')
+    @click.option('--tasks', 'task_counts', multiple=True, type=int,
+                  help='Tarefas do usuário (repetível; padrão: 10000 e 100000)')
+    @click.option('--repetitions', default=5, show_default=True, help='Execuções medidas por caminho')
+    def benchmark_task_stats(task_counts, repetitions):
+        """Compara as estatísticas por entidades, pelo GROUP BY e pelos contadores incrementais"""
+        results = benchmark_stats_scaling(list(task_counts) or [10000, 100000], repetitions)
+        
+        print(f"{'Tarefas':<10}{'Entidades (ms)':>16}{'GROUP BY (ms)':>15}{'Ganho':>8}"
+              f"{'Contadores (ms)':>17}{'Ganho':>9}{'Iguais':>8}")
+        for result in results:
+            print(f"{result.tasks:<10}{result.entities_ms:>16.2f}{result.aggregate_ms:>15.2f}"
+                  f"{result.aggregate_speedup:>7.1f}x{result.counters_ms:>17.2f}{result.counters_speedup:>8.1f}x"
+                  f"{'sim' if result.same_stats else 'não':>8}")
+    
+    @app.cli.command('benchmark-command-memory')
+    @click.option('--commands', default=100000, show_default=True, help='Comandos executados no histórico')
+    @click.option('--description-length', default=1024, show_default=True, help='Caracteres da descrição das tarefas')
+    def benchmark_command_memory_command(commands, description_length):
+        """Compara a memória do histórico de undo com cópias completas e com deltas"""
+        results = benchmark_command_memory(commands, description_length)
+        
+        print(f"{'Comando':<10}{'Histórico':>11}{'Cópias (MiB)':>14}{'Deltas (MiB)':>14}{'Redução':>9}"
+              f"{'Leituras redo':>15}{'(deltas)':>10}")
+        for result in results:
+            print(f"{result.command:<10}{result.commands:>11}{result.full_copy_mib:>14.1f}{result.delta_mib:>14.1f}"
+                  f"{result.reduction:>8.1f}x{result.full_copy_redo_reads:>15}{result.delta_redo_reads:>10}")
+    
+    @app.cli.command('benchmark-command-journal')
+    @click.option('--writes', default=2000, show_default=True, help='Escritas medidas por backend')
+    @click.option('--tasks', default=10000, show_default=True, help='Tarefas prévias de cada usuário')
+    @click.option('--profile', default='prod-sqlite', show_default=True, type=click.Choice(list(ENGINE_PROFILES)))
+    def benchmark_command_journal_command(writes, tasks, profile):
+        """Compara a latência das escritas com o histórico em memória e com o journal"""
+        results = benchmark_command_journal(writes, tasks, profile)
+        
+        print(f"{'Backend':<10}{'Escritas':>10}{'Média (ms)':>12}{'Mediana (ms)':>14}{'p95 (ms)':>10}")
+        for result in results:
+            print(f"{result.backend:<10}{result.writes:>10}{result.mean_ms:>12.3f}"
+                  f"{result.median_ms:>14.3f}{result.p95_ms:>10.3f}")
+        
+        memory, journal = results
+        print(f"\nCusto do journal por escrita: {journal.mean_ms - memory.mean_ms:.3f} ms (média), "
+              f"{journal.median_ms - memory.median_ms:.3f} ms (mediana)")
+    
+    @app.cli.command('benchmark-task-columnar')
+    @click.option('--tasks', 'task_counts', multiple=True, type=int,
+                  help='Tarefas do usuário (repetível; padrão: 10000, 100000 e 1000000)')
+    @click.option('--filter', 'filter_type', default='overdue', show_default=True, help='Filtro da listagem')
+    @click.option('--sort', 'sort_type', default='priority', show_default=True, help='Ordenação da listagem')
+    @click.option('--page-size', default=50, show_default=True, help='Tarefas por página')
+    @click.option('--repetitions', default=3, show_default=True, help='Execuções medidas por caminho')
+    def benchmark_task_columnar(task_counts, filter_type, sort_type, page_size, repetitions):
+        """Compara a primeira página por entidades, pelo lote colunar e pelo keyset em SQL"""
+        results = benchmark_columnar_scaling(
+            list(task_counts) or [10000, 100000, 1000000], filter_type, sort_type, page_size, repetitions
+        )
+        
+        print(f"{'Tarefas':<10}{'Entidades (ms)':>16}{'Colunar (ms)':>14}{'Ganho':>8}{'Sem NumPy (ms)':>16}"
+              f"{'Keyset (ms)':>13}{'Kernels (ms)':>14}{'Iguais':>8}")
+        for result in results:
+            print(f"{result.tasks:<10}{result.entities_ms:>16.1f}{result.columnar_ms:>14.1f}"
+                  f"{result.columnar_speedup:>7.1f}x{result.columnar_python_ms:>16.1f}{result.keyset_ms:>13.1f}"
+                  f"{result.kernels_ms:>14.2f}{'sim' if result.same_page else 'não':>8}")
+    
+    @app.cli.command('benchmark-task-projections')
+    @click.option('--tasks', 'task_counts', multiple=True, type=int,
+                  help='Tarefas do usuário (repetível; padrão: 1000 e 10000)')
+    @click.option('--description-length', default=5000, show_default=True, help='Caracteres da descrição das tarefas')
+    @click.option('--page-size', default=50, show_default=True, help='Tarefas por página')
+    @click.option('--repetitions', default=5, show_default=True, help='Execuções medidas por leitura')
+    def benchmark_task_projections(task_counts, description_length, page_size, repetitions):
+        """Compara tempo e memória das leituras de tarefas nas projeções LIST e DETAIL"""
+        results = benchmark_projections_scaling(
+            list(task_counts) or [1000, 10000], description_length, page_size, repetitions
+        )
+        
+        print(f"{'Leitura':<18}{'Tarefas':>9}{'LIST (ms)':>11}{'DETAIL (ms)':>13}{'Pico LIST':>11}"
+              f"{'Pico DETAIL':>13}{'Retida LIST':>13}{'Retida DETAIL':>15}{'Redução':>9}")
+        for result in results:
+            print(f"{result.read:<18}{result.tasks:>9}{result.list_ms:>11.1f}{result.detail_ms:>13.1f}"
+                  f"{result.list_peak_mib:>11.1f}{result.detail_peak_mib:>13.1f}{result.list_retained_mib:>13.1f}"
+                  f"{result.detail_retained_mib:>15.1f}{result.memory_reduction:>8.1f}x")
+    
+    @app.cli.command('benchmark-task-search')
+    @click.option('--tasks', default=10000, show_default=True, help='Tarefas por usuário')
+    @click.option('--users', default=10, show_default=True, help='Usuários no banco temporário')
+    @click.option('--page-size', default=20, show_default=True, help='Resultados por página')
+    @click.option('--repetitions', default=20, show_default=True, help='Execuções medidas por busca')
+    def benchmark_task_search(tasks, users, page_size, repetitions):
+        """Mede a primeira página da busca textual com termos e prefixos comuns e seletivos"""
+        results = benchmark_search(tasks, users, page_size, repetitions)
+        
+        print(f"{'Busca':<14}{'Resultados':>12}{'Mediana (ms)':>14}{'p95 (ms)':>10}"
+              f"{f'Até {SEARCH_TARGET_MS:g} ms':>12}")
+        for result in results:
+            print(f"{result.query:<14}{result.results:>12}{result.median_ms:>14.2f}{result.p95_ms:>10.2f}"
+                  f"{'sim' if result.meets_target else 'não':>12}")
+    
+    @app.cli.command('sync-read-replicas')
+    def sync_read_replicas():
+        """Copia o banco primário sobre as réplicas de leitura SQLite"""
+        copied = db_connection.sync_read_replicas()
+        print(f"{copied} réplica(s) atualizada(s)")
+
+
+def purge_expired_tombstones(app: Flask, container: 'DependencyContainer') -> int:
+    """Apaga as tarefas removidas logicamente há mais tempo que a retenção"""
+    retention = timedelta(hours=app.config['TASK_TOMBSTONE_RETENTION_HOURS'])
+    return container.task_repository.purge_deleted(
+        datetime.now() - retention, app.config['TASK_PURGE_BATCH_SIZE']
+    )
+
+
+def archive_completed_tasks(app: Flask, container: 'DependencyContainer') -> Dict[int, int]:
+    """Arquiva as tarefas concluídas há mais tempo que a retenção"""
+    retention = timedelta(days=app.config['TASK_ARCHIVE_AFTER_DAYS'])
+    return container.task_repository.archive_completed(
+        datetime.now() - retention, app.config['TASK_ARCHIVE_BATCH_SIZE']
+    )
\ No newline at end of file
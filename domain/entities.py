@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from datetime import datetime, date
 from enum import Enum
-from typing import Optional
+from typing import Any, Dict, Optional
 from dataclasses import dataclass
 
 
@@ -21,6 +21,14 @@ class TaskStatus(Enum):
     CANCELLED = "cancelada"
 
 
+# Ordem de negócio dos enums: a posição de cada membro é o seu código, usado na ordenação
+# em memória, no lote colunar e gravado no banco (urgente → baixa e pendente → cancelada)
+PRIORITY_ORDER = (Priority.URGENT, Priority.HIGH, Priority.MEDIUM, Priority.LOW)
+STATUS_ORDER = (TaskStatus.PENDING, TaskStatus.IN_PROGRESS, TaskStatus.COMPLETED, TaskStatus.CANCELLED)
+PRIORITY_CODES = {priority: code for code, priority in enumerate(PRIORITY_ORDER)}
+STATUS_CODES = {status: code for code, status in enumerate(STATUS_ORDER)}
+
+
 @dataclass
 class Task:
     """Entidade Task - representa uma tarefa no sistema"""
@@ -100,4 +108,15 @@ class User:
         self.id = id
         self.email = email
         self.password_hash = password_hash
-        self.created_at = datetime.now() 
\ No newline at end of file
+        self.created_at = datetime.now() 
+
+
+@dataclass
+class CommandJournalEntry:
+    """Registro de um comando no journal de undo/redo de um usuário"""
+    id: Optional[int]
+    user_id: int
+    seq: int
+    command_type: str
+    payload: Dict[str, Any]
+    undone: bool = False
\ No newline at end of file
@@ -1,7 +1,11 @@
+import heapq
+import itertools
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from datetime import date
-from .entities import Task, User, Priority, TaskStatus
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from datetime import date, datetime
+from .entities import Task, User, Priority, TaskStatus, CommandJournalEntry
+from .specifications import TaskCriterion, TaskSortKey, TaskPage, TaskCounts, TaskProjection
+from .task_batch import TaskBatch
 
 
 class ITaskRepository(ABC):
@@ -14,38 +18,152 @@ class ITaskRepository(ABC):
     
     @abstractmethod
     def find_by_id(self, task_id: int) -> Optional[Task]:
-        """Busca uma tarefa por ID"""
+        """Busca uma tarefa por ID, sempre com a linha completa"""
         pass
     
     @abstractmethod
-    def find_by_user_id(self, user_id: int) -> List[Task]:
+    def find_by_user_id(self, user_id: int,
+                        projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca todas as tarefas de um usuário"""
         pass
     
     @abstractmethod
-    def find_by_status(self, user_id: int, status: TaskStatus) -> List[Task]:
+    def find_by_status(self, user_id: int, status: TaskStatus,
+                       projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por status"""
         pass
     
     @abstractmethod
-    def find_by_priority(self, user_id: int, priority: Priority) -> List[Task]:
+    def find_by_priority(self, user_id: int, priority: Priority,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por prioridade"""
         pass
     
     @abstractmethod
-    def find_by_due_date(self, user_id: int, due_date: date) -> List[Task]:
+    def find_by_due_date(self, user_id: int, due_date: date,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por data de vencimento"""
         pass
     
+    @abstractmethod
+    def find_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                         sort_keys: List[TaskSortKey],
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        """Busca tarefas filtradas e ordenadas pelo próprio banco"""
+        pass
+    
+    @abstractmethod
+    def find_page(self, user_id: int, criteria: List[TaskCriterion],
+                  sort_keys: List[TaskSortKey], limit: int,
+                  cursor: Optional[str] = None,
+                  projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        """Busca uma página de tarefas a partir de um cursor (keyset)"""
+        pass
+    
+    @abstractmethod
+    def stream_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                           sort_keys: List[TaskSortKey], chunk_size: int = 1000) -> Iterator[Task]:
+        """Percorre as tarefas completas filtradas e ordenadas, lendo do banco chunk_size linhas por vez"""
+        pass
+    
+    @abstractmethod
+    def find_batch(self, user_id: int, include_archived: bool = False) -> TaskBatch:
+        """Carrega as tarefas do usuário em formato colunar, sem construir entidades"""
+        pass
+    
+    @abstractmethod
+    def find_by_ids(self, task_ids: List[int],
+                    projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        """Busca tarefas pelos IDs, na ordem informada"""
+        pass
+    
+    @abstractmethod
+    def search(self, user_id: int, query: str, limit: int,
+               cursor: Optional[str] = None,
+               projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        """Busca textual em título e descrição, paginada e ordenada por relevância"""
+        pass
+    
+    @abstractmethod
+    def count_tasks(self, user_id: int) -> TaskCounts:
+        """Conta as tarefas do usuário por status e por prioridade"""
+        pass
+    
+    @abstractmethod
+    def count_overdue(self, user_id: int) -> int:
+        """Conta as tarefas atrasadas do usuário"""
+        pass
+    
     @abstractmethod
     def update(self, task: Task) -> Task:
         """Atualiza uma tarefa"""
         pass
     
+    @abstractmethod
+    def update_status_if(self, task_id: int, user_id: int,
+                         expected_status: TaskStatus, new_status: TaskStatus) -> int:
+        """Troca o status se a tarefa é do usuário e está no status esperado; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def complete_if_owned(self, task_id: int, user_id: int) -> Optional[TaskStatus]:
+        """Conclui a tarefa se é do usuário e ainda não está concluída; retorna o status anterior"""
+        pass
+    
+    @abstractmethod
+    def update_fields_if_owned(self, task_id: int, user_id: int, fields: Dict[str, Any]) -> int:
+        """Atualiza campos se a tarefa é do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def delete_if_owned(self, task_id: int, user_id: int) -> int:
+        """Remove logicamente a tarefa se ela é do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def restore_if_owned(self, task_id: int, user_id: int) -> int:
+        """Restaura uma tarefa removida se ela é do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def save_many(self, tasks: List[Task]) -> List[Task]:
+        """Insere várias tarefas novas na mesma escrita"""
+        pass
+    
+    @abstractmethod
+    def update_fields_many_if_owned(self, user_id: int, fields_by_task: Dict[int, Dict[str, Any]]) -> int:
+        """Atualiza campos de várias tarefas do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def update_status_many_if(self, user_id: int, transitions: List[tuple]) -> int:
+        """Aplica trocas (task_id, status esperado, novo status) nas tarefas do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def delete_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        """Remove logicamente as tarefas do usuário; retorna linhas afetadas"""
+        pass
+    
+    @abstractmethod
+    def restore_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        """Restaura tarefas removidas do usuário; retorna linhas afetadas"""
+        pass
+    
     @abstractmethod
     def delete(self, task_id: int) -> bool:
         """Remove uma tarefa"""
         pass
+    
+    @abstractmethod
+    def purge_deleted(self, deleted_before: datetime, batch_size: int = 500) -> int:
+        """Apaga definitivamente as tarefas removidas antes da data informada"""
+        pass
+    
+    @abstractmethod
+    def archive_completed(self, completed_before: datetime, batch_size: int = 500) -> Dict[int, int]:
+        """Arquiva as tarefas concluídas antes da data informada; retorna o total por usuário"""
+        pass
 
 
 class IUserRepository(ABC):
@@ -72,6 +190,93 @@ class IUserRepository(ABC):
         pass
 
 
+class IUnitOfWork(ABC):
+    """Interface para Unit of Work com identity map por requisição"""
+    
+    @abstractmethod
+    def begin(self) -> None:
+        """Inicia uma nova unidade de trabalho"""
+        pass
+    
+    @abstractmethod
+    def is_active(self) -> bool:
+        """Verifica se há uma unidade de trabalho em andamento"""
+        pass
+    
+    @abstractmethod
+    def get(self, entity_type: type, entity_id: int) -> Optional[Any]:
+        """Busca uma entidade já carregada no identity map"""
+        pass
+    
+    @abstractmethod
+    def register(self, entity: Any) -> None:
+        """Registra uma entidade carregada ou alterada no identity map"""
+        pass
+    
+    @abstractmethod
+    def evict(self, entity_type: type, entity_id: int) -> None:
+        """Remove uma entidade do identity map"""
+        pass
+    
+    @abstractmethod
+    def commit(self) -> None:
+        """Confirma todas as escritas da unidade de trabalho de uma só vez"""
+        pass
+    
+    @abstractmethod
+    def rollback(self) -> None:
+        """Descarta todas as escritas da unidade de trabalho"""
+        pass
+    
+    @abstractmethod
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Agenda uma ação para depois do commit; sem unidade ativa, executa na hora"""
+        pass
+
+
+class IUserVersionTracker(ABC):
+    """Interface para o contador de versão dos dados de cada usuário"""
+    
+    @abstractmethod
+    def get_version(self, user_id: int) -> int:
+        """Versão atual dos dados do usuário"""
+        pass
+    
+    @abstractmethod
+    def bump_version(self, user_id: int) -> int:
+        """Avança a versão após uma escrita, invalidando o que dependia da anterior"""
+        pass
+
+
+class ICommandJournal(ABC):
+    """Interface para o journal persistente de comandos (histórico de undo/redo)"""
+    
+    @abstractmethod
+    def append(self, user_id: int, command_type: str, payload: Dict[str, Any]) -> CommandJournalEntry:
+        """Acrescenta um comando ao journal, descartando os comandos desfeitos"""
+        pass
+    
+    @abstractmethod
+    def last_done(self, user_id: int) -> Optional[CommandJournalEntry]:
+        """Busca o último comando ainda não desfeito"""
+        pass
+    
+    @abstractmethod
+    def first_undone(self, user_id: int) -> Optional[CommandJournalEntry]:
+        """Busca o comando desfeito mais antigo, o próximo a ser refeito"""
+        pass
+    
+    @abstractmethod
+    def mark(self, entry: CommandJournalEntry, undone: bool) -> bool:
+        """Marca um comando como desfeito ou refeito se ainda está no estado oposto; retorna se marcou"""
+        pass
+    
+    @abstractmethod
+    def compact(self, keep_per_user: int, batch_size: int = 1000) -> int:
+        """Remove os registros antigos, mantendo os mais recentes de cada usuário"""
+        pass
+
+
 class IPasswordHasher(ABC):
     """Interface para hash de senhas"""
     
@@ -93,6 +298,26 @@ class ITaskFilterStrategy(ABC):
     def filter(self, tasks: List[Task]) -> List[Task]:
         """Aplica filtro na lista de tarefas"""
         pass
+    
+    def to_criteria(self) -> Optional[List[TaskCriterion]]:
+        """Critérios equivalentes para o banco, ou None se o filtro só roda em memória"""
+        return None
+    
+    def predicate(self) -> Callable[[Task], bool]:
+        """Predicado equivalente a filter(), avaliado tarefa a tarefa"""
+        return lambda task: bool(self.filter([task]))
+    
+    def iter_matches(self, tasks: Iterable[Task], limit: Optional[int] = None) -> Iterator[Task]:
+        """Gera as tarefas que passam no filtro sob demanda, parando após limit resultados"""
+        matches = filter(self.predicate(), tasks)
+        return matches if limit is None else itertools.islice(matches, limit)
+    
+    def filter_indices(self, batch: TaskBatch) -> Optional[Sequence[int]]:
+        """Índices das tarefas do lote colunar que passam no filtro, ou None se não suportado"""
+        criteria = self.to_criteria()
+        if criteria is None:
+            return None
+        return batch.filter_indices(criteria)
 
 
 class ITaskSortStrategy(ABC):
@@ -101,4 +326,29 @@ class ITaskSortStrategy(ABC):
     @abstractmethod
     def sort(self, tasks: List[Task]) -> List[Task]:
         """Ordena a lista de tarefas"""
-        pass 
\ No newline at end of file
+        pass
+    
+    def sort_key(self, task: Task) -> Any:
+        """Chave crescente equivalente a sort(), ou None se a estratégia não tem uma"""
+        return None
+    
+    def sort_top(self, tasks: List[Task], limit: int) -> List[Task]:
+        """As primeiras limit tarefas da ordenação, na mesma ordem de sort()
+        
+        Com uma chave disponível usa seleção por heap, O(n log k); heapq.nsmallest
+        mantém a estabilidade de sorted(), então empates saem na mesma ordem.
+        """
+        if not tasks or self.sort_key(tasks[0]) is None:
+            return self.sort(tasks)[:limit]
+        return heapq.nsmallest(limit, tasks, key=self.sort_key)
+    
+    def to_sort_keys(self) -> Optional[List[TaskSortKey]]:
+        """Chaves equivalentes para o banco, ou None se a ordenação só roda em memória"""
+        return None
+    
+    def sort_indices(self, batch: TaskBatch, indices: Sequence[int]) -> Optional[Sequence[int]]:
+        """Ordena índices do lote colunar, ou None se não suportado"""
+        sort_keys = self.to_sort_keys()
+        if sort_keys is None:
+            return None
+        return batch.sort_indices(indices, sort_keys) 
\ No newline at end of file
@@ -0,0 +1,177 @@
+import base64
+import json
+from dataclasses import dataclass
+from enum import Enum
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from .entities import Task, Priority, TaskStatus
+
+
+@dataclass(frozen=True)
+class TaskCriterion:
+    """Critério de consulta independente de banco - Specification Pattern
+    
+    Campos suportados: 'status', 'priority', 'due_date'.
+    Operadores suportados: 'eq', 'ne', 'in', 'lt', 'ge'.
+    
+    Critérios compostos não têm campo: 'or' recebe uma tupla de grupos e
+    'not' um único grupo, sendo cada grupo uma tupla de critérios em AND.
+    Critérios de data são falsos para tarefas sem vencimento; a negação
+    deles, portanto, é verdadeira.
+    """
+    field: Optional[str]
+    operator: str
+    value: Any = None
+
+
+@dataclass(frozen=True)
+class TaskSortKey:
+    """Chave de ordenação independente de banco
+    
+    Campos suportados: 'priority', 'status', 'due_date', 'created_at', 'title'.
+    """
+    field: str
+    descending: bool = False
+
+
+# Caracteres da descrição carregados nas listagens
+DESCRIPTION_PREVIEW_LENGTH = 300
+
+
+class TaskProjection(Enum):
+    """Colunas carregadas por uma leitura de tarefas
+    
+    LIST traz a descrição reduzida a uma prévia de DESCRIPTION_PREVIEW_LENGTH
+    caracteres (com reticências quando cortada); DETAIL traz a linha completa.
+    EXPORT também traz a linha completa, mas em colunas avulsas, sem montar
+    modelos do ORM: é a projeção das leituras longas em fluxo.
+    """
+    LIST = 'list'
+    DETAIL = 'detail'
+    EXPORT = 'export'
+
+
+@dataclass
+class TaskPage:
+    """Página de tarefas com cursor opaco para a próxima página (keyset)"""
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+
+@dataclass
+class TaskCounts:
+    """Contadores agregados das tarefas de um usuário"""
+    total: int
+    by_status: Dict[TaskStatus, int]
+    by_priority: Dict[Priority, int]
+
+
+@dataclass(frozen=True)
+class TaskOperation:
+    """Operação de um lote de escrita de tarefas
+    
+    Tipos suportados: 'create', 'update', 'complete', 'delete'. create e
+    update levam os campos em fields (title, description, priority,
+    due_date); os demais identificam a tarefa apenas por task_id.
+    """
+    kind: str
+    task_id: Optional[int] = None
+    fields: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class BulkWriteResult:
+    """Resultado de um lote de escrita: tarefas criadas e total afetado por tipo"""
+    created: List[Task]
+    updated: int = 0
+    completed: int = 0
+    deleted: int = 0
+
+
+def reaches_archive(criteria: List[TaskCriterion]) -> bool:
+    """Indica se a consulta também alcança as tarefas arquivadas
+    
+    O arquivo guarda apenas tarefas concluídas há mais tempo que a retenção:
+    só as listagens sem filtro ou cujo filtro de status admite tarefas
+    concluídas o consultam, inclusive dentro de grupos 'or' e 'not' (como
+    completed|high_priority ou !pending). Os demais filtros enxergam apenas
+    a tabela quente.
+    """
+    return not criteria or _admits_completed(criteria) is True
+
+
+def _admits_completed(criteria: Any, negated: bool = False) -> Optional[bool]:
+    """Se o status de um grupo em AND admite (True) ou exclui (False) tarefas concluídas
+    
+    None indica que o grupo não restringe o status. Com negated, avalia a
+    negação do grupo: pela lei de De Morgan, o OR das negações dos critérios.
+    """
+    results = [_criterion_admits_completed(criterion, negated) for criterion in criteria]
+    if negated:
+        return _any_admits(results)
+    if False in results:
+        return False
+    return True if True in results else None
+
+
+def _any_admits(results: List[Optional[bool]]) -> Optional[bool]:
+    """Combina alternativas em OR: basta uma admitir; só exclui se todas excluem"""
+    if True in results:
+        return True
+    return False if results and all(result is False for result in results) else None
+
+
+def _criterion_admits_completed(criterion: TaskCriterion, negated: bool) -> Optional[bool]:
+    if criterion.operator == 'or':
+        if negated:
+            # A negação de um OR é o AND das negações dos grupos
+            return _admits_completed([TaskCriterion(None, 'not', group) for group in criterion.value])
+        return _any_admits([_admits_completed(group) for group in criterion.value])
+    if criterion.operator == 'not':
+        return _admits_completed(criterion.value, not negated)
+    if criterion.field != 'status':
+        return None
+    
+    if criterion.operator == 'eq':
+        matches = criterion.value == TaskStatus.COMPLETED
+    elif criterion.operator == 'ne':
+        matches = criterion.value != TaskStatus.COMPLETED
+    elif criterion.operator == 'in':
+        matches = TaskStatus.COMPLETED in criterion.value
+    else:
+        return None
+    return matches != negated
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Codifica os valores da última linha da página em um cursor opaco"""
+    def encode_value(value: Any) -> Any:
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        if isinstance(value, date):
+            return {'d': value.isoformat()}
+        return value
+    
+    payload = json.dumps([encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decodifica um cursor gerado por encode_cursor"""
+    def decode_value(value: Any) -> Any:
+        if isinstance(value, dict):
+            if 'dt' in value:
+                return datetime.fromisoformat(value['dt'])
+            if 'd' in value:
+                return date.fromisoformat(value['d'])
+        return value
+    
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = base64.urlsafe_b64decode((cursor + padding).encode('ascii'))
+        values = json.loads(payload)
+        if not isinstance(values, list):
+            raise ValueError
+        return [decode_value(value) for value in values]
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError("Cursor de paginação inválido")
\ No newline at end of file
@@ -0,0 +1,163 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, List, Optional, Sequence
+from .entities import PRIORITY_CODES, STATUS_CODES
+from .specifications import TaskCriterion, TaskSortKey
+
+# NumPy é opcional: sem ele os mesmos kernels rodam sobre listas Python
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Tarefas sem vencimento: ordinal máximo, nunca atrasadas e sempre no fim
+NO_DUE_DATE = date.max.toordinal()
+
+_COLUMNS = {'status': 'status_codes', 'priority': 'priority_codes', 'due_date': 'due_ordinals'}
+
+
+@dataclass
+class TaskBatch:
+    """Representação colunar das tarefas de um usuário: vetores paralelos por campo
+    
+    Filtros e ordenações produzem vetores de índices; as entidades só são
+    construídas para as tarefas que de fato serão exibidas. Status e
+    prioridade usam os códigos da ordem de negócio (STATUS_CODES e
+    PRIORITY_CODES), os mesmos gravados no banco, e ordenam pelo próprio código.
+    """
+    ids: Sequence[int]
+    status_codes: Sequence[int]
+    priority_codes: Sequence[int]
+    due_ordinals: Sequence[int]
+    created_at: Sequence[float]
+    
+    @classmethod
+    def from_rows(cls, rows: List[tuple]) -> 'TaskBatch':
+        """Monta o lote a partir de linhas (id, código do status, código da prioridade, vencimento, criação)"""
+        ids = [row[0] for row in rows]
+        status_codes = [row[1] for row in rows]
+        priority_codes = [row[2] for row in rows]
+        due_ordinals = [row[3].toordinal() if row[3] else NO_DUE_DATE for row in rows]
+        created_at = [row[4].timestamp() if row[4] else 0.0 for row in rows]
+        
+        if np is not None:
+            return cls(np.array(ids, dtype=np.int64), np.array(status_codes, dtype=np.int8),
+                       np.array(priority_codes, dtype=np.int8), np.array(due_ordinals, dtype=np.int32),
+                       np.array(created_at, dtype=np.float64))
+        return cls(ids, status_codes, priority_codes, due_ordinals, created_at)
+    
+    def __len__(self) -> int:
+        return len(self.ids)
+    
+    def all_indices(self) -> Sequence[int]:
+        """Índices de todas as tarefas do lote"""
+        if np is not None:
+            return np.arange(len(self), dtype=np.int64)
+        return list(range(len(self)))
+    
+    def filter_indices(self, criteria: List[TaskCriterion]) -> Optional[Sequence[int]]:
+        """Índices das tarefas que atendem a todos os critérios; None se algum não é suportado"""
+        if any(criterion.field not in _COLUMNS or criterion.operator not in ('eq', 'ne', 'in', 'lt', 'ge')
+               for criterion in criteria):
+            return None
+        
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+            for criterion in criteria:
+                mask &= self._numpy_mask(criterion)
+            return np.flatnonzero(mask)
+        
+        indices = range(len(self))
+        for criterion in criteria:
+            column = getattr(self, _COLUMNS[criterion.field])
+            test = self._python_test(criterion)
+            indices = [index for index in indices if test(column[index])]
+        return list(indices)
+    
+    def sort_indices(self, indices: Sequence[int], sort_keys: List[TaskSortKey]) -> Optional[Sequence[int]]:
+        """Ordena os índices pelas chaves, com desempate por ID; None se alguma não é suportada"""
+        keys = []
+        for sort_key in sort_keys:
+            values = self._sort_values(sort_key.field)
+            if values is None:
+                return None
+            keys.append((values, sort_key.descending))
+        
+        if np is not None:
+            # lexsort usa a última chave como principal
+            columns = [self.ids[indices]]
+            for values, descending in reversed(keys):
+                column = values[indices]
+                columns.append(-column if descending else column)
+            return indices[np.lexsort(columns)]
+        
+        def sort_key(index: int) -> tuple:
+            return tuple(-values[index] if descending else values[index]
+                         for values, descending in keys) + (self.ids[index],)
+        return sorted(indices, key=sort_key)
+    
+    def take_ids(self, indices: Sequence[int]) -> List[int]:
+        """IDs das tarefas nas posições informadas, na mesma ordem"""
+        if np is not None:
+            return self.ids[indices].tolist()
+        return [self.ids[index] for index in indices]
+    
+    def _sort_values(self, field: str) -> Optional[Sequence[Any]]:
+        """Vetor numérico usado para ordenar pelo campo"""
+        if field == 'status':
+            return self.status_codes
+        if field == 'priority':
+            return self.priority_codes
+        if field == 'due_date':
+            return self.due_ordinals
+        if field == 'created_at':
+            return self.created_at
+        return None
+    
+    def _encode(self, field: str, value: Any) -> int:
+        """Converte um valor do domínio para o código da coluna"""
+        if field == 'status':
+            return STATUS_CODES[value]
+        if field == 'priority':
+            return PRIORITY_CODES[value]
+        return value.toordinal() if value else NO_DUE_DATE
+    
+    def _numpy_mask(self, criterion: TaskCriterion):
+        column = getattr(self, _COLUMNS[criterion.field])
+        if criterion.operator == 'in':
+            return np.isin(column, [self._encode(criterion.field, item) for item in criterion.value])
+        
+        value = self._encode(criterion.field, criterion.value)
+        if criterion.operator == 'eq':
+            mask = column == value
+        elif criterion.operator == 'ne':
+            mask = column != value
+        elif criterion.operator == 'lt':
+            mask = column < value
+        else:
+            mask = column >= value
+        
+        # Como o NULL no SQL, tarefas sem vencimento não atendem a critérios de data
+        if criterion.field == 'due_date':
+            mask &= column != NO_DUE_DATE
+        return mask
+    
+    def _python_test(self, criterion: TaskCriterion):
+        if criterion.operator == 'in':
+            codes = {self._encode(criterion.field, item) for item in criterion.value}
+            return lambda code: code in codes
+        
+        value = self._encode(criterion.field, criterion.value)
+        if criterion.operator == 'eq':
+            test = lambda code: code == value
+        elif criterion.operator == 'ne':
+            test = lambda code: code != value
+        elif criterion.operator == 'lt':
+            test = lambda code: code < value
+        else:
+            test = lambda code: code >= value
+        
+        if criterion.field == 'due_date':
+            return lambda code: code != NO_DUE_DATE and test(code)
+        return test
\ No newline at end of file
@@ -0,0 +1,33 @@
+import threading
+from typing import Callable
+
+
+class PeriodicJob:
+    """Executa uma função periodicamente em uma thread daemon, dentro do contexto da aplicação"""
+    
+    def __init__(self, app, name: str, interval_seconds: float, function: Callable[[], None]):
+        self._app = app
+        self._name = name
+        self._interval_seconds = interval_seconds
+        self._function = function
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def start(self) -> None:
+        """Inicia a execução periódica"""
+        if self._thread is None and self._interval_seconds > 0:
+            self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+            self._thread.start()
+    
+    def stop(self) -> None:
+        """Interrompe a execução periódica"""
+        self._stopped.set()
+    
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            with self._app.app_context():
+                try:
+                    self._function()
+                except Exception as error:
+                    # Falhas do job não derrubam a aplicação; tenta de novo no próximo ciclo
+                    self._app.logger.warning(f"Job {self._name} falhou: {error}")
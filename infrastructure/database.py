@@ -1,28 +1,261 @@
+import random
+import sqlite3
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, Enum as SQLEnum
+from flask_sqlalchemy.session import Session
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import (
+    Column, Integer, SmallInteger, String, Text, DateTime, Date, Boolean, Index, Select, text, event,
+    inspect as sa_inspect
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 import enum
+from domain import entities
+
+def _unicode_lower(value: Any) -> Any:
+    return None if value is None else str(value).lower()
+
+
+def _register_sql_functions(dbapi_connection, connection_record) -> None:
+    """Troca o lower() do SQLite, que só converte ASCII, pelo str.lower do Python
+    
+    Assim lower(title) nos índices e no ORDER BY ordena 'Água' e 'Éxito' como
+    a ordenação em memória (AlphabeticalSortStrategy), e o cursor de uma
+    página lida no banco continua válido na outra. Determinística, para
+    poder ser usada em índices de expressão.
+    """
+    dbapi_connection.create_function('lower', 1, _unicode_lower, deterministic=True)
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """Perfil de engine: pragmas de cada conexão SQLite e pool de conexões
+    
+    Os pragmas valem só para SQLite e são reaplicados a cada conexão aberta
+    pelo pool; as opções do pool valem para qualquer banco.
+    """
+    name: str
+    pragmas: Tuple[Tuple[str, Any], ...]
+    poolclass: type = QueuePool
+    pool_options: Dict[str, Any] = field(default_factory=dict)
+    
+    def engine_options(self, database_uri: str) -> Dict[str, Any]:
+        """Opções de create_engine do perfil para o banco informado
+        
+        SQLite em memória mantém o pool padrão do Flask-SQLAlchemy (StaticPool):
+        cada conexão nova seria um banco vazio.
+        """
+        url = make_url(database_uri)
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            return {}
+        return {'poolclass': self.poolclass, **self.pool_options}
+    
+    def configure(self, engine) -> None:
+        """Aplica os pragmas do perfil e as funções SQL a cada nova conexão SQLite da engine"""
+        if engine.dialect.name != 'sqlite':
+            return
+        event.listen(engine, 'connect', _register_sql_functions)
+        if self.pragmas:
+            event.listen(engine, 'connect', self._apply_pragmas)
+    
+    def _apply_pragmas(self, dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+
+# Perfis de engine disponíveis em DATABASE_PROFILE
+ENGINE_PROFILES = {
+    # Padrões do SQLite (rollback journal, fsync a cada commit), apenas esperando por locks
+    'dev': EngineProfile(
+        'dev',
+        pragmas=(('busy_timeout', 5000),),
+        pool_options={'pool_timeout': 20, 'pool_recycle': -1, 'pool_pre_ping': True}
+    ),
+    # WAL: leitores não bloqueiam o escritor e synchronous=NORMAL só faz fsync nos
+    # checkpoints, sem risco de corromper o banco; mmap e cache maiores poupam leituras
+    'prod-sqlite': EngineProfile(
+        'prod-sqlite',
+        pragmas=(('journal_mode', 'WAL'), ('synchronous', 'NORMAL'), ('mmap_size', 256 * 1024 * 1024),
+                 ('cache_size', -64 * 1024), ('busy_timeout', 5000), ('temp_store', 'MEMORY')),
+        pool_options={'pool_size': 8, 'max_overflow': 8, 'pool_timeout': 20, 'pool_recycle': -1}
+    ),
+    # Cargas em massa: sem fsync (uma queda pode perder as últimas transações) e uma
+    # única conexão no pool, que enfileira os escritores sem disputar o lock do arquivo
+    'bulk-load': EngineProfile(
+        'bulk-load',
+        pragmas=(('journal_mode', 'WAL'), ('synchronous', 'OFF'), ('mmap_size', 1024 * 1024 * 1024),
+                 ('cache_size', -256 * 1024), ('busy_timeout', 30000), ('temp_store', 'MEMORY')),
+        pool_options={'pool_size': 1, 'max_overflow': 0, 'pool_timeout': 60, 'pool_recycle': -1}
+    ),
+}
+
+DEFAULT_ENGINE_PROFILE = 'dev'
+
+
+# Chave de Session.info que libera as leituras da sessão atual para as réplicas
+READ_REPLICA_ALLOWED = 'read_replica_allowed'
+
+# Chave de app.extensions com os binds de leitura (réplicas) da aplicação
+READ_BINDS_EXTENSION = 'database_read_binds'
+
+# Chave de Session.info com o shard de tarefas em uso e chave de app.extensions com os
+# binds dos shards; enquanto há shard ativo, as tabelas por usuário vão para ele
+ACTIVE_SHARD = 'active_task_shard'
+SHARD_BINDS_EXTENSION = 'database_shard_binds'
+SHARDED_TABLES = ('tasks', 'tasks_archive', 'user_task_stats', 'command_journal')
+
+
+class RoutingSession(Session):
+    """Sessão que envia as leituras a uma réplica enquanto a requisição permite
+    
+    Só SELECTs fora de flush vão à réplica, sempre a mesma durante a sessão.
+    Qualquer outra instrução fixa a sessão no primário até o fim, de modo
+    que a requisição sempre lê o que ela mesma acabou de gravar. Com um
+    shard ativo, as instruções sobre as tabelas por usuário vão para ele.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        shard = self.info.get(ACTIVE_SHARD)
+        if bind is None and shard is not None:
+            if mapper is None or sa_inspect(mapper).local_table.name in SHARDED_TABLES:
+                return self._db.engines[shard]
+        
+        if bind is None and self.info.get(READ_REPLICA_ALLOWED):
+            if isinstance(clause, Select) and not self._flushing:
+                replica = db_connection.read_engine(self)
+                if replica is not None:
+                    return replica
+            else:
+                self.info[READ_REPLICA_ALLOWED] = False
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _set_query_only(dbapi_connection, connection_record) -> None:
+    """Réplicas SQLite recusam escritas: uma escrita roteada por engano falha em vez de divergir"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('PRAGMA query_only=1')
+    finally:
+        cursor.close()
+
 
 # Singleton para instância do banco de dados
 class DatabaseConnection:
-    """Singleton para gerenciar a conexão com o banco de dados"""
+    """Singleton para gerenciar a conexão com o banco de dados
+    
+    Além do bind primário, que recebe todas as escritas, pode manter binds
+    de leitura (réplicas) configurados em DATABASE_READ_URLS e binds de
+    shards de tarefas configurados em DATABASE_SHARD_URLS.
+    """
     _instance = None
     _db = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DatabaseConnection, cls).__new__(cls)
-            cls._db = SQLAlchemy()
+            cls._db = SQLAlchemy(session_options={'class_': RoutingSession})
         return cls._instance
     
     @property
     def db(self):
         return self._db
     
-    def init_app(self, app):
-        """Inicializa o banco com a aplicação Flask"""
+    def init_app(self, app, profile: Optional[str] = None):
+        """Inicializa o banco com a aplicação Flask, aplicando o perfil de engine
+        
+        O perfil vem de DATABASE_PROFILE (padrão 'dev'); opções informadas em
+        SQLALCHEMY_ENGINE_OPTIONS prevalecem sobre as do perfil.
+        """
+        engine_profile = self.profile(profile or app.config.get('DATABASE_PROFILE', DEFAULT_ENGINE_PROFILE))
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+            **engine_profile.engine_options(app.config['SQLALCHEMY_DATABASE_URI']),
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        }
+        
+        # Cada réplica e cada shard vira um bind próprio do Flask-SQLAlchemy, sem modelos associados
+        read_urls = app.config.get('DATABASE_READ_URLS') or []
+        shard_urls = app.config.get('DATABASE_SHARD_URLS') or []
+        read_binds = [f'read_{number}' for number in range(len(read_urls))]
+        shard_binds = [f'shard_{number}' for number in range(len(shard_urls))]
+        app.config['SQLALCHEMY_BINDS'] = {
+            **app.config.get('SQLALCHEMY_BINDS', {}), **dict(zip(read_binds, read_urls)), **dict(zip(shard_binds, shard_urls))
+        }
+        app.extensions[READ_BINDS_EXTENSION] = read_binds
+        app.extensions[SHARD_BINDS_EXTENSION] = shard_binds
         self._db.init_app(app)
+        
+        with app.app_context():
+            engine_profile.configure(self._db.engine)
+            for bind_key in shard_binds:
+                engine_profile.configure(self._db.engines[bind_key])
+            for bind_key in read_binds:
+                engine = self._db.engines[bind_key]
+                engine_profile.configure(engine)
+                if engine.dialect.name == 'sqlite':
+                    event.listen(engine, 'connect', _set_query_only)
+    
+    def read_engines(self) -> List[Any]:
+        """Engines das réplicas de leitura da aplicação atual"""
+        return [self._db.engines[bind_key] for bind_key in current_app.extensions.get(READ_BINDS_EXTENSION, [])]
+    
+    def shard_binds(self) -> List[str]:
+        """Binds dos shards de tarefas da aplicação atual, na ordem configurada"""
+        return list(current_app.extensions.get(SHARD_BINDS_EXTENSION, []))
+    
+    def engine_for(self, bind_key: Optional[str]):
+        """Engine de um bind pelo nome; None é o primário"""
+        return self._db.engines[bind_key]
+    
+    def read_engine(self, session: Session):
+        """Réplica usada pela sessão, sorteada na primeira leitura; None sem réplicas"""
+        read_binds = current_app.extensions.get(READ_BINDS_EXTENSION)
+        if not read_binds:
+            return None
+        return self._db.engines[session.info.setdefault('read_bind', random.choice(read_binds))]
+    
+    def allow_replica_reads(self, allowed: bool) -> None:
+        """Libera ou não as leituras da sessão atual para as réplicas (o padrão é o primário)"""
+        self._db.session.info[READ_REPLICA_ALLOWED] = allowed
+    
+    def sync_read_replicas(self) -> int:
+        """Copia o banco primário sobre as réplicas SQLite com a API de backup
+        
+        Simula localmente a replicação; réplicas de outros bancos são mantidas
+        pelo próprio servidor e ficam de fora. Retorna o número de réplicas copiadas.
+        """
+        replicas = [engine for engine in self.read_engines()
+                    if engine.dialect.name == 'sqlite' and engine.url.database not in (None, '', ':memory:')]
+        if not replicas or self._db.engine.dialect.name != 'sqlite':
+            return 0
+        
+        source = self._db.engine.raw_connection()
+        try:
+            for engine in replicas:
+                # Conexão própria: as do pool da réplica são somente leitura
+                target = sqlite3.connect(engine.url.database)
+                try:
+                    source.driver_connection.backup(target)
+                finally:
+                    target.close()
+        finally:
+            source.close()
+        return len(replicas)
+    
+    @staticmethod
+    def profile(name: str) -> EngineProfile:
+        """Obtém um perfil de engine pelo nome"""
+        if name not in ENGINE_PROFILES:
+            raise ValueError(f"Perfil de banco desconhecido: {name} (disponíveis: {', '.join(ENGINE_PROFILES)})")
+        return ENGINE_PROFILES[name]
 
 
 # Instância singleton do banco
@@ -45,6 +278,29 @@ class TaskStatusEnum(enum.Enum):
     CANCELLED = "cancelada"
 
 
+# Mesma ordem de negócio do domínio: a posição de cada membro é o código gravado no banco,
+# de modo que ORDER BY na própria coluna já sai de urgente → baixa e pendente → cancelada
+PRIORITY_ORDER = tuple(PriorityEnum[priority.name] for priority in entities.PRIORITY_ORDER)
+STATUS_ORDER = tuple(TaskStatusEnum[status.name] for status in entities.STATUS_ORDER)
+
+
+class CodedEnum(TypeDecorator):
+    """Enum gravado como inteiro pequeno: o código é a posição do membro em order"""
+    impl = SmallInteger
+    cache_ok = True
+    
+    def __init__(self, order: tuple):
+        super().__init__()
+        self.order = order
+        self._codes = {member: code for code, member in enumerate(order)}
+    
+    def process_bind_param(self, value, dialect):
+        return None if value is None else self._codes[value]
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else self.order[value]
+
+
 # Modelos do banco de dados
 class UserModel(db.Model):
     """Modelo de banco para usuários"""
@@ -55,6 +311,9 @@ class UserModel(db.Model):
     password_hash = Column(String(255), nullable=False)
     created_at = Column(DateTime, nullable=False, default=func.now())
     
+    # Shard que guarda as tarefas do usuário (DATABASE_SHARD_URLS); NULL sem sharding
+    shard = Column(String(40))
+    
     # Relacionamento com tarefas
     tasks = db.relationship('TaskModel', backref='user', lazy=True, cascade='all, delete-orphan')
     
@@ -62,21 +321,167 @@ class UserModel(db.Model):
         return f'<User {self.email}>'
 
 
+# Expressões de ordenação compartilhadas por consultas e índices: o SQLite só usa um
+# índice de expressão quando a consulta repete exatamente a mesma expressão. No
+# SQLite, lower() é o str.lower do Python (_register_sql_functions)
+DUE_DATE_MISSING_SQL = "CASE WHEN due_date IS NULL THEN 1 ELSE 0 END"
+TITLE_SORT_SQL = "lower(title)"
+
+
+def _index_columns(expressions: tuple) -> list:
+    """Colunas de um índice: nomes simples ou expressões SQL"""
+    return [text(expression) if ' ' in expression or '(' in expression else expression
+            for expression in expressions]
+
+
+def _live_tasks_index(name: str, *expressions) -> Index:
+    """Índice parcial só das tarefas vivas, que são as únicas lidas pelas consultas
+    
+    Cada índice termina implicitamente no rowid (o id), que é o desempate de
+    todas as ordenações, então ORDER BY ..., id também sai direto do índice.
+    """
+    return Index(name, *_index_columns(expressions),
+                 sqlite_where=text('deleted_at IS NULL'), postgresql_where=text('deleted_at IS NULL'))
+
+
 class TaskModel(db.Model):
     """Modelo de banco para tarefas"""
     __tablename__ = 'tasks'
+    __table_args__ = (
+        # Índices parciais: leituras só enxergam tarefas vivas; a limpeza só lápides
+        _live_tasks_index('ix_tasks_user_live', 'user_id'),
+        Index('ix_tasks_deleted_at', 'deleted_at',
+              sqlite_where=text('deleted_at IS NOT NULL'), postgresql_where=text('deleted_at IS NOT NULL')),
+        
+        # Filtros do repositório (find_by_*, atrasadas) e o GROUP BY dos contadores; com os
+        # códigos na ordem de negócio, os de status e prioridade também servem às ordenações
+        _live_tasks_index('ix_tasks_user_status_priority', 'user_id', 'status', 'priority'),
+        _live_tasks_index('ix_tasks_user_status', 'user_id', 'status'),
+        _live_tasks_index('ix_tasks_user_priority', 'user_id', 'priority'),
+        _live_tasks_index('ix_tasks_user_due_date', 'user_id', 'due_date'),
+        
+        # Demais ordenações do dashboard, na mesma forma de _sort_key_to_sql
+        _live_tasks_index('ix_tasks_user_created', 'user_id', 'created_at DESC'),
+        _live_tasks_index('ix_tasks_user_due_order', 'user_id', DUE_DATE_MISSING_SQL, 'due_date'),
+        _live_tasks_index('ix_tasks_user_priority_due', 'user_id', 'priority', DUE_DATE_MISSING_SQL, 'due_date'),
+        _live_tasks_index('ix_tasks_user_title_unicode', 'user_id', TITLE_SORT_SQL),
+        
+        # Seleção do arquivamento: concluídas pela data da conclusão (updated_at)
+        _live_tasks_index('ix_tasks_status_updated', 'status', 'updated_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(200), nullable=False)
-    description = Column(Text)
-    priority = Column(SQLEnum(PriorityEnum), nullable=False, default=PriorityEnum.MEDIUM)
+    # Texto livre e sem limite: carregado só quando pedido (projeção DETAIL)
+    description = deferred(Column(Text))
+    priority = Column(CodedEnum(PRIORITY_ORDER), nullable=False, default=PriorityEnum.MEDIUM)
     due_date = Column(Date)
-    status = Column(SQLEnum(TaskStatusEnum), nullable=False, default=TaskStatusEnum.PENDING)
+    status = Column(CodedEnum(STATUS_ORDER), nullable=False, default=TaskStatusEnum.PENDING)
     created_at = Column(DateTime, nullable=False, default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
     
+    # Lápide da remoção lógica; NULL indica tarefa viva
+    deleted_at = Column(DateTime)
+    
     # Foreign Key para usuário
     user_id = Column(Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     
     def __repr__(self):
-        return f'<Task {self.title} - {self.status.value}>' 
\ No newline at end of file
+        return f'<Task {self.title} - {self.status.value}>'
+
+
+class TaskArchiveModel(db.Model):
+    """Tarefas concluídas há mais tempo que a retenção, fora da tabela quente
+    
+    Mesmas colunas de TaskModel, exceto a lápide: só tarefas vivas são
+    arquivadas, e qualquer escrita devolve a tarefa para tasks antes.
+    """
+    __tablename__ = 'tasks_archive'
+    __table_args__ = (
+        # Mesmas expressões dos índices de ordenação de tasks; o arquivo só recebe lotes
+        # do arquivamento, então não são parciais
+        Index('ix_tasks_archive_user', 'user_id'),
+        Index('ix_tasks_archive_user_status_priority', 'user_id', 'status', 'priority'),
+        Index('ix_tasks_archive_user_status', 'user_id', 'status'),
+        Index('ix_tasks_archive_user_priority', 'user_id', 'priority'),
+        Index('ix_tasks_archive_user_due_date', 'user_id', 'due_date'),
+        Index('ix_tasks_archive_user_created', *_index_columns(('user_id', 'created_at DESC'))),
+        Index('ix_tasks_archive_user_due_order', *_index_columns(('user_id', DUE_DATE_MISSING_SQL, 'due_date'))),
+        Index('ix_tasks_archive_user_priority_due',
+              *_index_columns(('user_id', 'priority', DUE_DATE_MISSING_SQL, 'due_date'))),
+        Index('ix_tasks_archive_user_title_unicode', *_index_columns(('user_id', TITLE_SORT_SQL))),
+    )
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String(200), nullable=False)
+    description = deferred(Column(Text))
+    priority = Column(CodedEnum(PRIORITY_ORDER), nullable=False)
+    due_date = Column(Date)
+    status = Column(CodedEnum(STATUS_ORDER), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime)
+    user_id = Column(Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    # Momento em que a tarefa saiu da tabela quente
+    archived_at = Column(DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ArchivedTask {self.title} - {self.status.value}>'
+
+
+# Colunas copiadas entre tasks e tasks_archive ao arquivar e ao desarquivar
+ARCHIVED_TASK_COLUMNS = [column.name for column in TaskArchiveModel.__table__.columns if column.name != 'archived_at']
+
+
+class UserTaskStatsModel(db.Model):
+    """Contadores de tarefas por usuário, mantidos incrementalmente a cada escrita"""
+    __tablename__ = 'user_task_stats'
+    
+    user_id = Column(Integer, db.ForeignKey('users.id'), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    
+    # Contadores por status (nomes de TaskStatusEnum em minúsculas)
+    pending = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+    
+    # Contadores por prioridade (nomes de PriorityEnum em minúsculas)
+    low = Column(Integer, nullable=False, default=0)
+    medium = Column(Integer, nullable=False, default=0)
+    high = Column(Integer, nullable=False, default=0)
+    urgent = Column(Integer, nullable=False, default=0)
+    
+    # Versão dos dados do usuário, avançada a cada comando de escrita (ETag)
+    version = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<UserTaskStats {self.user_id} - {self.total}>'
+
+
+class CommandJournalModel(db.Model):
+    """Journal dos comandos de cada usuário (histórico de undo/redo)
+    
+    Não é append-only: comandos novos são acrescentados, mas undo e redo
+    alteram a coluna undone do próprio registro, e um comando novo apaga os
+    registros desfeitos, como a pilha de redo em memória.
+    """
+    __tablename__ = 'command_journal'
+    __table_args__ = (
+        Index('ix_command_journal_user_seq', 'user_id', 'seq', unique=True),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, db.ForeignKey('users.id'), nullable=False)
+    seq = Column(Integer, nullable=False)
+    command_type = Column(String(40), nullable=False)
+    
+    # Estado do comando serializado em JSON compacto
+    payload = Column(Text, nullable=False)
+    
+    # Alterada no lugar por undo/redo, sem novo registro
+    undone = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, nullable=False, default=func.now())
+    
+    def __repr__(self):
+        return f'<CommandJournal {self.user_id}#{self.seq} {self.command_type}>'
\ No newline at end of file
@@ -0,0 +1,196 @@
+from sqlalchemy import inspect, text, String
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+from .database import TaskModel, TaskArchiveModel, PRIORITY_ORDER, STATUS_ORDER
+
+
+# Colunas acrescentadas a tabelas já existentes: (tabela, coluna, DDL)
+ADDED_COLUMNS = [
+    ('tasks', 'deleted_at', 'DATETIME'),
+    ('user_task_stats', 'version', 'INTEGER NOT NULL DEFAULT 0'),
+    ('users', 'shard', 'VARCHAR(40)'),
+]
+
+# Colunas de enum gravadas pelo nome até passarem a códigos inteiros na ordem de negócio
+CODED_ENUM_COLUMNS = [('priority', PRIORITY_ORDER), ('status', STATUS_ORDER)]
+
+# Índices sobre expressões de posto dos nomes, substituídos pelos índices sobre os códigos
+REPLACED_INDEXES = ['ix_tasks_user_priority_rank', 'ix_tasks_user_status_rank', 'ix_tasks_user_priority_due']
+
+# Índices de lower(title) calculados com o lower() ASCII do SQLite, recriados com outro nome
+ASCII_TITLE_INDEXES = ['ix_tasks_user_title', 'ix_tasks_archive_user_title']
+
+# Linhas lidas por índice ao coletar as estatísticas do otimizador
+ANALYSIS_ROW_LIMIT = 1000
+
+# Índice de busca textual (SQLite FTS5) com título e descrição das tarefas vivas.
+# Sem conteúdo próprio: guarda só o índice invertido. A coluna owner traz um
+# token por usuário ('u<id>'), de modo que a busca cruza as listas do termo e do
+# dono no próprio índice, sem varrer os resultados de outros usuários.
+SEARCH_INDEX_TABLE = 'tasks_fts'
+
+# Tamanhos de prefixo com lista própria no índice: um prefixo desses é lido como um
+# único termo, enquanto os demais juntam as listas de todos os termos que o começam
+SEARCH_INDEX_PREFIXES = (3, 4, 5, 6)
+
+_SEARCH_INDEX_ROW = "{row}.id, {row}.title, coalesce({row}.description, ''), 'u' || {row}.user_id"
+
+SEARCH_INDEX_DDL = [
+    f"""CREATE VIRTUAL TABLE {SEARCH_INDEX_TABLE} USING fts5(
+        title, description, owner,
+        content='', prefix='{' '.join(map(str, SEARCH_INDEX_PREFIXES))}', tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks WHEN new.deleted_at IS NULL BEGIN
+        INSERT INTO {SEARCH_INDEX_TABLE}(rowid, title, description, owner)
+        VALUES ({_SEARCH_INDEX_ROW.format(row='new')});
+    END""",
+    f"""CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks WHEN old.deleted_at IS NULL BEGIN
+        INSERT INTO {SEARCH_INDEX_TABLE}({SEARCH_INDEX_TABLE}, rowid, title, description, owner)
+        VALUES ('delete', {_SEARCH_INDEX_ROW.format(row='old')});
+    END""",
+    # Remoção lógica e restauração também tiram e recolocam a tarefa no índice
+    f"""CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description, user_id, deleted_at ON tasks BEGIN
+        INSERT INTO {SEARCH_INDEX_TABLE}({SEARCH_INDEX_TABLE}, rowid, title, description, owner)
+        SELECT 'delete', {_SEARCH_INDEX_ROW.format(row='old')} WHERE old.deleted_at IS NULL;
+        INSERT INTO {SEARCH_INDEX_TABLE}(rowid, title, description, owner)
+        SELECT {_SEARCH_INDEX_ROW.format(row='new')} WHERE new.deleted_at IS NULL;
+    END""",
+]
+
+
+def upgrade_schema(database, engine=None) -> None:
+    """Atualiza um banco criado por versões anteriores
+    
+    create_all só cria tabelas que não existem; colunas novas e índices de
+    tabelas existentes são acrescentados aqui. engine escolhe outro banco
+    que não o primário (um shard de tarefas, que só tem parte das tabelas).
+    """
+    engine = engine or database.engine
+    inspector = inspect(engine)
+    
+    with engine.begin() as connection:
+        for table, column, ddl in ADDED_COLUMNS:
+            if not inspector.has_table(table):
+                continue
+            existing_columns = {info['name'] for info in inspector.get_columns(table)}
+            if column not in existing_columns:
+                connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+    
+    task_columns = {info['name']: info['type'] for info in inspector.get_columns('tasks')}
+    if any(isinstance(task_columns[column], String) for column, _ in CODED_ENUM_COLUMNS):
+        migrate_coded_enums(engine)
+        inspector = inspect(engine)
+    
+    with engine.begin() as connection:
+        for index_name in ASCII_TITLE_INDEXES:
+            connection.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+        
+        # IF NOT EXISTS em vez de checkfirst: o SQLAlchemy não reflete índices de expressão
+        for model in (TaskModel, TaskArchiveModel):
+            if inspector.has_table(model.__tablename__):
+                for index in model.__table__.indexes:
+                    connection.execute(CreateIndex(index, if_not_exists=True))
+    
+    if engine.dialect.name == 'sqlite' and inspector.has_table(SEARCH_INDEX_TABLE) and search_index_outdated(engine):
+        drop_search_index(engine)
+        inspector = inspect(engine)
+    if engine.dialect.name == 'sqlite' and not inspector.has_table(SEARCH_INDEX_TABLE):
+        create_search_index(engine)
+    
+    if engine.dialect.name == 'sqlite':
+        refresh_planner_statistics(engine)
+
+
+def migrate_coded_enums(engine) -> None:
+    """Converte status e prioridade gravados pelo nome para os códigos inteiros
+    
+    O SQLite não altera o tipo de uma coluna: a tabela é reconstruída já com
+    os índices atuais, e os gatilhos e o índice de busca são recriados em
+    seguida por upgrade_schema. Nos demais bancos basta um ALTER COLUMN ... USING.
+    """
+    codes = {column: _code_case(order) for column, order in CODED_ENUM_COLUMNS}
+    table = TaskModel.__table__
+    
+    with engine.begin() as connection:
+        if engine.dialect.name != 'sqlite':
+            for index_name in REPLACED_INDEXES:
+                connection.execute(text(f'DROP INDEX IF EXISTS {index_name}'))
+            for column, _ in CODED_ENUM_COLUMNS:
+                connection.execute(text(
+                    f'ALTER TABLE tasks ALTER COLUMN {column} TYPE SMALLINT USING ({codes[column].format(value=f"{column}::text")})'
+                ))
+            return
+        
+        # Índices e gatilhos acompanhariam a tabela renomeada; saem antes, com o índice de busca
+        for kind, name in connection.execute(text(
+            "SELECT type, name FROM sqlite_master WHERE tbl_name = 'tasks' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )).all():
+            connection.execute(text(f'DROP {kind.upper()} {name}'))
+        connection.execute(text(f'DROP TABLE IF EXISTS {SEARCH_INDEX_TABLE}'))
+        
+        connection.execute(text('ALTER TABLE tasks RENAME TO tasks_legacy'))
+        table.create(connection)
+        
+        columns = [column.name for column in table.columns]
+        values = [codes[name].format(value=name) if name in codes else name for name in columns]
+        connection.execute(text(
+            f"INSERT INTO tasks ({', '.join(columns)}) SELECT {', '.join(values)} FROM tasks_legacy"
+        ))
+        connection.execute(text('DROP TABLE tasks_legacy'))
+
+
+def _code_case(order: tuple) -> str:
+    """CASE que converte o nome gravado de um enum no seu código; {value} é o valor lido"""
+    branches = ' '.join(f"WHEN '{member.name}' THEN {code}" for code, member in enumerate(order))
+    return f'CASE {{value}} {branches} END'
+
+
+def refresh_planner_statistics(engine) -> None:
+    """Atualiza as estatísticas do otimizador do SQLite (sqlite_stat1)
+    
+    Sem elas o planejador não sabe quão seletivo é cada índice e troca o
+    índice da ordenação por um filtro pouco seletivo seguido de ordenação
+    temporária. analysis_limit limita a amostra, então o custo não cresce
+    com a tabela.
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f'PRAGMA analysis_limit={ANALYSIS_ROW_LIMIT}'))
+        connection.execute(text('ANALYZE'))
+
+
+def search_index_outdated(engine) -> bool:
+    """Verifica se o índice FTS5 foi criado com outra definição (como outros prefixos)"""
+    with engine.connect() as connection:
+        created_with = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"
+        ), {'name': SEARCH_INDEX_TABLE}).scalar()
+    return ' '.join(created_with.split()) != ' '.join(SEARCH_INDEX_DDL[0].split())
+
+
+def drop_search_index(engine) -> None:
+    """Remove o índice FTS5 e seus gatilhos, para recriá-los com a definição atual"""
+    with engine.begin() as connection:
+        for (name,) in connection.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE :pattern"
+        ), {'pattern': f'{SEARCH_INDEX_TABLE}_%'}).all():
+            connection.execute(text(f'DROP TRIGGER {name}'))
+        connection.execute(text(f'DROP TABLE {SEARCH_INDEX_TABLE}'))
+
+
+def create_search_index(engine) -> bool:
+    """Cria o índice FTS5 e os gatilhos, indexando as tarefas já existentes
+    
+    Retorna False se o SQLite não tiver FTS5; a busca usa LIKE nesse caso.
+    """
+    try:
+        with engine.begin() as connection:
+            for ddl in SEARCH_INDEX_DDL:
+                connection.execute(text(ddl))
+            connection.execute(text(
+                f"INSERT INTO {SEARCH_INDEX_TABLE}(rowid, title, description, owner) "
+                f"SELECT {_SEARCH_INDEX_ROW.format(row='tasks')} FROM tasks WHERE tasks.deleted_at IS NULL"
+            ))
+    except OperationalError as error:
+        print(f"Busca textual sem FTS5 ({error.orig}); usando LIKE")
+        return False
+    return True
\ No newline at end of file
@@ -0,0 +1,259 @@
+import os
+import random
+import re
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from flask import Flask
+from sqlalchemy import event
+from domain.entities import TaskStatus
+from domain.specifications import TaskCriterion, TaskSortKey
+from .database import db_connection, db, TaskModel, TaskArchiveModel, UserModel, PriorityEnum, TaskStatusEnum
+from .migrations import upgrade_schema, refresh_planner_statistics
+from .repositories import TaskRepositoryImpl
+
+
+# Trechos do EXPLAIN QUERY PLAN que indicam consulta sem índice adequado
+FULL_SCAN_PREFIX = 'SCAN '
+TEMP_SORT_MARKER = 'USE TEMP B-TREE'
+
+# CTEs materializadas, cuja varredura lê só as linhas que a própria CTE já buscou
+MATERIALIZE_PREFIX = 'MATERIALIZE '
+
+# Restrições aplicadas pelo índice: "SEARCH tasks USING INDEX ix (user_id=? AND due_date>?)"
+SEARCH_CONSTRAINTS = re.compile(r'\(([^()]*\?)\)$')
+
+# Tarefas de exemplo inseridas por comando, para semear bancos grandes com memória limitada
+SEED_INSERT_CHUNK = 10000
+
+
+@dataclass
+class QueryPlanReport:
+    """Plano de execução de uma consulta emitida pelo repositório"""
+    name: str
+    statement: str
+    plan: List[str]
+    problems: List[str] = field(default_factory=list)
+    
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+class QueryPlanChecker:
+    """Captura as consultas de um trecho de código e verifica o plano de cada uma"""
+    
+    def __init__(self, engine):
+        self._engine = engine
+        self._captured: List[Tuple[str, str, object]] = []
+        self._current_name = None
+        event.listen(engine, 'before_cursor_execute', self._capture)
+    
+    def close(self) -> None:
+        event.remove(self._engine, 'before_cursor_execute', self._capture)
+    
+    def _capture(self, connection, cursor, statement, parameters, context, executemany) -> None:
+        if self._current_name is None or executemany:
+            return
+        if statement.lstrip().split(' ', 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE', 'WITH'):
+            self._captured.append((self._current_name, statement, parameters))
+    
+    @contextmanager
+    def capture(self, name: str) -> Iterator[None]:
+        """Registra sob o nome informado as consultas executadas no bloco"""
+        self._current_name = name
+        try:
+            yield
+        finally:
+            self._current_name = None
+    
+    def reports(self) -> List[QueryPlanReport]:
+        """Roda EXPLAIN QUERY PLAN em cada consulta capturada"""
+        reports = []
+        with self._engine.connect() as connection:
+            for name, statement, parameters in self._captured:
+                rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+                plan = [row[-1] for row in rows]
+                reports.append(QueryPlanReport(name, statement, plan, self._problems(plan)))
+        return reports
+    
+    def _problems(self, plan: List[str]) -> List[str]:
+        """Linhas do plano com varredura completa de tabela ou ordenação em B-tree temporária
+        
+        A ordenação temporária só é aceita quando o índice já restringe a busca
+        por uma coluna de filtro além do usuário: o otimizador preferiu ordenar
+        apenas as linhas do filtro a percorrer todas as do usuário. Varrer uma
+        CTE materializada não conta, pois a busca dela aparece no próprio plano.
+        """
+        narrowed = any(self._is_filtered_search(line) for line in plan)
+        materialized = {line[len(MATERIALIZE_PREFIX):] for line in plan if line.startswith(MATERIALIZE_PREFIX)}
+        problems = []
+        for line in plan:
+            if line.startswith(FULL_SCAN_PREFIX):
+                if line[len(FULL_SCAN_PREFIX):] not in materialized:
+                    problems.append(line)
+            elif TEMP_SORT_MARKER in line and not narrowed:
+                problems.append(line)
+        return problems
+    
+    def _is_filtered_search(self, line: str) -> bool:
+        """Indica se a linha do plano é uma busca por índice que restringe mais que o usuário"""
+        match = SEARCH_CONSTRAINTS.search(line)
+        if not line.startswith('SEARCH ') or match is None:
+            return False
+        columns = {re.split(r'[=<>]', constraint, 1)[0] for constraint in match.group(1).split(' AND ')}
+        return bool(columns - {'user_id', 'rowid'})
+
+
+@contextmanager
+def seeded_database(users: int = 20, tasks_per_user: int = 250, seed: int = 18,
+                    completed_ratio: Optional[float] = None,
+                    description_length: Optional[int] = None,
+                    profile: Optional[str] = None) -> Iterator[List[int]]:
+    """Banco SQLite temporário com o esquema atual e tarefas de exemplo
+    
+    Ativa o contexto de uma aplicação própria, de modo que o repositório
+    trabalhe sobre esse banco e nunca sobre o da aplicação. Retorna os IDs
+    dos usuários criados. completed_ratio fixa a fração de tarefas
+    concluídas; sem ele o status é sorteado entre todos. description_length
+    fixa o tamanho das descrições, que sem ele variam até 800 caracteres.
+    profile escolhe o perfil de engine (padrão 'dev').
+    """
+    generator = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(directory, 'plans.db')
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db_connection.init_app(app, profile)
+        
+        with app.app_context():
+            db.create_all(bind_key=None)
+            
+            user_ids = []
+            today = date.today()
+            for index in range(users):
+                user = UserModel(email=f'plans{index}@example.com', password_hash='-')
+                db.session.add(user)
+                db.session.flush()
+                user_ids.append(user.id)
+                
+                rows = []
+                for number in range(tasks_per_user):
+                    due_date = generator.choice([None, today + timedelta(days=generator.randint(-30, 30))])
+                    deleted_at = datetime.now() - timedelta(days=30) if generator.random() < 0.05 else None
+                    if completed_ratio is None:
+                        status = generator.choice(list(TaskStatusEnum))
+                    elif generator.random() < completed_ratio:
+                        status = TaskStatusEnum.COMPLETED
+                    else:
+                        status = generator.choice([TaskStatusEnum.PENDING, TaskStatusEnum.IN_PROGRESS])
+                    created_at = datetime.now() - timedelta(minutes=generator.randint(0, 10 ** 5))
+                    description = 'Descrição ' * generator.randint(1, 80)
+                    if description_length is not None:
+                        description = (description * (description_length // len(description) + 1))[:description_length]
+                    rows.append({
+                        'title': f'Tarefa {number} de exemplo', 'description': description,
+                        'priority': generator.choice(list(PriorityEnum)), 'status': status,
+                        'due_date': due_date, 'created_at': created_at, 'updated_at': created_at,
+                        'user_id': user.id, 'deleted_at': deleted_at
+                    })
+                    if len(rows) == SEED_INSERT_CHUNK:
+                        db.session.execute(TaskModel.__table__.insert(), rows)
+                        rows = []
+                if rows:
+                    db.session.execute(TaskModel.__table__.insert(), rows)
+            db.session.commit()
+            
+            # Índice de busca e estatísticas do otimizador, como no banco real; criado depois
+            # das tarefas, o índice de busca é montado de uma vez em vez de gatilho a gatilho
+            upgrade_schema(db)
+            try:
+                yield user_ids
+            finally:
+                db.session.remove()
+                db.engine.dispose()
+
+
+def check_repository_query_plans(filters: Dict[str, List[TaskCriterion]],
+                                 sorts: Dict[str, List[TaskSortKey]], user_id: int) -> List[QueryPlanReport]:
+    """Verifica os planos das consultas do repositório de tarefas
+    
+    Roda sobre o banco já semeado da aplicação ativa (seeded_database), com
+    as tarefas de user_id. Cobre as buscas por campo, a listagem e a
+    paginação (primeira página e com cursor) para cada combinação de filtro
+    e ordenação informada, os contadores, as escritas condicionais, o
+    arquivamento e a limpeza de lápides. As consultas rodam com parte das
+    concluídas já arquivada.
+    """
+    repository = TaskRepositoryImpl()
+    checker = QueryPlanChecker(db.engine)
+    
+    try:
+        with checker.capture('archive_completed'):
+            repository.archive_completed(datetime.now() - timedelta(days=30))
+        refresh_planner_statistics(db.engine)
+        archived_id = db.session.query(TaskArchiveModel.id).filter_by(user_id=user_id).limit(1).scalar()
+        
+        with checker.capture('find_by_user_id'):
+            tasks = repository.find_by_user_id(user_id)
+        with checker.capture('find_by_status'):
+            repository.find_by_status(user_id, TaskStatus.PENDING)
+        with checker.capture('find_by_priority'):
+            repository.find_by_priority(user_id, tasks[0].priority)
+        with checker.capture('find_by_due_date'):
+            repository.find_by_due_date(user_id, date.today())
+        with checker.capture('find_by_ids'):
+            repository.find_by_ids([task.id for task in tasks[:20]])
+        with checker.capture('find_batch'):
+            repository.find_batch(user_id)
+        with checker.capture('count_overdue'):
+            repository.count_overdue(user_id)
+        with checker.capture('count_tasks'):
+            repository.count_tasks(user_id)
+        
+        for filter_name, criteria in filters.items():
+            for sort_name, sort_keys in sorts.items():
+                name = f'{filter_name} / {sort_name}'
+                with checker.capture(f'find_by_criteria {name}'):
+                    repository.find_by_criteria(user_id, criteria, sort_keys)
+                with checker.capture(f'find_page {name}'):
+                    page = repository.find_page(user_id, criteria, sort_keys, limit=10)
+                if page.next_cursor:
+                    with checker.capture(f'find_page {name} (cursor)'):
+                        repository.find_page(user_id, criteria, sort_keys, limit=10, cursor=page.next_cursor)
+        
+        task = tasks[-1]
+        with checker.capture('update_status_if'):
+            repository.update_status_if(task.id, user_id, task.status, TaskStatus.IN_PROGRESS)
+        with checker.capture('complete_if_owned'):
+            repository.complete_if_owned(task.id, user_id)
+        with checker.capture('update_fields_if_owned'):
+            repository.update_fields_if_owned(task.id, user_id, {'priority': task.priority})
+        with checker.capture('delete_if_owned'):
+            repository.delete_if_owned(task.id, user_id)
+        with checker.capture('restore_if_owned'):
+            repository.restore_if_owned(task.id, user_id)
+        with checker.capture('update_status_if (arquivada)'):
+            repository.update_status_if(archived_id, user_id, TaskStatus.COMPLETED, TaskStatus.PENDING)
+        
+        batch_ids = [task.id for task in tasks[:20]]
+        with checker.capture('update_status_many_if'):
+            repository.update_status_many_if(
+                user_id, [(task.id, task.status, TaskStatus.COMPLETED) for task in tasks[:20]]
+            )
+        with checker.capture('update_fields_many_if_owned'):
+            repository.update_fields_many_if_owned(
+                user_id, {task_id: {'priority': task.priority} for task_id in batch_ids}
+            )
+        with checker.capture('delete_many_if_owned'):
+            repository.delete_many_if_owned(user_id, batch_ids)
+        with checker.capture('restore_many_if_owned'):
+            repository.restore_many_if_owned(user_id, batch_ids)
+        with checker.capture('purge_deleted'):
+            repository.purge_deleted(datetime.now() - timedelta(days=7))
+        
+        return checker.reports()
+    finally:
+        checker.close()
\ No newline at end of file
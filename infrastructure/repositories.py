@@ -1,41 +1,114 @@
-from typing import List, Optional
-from datetime import date
-from domain.entities import Task, User, Priority, TaskStatus
-from domain.interfaces import ITaskRepository, IUserRepository
-from .database import db, TaskModel, UserModel, PriorityEnum, TaskStatusEnum
+import heapq
+import itertools
+import json
+import re
+from functools import cmp_to_key
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from datetime import date, datetime
+from sqlalchemy import (
+    and_, or_, not_, case, false, true, func, inspect, literal, literal_column, text, type_coerce,
+    Integer, SmallInteger, String
+)
+from sqlalchemy import update as sql_update, delete as sql_delete, insert as sql_insert, select, bindparam
+from sqlalchemy.orm import undefer
+from domain.entities import Task, User, Priority, TaskStatus, CommandJournalEntry
+from domain.interfaces import (
+    ITaskRepository, IUserRepository, IUnitOfWork, ICommandJournal, IUserVersionTracker
+)
+from domain.task_batch import TaskBatch
+from domain.specifications import (
+    TaskCriterion, TaskSortKey, TaskPage, TaskCounts, TaskProjection, DESCRIPTION_PREVIEW_LENGTH,
+    encode_cursor, decode_cursor, reaches_archive
+)
+from .database import (
+    db, TaskModel, TaskArchiveModel, UserModel, UserTaskStatsModel, CommandJournalModel, PriorityEnum, TaskStatusEnum,
+    DUE_DATE_MISSING_SQL, TITLE_SORT_SQL, ARCHIVED_TASK_COLUMNS
+)
+from .migrations import SEARCH_INDEX_TABLE, SEARCH_INDEX_PREFIXES
 
 
-class TaskRepositoryImpl(ITaskRepository):
-    """Implementação concreta do repositório de tarefas usando SQLAlchemy"""
+class SqlAlchemyRepository:
+    """Base dos repositórios SQLAlchemy integrada ao Unit of Work"""
+    
+    def __init__(self, unit_of_work: Optional[IUnitOfWork] = None):
+        self._unit_of_work = unit_of_work
+    
+    def _in_unit_of_work(self) -> bool:
+        """Verifica se há um Unit of Work ativo para a requisição"""
+        return self._unit_of_work is not None and self._unit_of_work.is_active()
+    
+    def _commit(self) -> None:
+        """Confirma a escrita, ou apenas faz flush se o Unit of Work fará o commit"""
+        if self._in_unit_of_work():
+            db.session.flush()
+        else:
+            db.session.commit()
+    
+    def _identity_get(self, entity_type: type, entity_id: int):
+        """Busca no identity map do Unit of Work, se houver"""
+        if self._in_unit_of_work():
+            return self._unit_of_work.get(entity_type, entity_id)
+        return None
+    
+    def _identity_register(self, entity) -> None:
+        """Registra a entidade no identity map do Unit of Work, se houver"""
+        if self._in_unit_of_work():
+            self._unit_of_work.register(entity)
+    
+    def _identity_evict(self, entity_type: type, entity_id: int) -> None:
+        """Remove a entidade do identity map do Unit of Work, se houver"""
+        if self._in_unit_of_work():
+            self._unit_of_work.evict(entity_type, entity_id)
+
+
+class TaskRepositoryImpl(SqlAlchemyRepository, ITaskRepository, IUserVersionTracker):
+    """Implementação concreta do repositório de tarefas usando SQLAlchemy
+    
+    Também mantém a versão dos dados de cada usuário, guardada na mesma
+    linha de user_task_stats que os contadores. Tarefas concluídas há mais
+    tempo que a retenção ficam em tasks_archive: só as leituras que podem
+    trazê-las (sem filtro ou com filtro de status que admite concluídas)
+    consultam o arquivo, e as escritas devolvem a tarefa para tasks antes
+    de alterá-la.
+    """
+    
+    # Palavras da busca textual e limite de termos por consulta
+    SEARCH_TERM_PATTERN = re.compile(r'\w+')
+    MAX_SEARCH_TERMS = 8
+    
+    # Prefixos da busca enquanto digita: só os tamanhos com lista própria no índice FTS5
+    MIN_SEARCH_PREFIX = SEARCH_INDEX_PREFIXES[0]
+    MAX_SEARCH_PREFIX = SEARCH_INDEX_PREFIXES[-1]
+    
+    # Ocorrências mais recentes ordenadas pelo FTS5 em cada busca
+    MAX_SEARCH_CANDIDATES = 500
+    
+    # Marcador de tarefa sem vencimento na ordenação por data (1 vai para o final)
+    _due_date_missing = literal_column(f'({DUE_DATE_MISSING_SQL})', Integer)
+    
+    # Conversões entre os enums do banco e do domínio, montadas uma única vez
+    PRIORITY_TO_DOMAIN = {member: Priority[member.name] for member in PriorityEnum}
+    PRIORITY_TO_DATABASE = {priority: PriorityEnum[priority.name] for priority in Priority}
+    STATUS_TO_DOMAIN = {member: TaskStatus[member.name] for member in TaskStatusEnum}
+    STATUS_TO_DATABASE = {status: TaskStatusEnum[status.name] for status in TaskStatus}
+    
+    def __init__(self, unit_of_work: Optional[IUnitOfWork] = None):
+        super().__init__(unit_of_work)
+        self._search_index_available: Optional[bool] = None
     
     def _to_domain_entity(self, task_model: TaskModel) -> Task:
         """Converte modelo do banco para entidade do domínio"""
-        # Mapear enums do banco para enums do domínio
-        priority_map = {
-            PriorityEnum.LOW: Priority.LOW,
-            PriorityEnum.MEDIUM: Priority.MEDIUM,
-            PriorityEnum.HIGH: Priority.HIGH,
-            PriorityEnum.URGENT: Priority.URGENT
-        }
-        
-        status_map = {
-            TaskStatusEnum.PENDING: TaskStatus.PENDING,
-            TaskStatusEnum.IN_PROGRESS: TaskStatus.IN_PROGRESS,
-            TaskStatusEnum.COMPLETED: TaskStatus.COMPLETED,
-            TaskStatusEnum.CANCELLED: TaskStatus.CANCELLED
-        }
-        
         task = Task(
             title=task_model.title,
             description=task_model.description,
-            priority=priority_map[task_model.priority],
+            priority=self.PRIORITY_TO_DOMAIN[task_model.priority],
             due_date=task_model.due_date,
             user_id=task_model.user_id,
             id=task_model.id
         )
         
         # Definir campos que não são definidos no construtor
-        task.status = status_map[task_model.status]
+        task.status = self.STATUS_TO_DOMAIN[task_model.status]
         task.created_at = task_model.created_at
         task.updated_at = task_model.updated_at
         
@@ -43,30 +116,15 @@ class TaskRepositoryImpl(ITaskRepository):
     
     def _to_database_model(self, task: Task) -> TaskModel:
         """Converte entidade do domínio para modelo do banco"""
-        # Mapear enums do domínio para enums do banco
-        priority_map = {
-            Priority.LOW: PriorityEnum.LOW,
-            Priority.MEDIUM: PriorityEnum.MEDIUM,
-            Priority.HIGH: PriorityEnum.HIGH,
-            Priority.URGENT: PriorityEnum.URGENT
-        }
-        
-        status_map = {
-            TaskStatus.PENDING: TaskStatusEnum.PENDING,
-            TaskStatus.IN_PROGRESS: TaskStatusEnum.IN_PROGRESS,
-            TaskStatus.COMPLETED: TaskStatusEnum.COMPLETED,
-            TaskStatus.CANCELLED: TaskStatusEnum.CANCELLED
-        }
-        
         if task.id:
             # Atualizar tarefa existente
-            task_model = TaskModel.query.get(task.id)
+            task_model = self._get_model(task.id)
             if task_model:
                 task_model.title = task.title
                 task_model.description = task.description
-                task_model.priority = priority_map[task.priority]
+                task_model.priority = self.PRIORITY_TO_DATABASE[task.priority]
                 task_model.due_date = task.due_date
-                task_model.status = status_map[task.status]
+                task_model.status = self.STATUS_TO_DATABASE[task.status]
                 task_model.updated_at = task.updated_at
                 return task_model
         
@@ -74,100 +132,1229 @@ class TaskRepositoryImpl(ITaskRepository):
         return TaskModel(
             title=task.title,
             description=task.description,
-            priority=priority_map[task.priority],
+            priority=self.PRIORITY_TO_DATABASE[task.priority],
             due_date=task.due_date,
-            status=status_map[task.status],
+            status=self.STATUS_TO_DATABASE[task.status],
             user_id=task.user_id
         )
     
+    def _get_model(self, task_id: int) -> Optional[TaskModel]:
+        """Carrega o modelo da tarefa pela chave primária
+        
+        Dentro de um Unit of Work o modelo fica referenciado até o fim da
+        requisição; sem isso o identity map (fraco) do SQLAlchemy o descarta
+        e cada acesso seguinte volta ao banco.
+        """
+        task_model = db.session.get(TaskModel, task_id, options=[undefer(TaskModel.description)])
+        if task_model is not None and task_model.deleted_at is not None:
+            return None
+        if task_model is not None and self._in_unit_of_work():
+            db.session.info.setdefault('loaded_task_models', {})[task_id] = task_model
+        return task_model
+    
+    def _get_model_for_write(self, task_id: int) -> Optional[TaskModel]:
+        """Carrega o modelo da tarefa a alterar, trazendo-a antes do arquivo se preciso"""
+        task_model = self._get_model(task_id)
+        if task_model is None and self._unarchive([task_id]):
+            task_model = self._get_model(task_id)
+        return task_model
+    
+    def _live_tasks(self, model=TaskModel):
+        """Consulta base das tarefas vivas; tarefas com lápide ficam fora de toda leitura"""
+        if model is TaskArchiveModel:
+            return TaskArchiveModel.query
+        return TaskModel.query.filter(TaskModel.deleted_at.is_(None))
+    
+    def _project(self, query, projection: TaskProjection, model=TaskModel):
+        """Aplica a projeção à consulta de TaskModel
+        
+        DETAIL carrega os modelos completos; LIST troca o modelo por colunas
+        avulsas com a prévia da descrição, sem nunca ler o texto inteiro no Python.
+        EXPORT usa as mesmas colunas avulsas, com a descrição inteira.
+        """
+        if projection == TaskProjection.DETAIL:
+            return query.options(undefer(model.description))
+        
+        description = model.description
+        if projection == TaskProjection.LIST:
+            description = case(
+                (func.length(model.description) > DESCRIPTION_PREVIEW_LENGTH,
+                 func.substr(model.description, 1, DESCRIPTION_PREVIEW_LENGTH) + '…'),
+                else_=model.description
+            )
+        return query.with_entities(
+            model.id, model.title, description.label('description'), model.priority,
+            model.due_date, model.status, model.created_at, model.updated_at,
+            model.user_id
+        )
+    
     def save(self, task: Task) -> Task:
         """Salva uma tarefa no banco de dados"""
+        before = self._stats_values(self._get_model_for_write(task.id)) if task.id else None
         task_model = self._to_database_model(task)
         
         if not task.id:
+            self._assign_ids([task_model])
             db.session.add(task_model)
+            self._record_stats_change(task.user_id, None, self._stats_values(task_model))
+        elif before:
+            self._record_stats_change(task.user_id, before, self._stats_values(task_model))
         
-        db.session.commit()
+        self._commit()
         
         # Atualizar o ID da entidade se for nova
         if not task.id:
             task.id = task_model.id
         
+        self._identity_register(task)
         return task
     
+    def save_many(self, tasks: List[Task]) -> List[Task]:
+        """Insere várias tarefas novas em um único flush
+        
+        O SQLAlchemy agrupa as linhas em INSERTs de vários valores com
+        RETURNING, e os contadores de cada usuário recebem um único UPDATE.
+        """
+        if any(task.id for task in tasks):
+            raise ValueError("save_many só insere tarefas novas")
+        
+        task_models = [self._to_database_model(task) for task in tasks]
+        self._assign_ids(task_models)
+        db.session.add_all(task_models)
+        
+        transitions_by_user = {}
+        for task_model in task_models:
+            transitions_by_user.setdefault(task_model.user_id, []).append((None, self._stats_values(task_model)))
+        for user_id, transitions in transitions_by_user.items():
+            self._record_stats_changes(user_id, transitions)
+        
+        self._commit()
+        
+        for task, task_model in zip(tasks, task_models):
+            task.id = task_model.id
+            self._identity_register(task)
+        return tasks
+    
+    def _assign_ids(self, task_models: List[TaskModel]) -> None:
+        """Define os IDs das tarefas novas antes do INSERT, se o repositório os alocar"""
+        task_ids = self._allocate_ids(len(task_models))
+        if task_ids is not None:
+            for task_model, task_id in zip(task_models, task_ids):
+                task_model.id = task_id
+    
+    def _allocate_ids(self, count: int) -> Optional[List[int]]:
+        """IDs para as próximas tarefas novas; None deixa a numeração para o banco"""
+        return None
+    
     def find_by_id(self, task_id: int) -> Optional[Task]:
-        """Busca uma tarefa por ID"""
-        task_model = TaskModel.query.get(task_id)
+        """Busca uma tarefa por ID, reaproveitando a entidade já carregada na requisição"""
+        task = self._identity_get(Task, task_id)
+        if task:
+            return task
+        
+        task_model = self._get_model(task_id)
+        if task_model is None:
+            task_model = db.session.get(TaskArchiveModel, task_id, options=[undefer(TaskArchiveModel.description)])
         if task_model:
-            return self._to_domain_entity(task_model)
+            task = self._to_domain_entity(task_model)
+            self._identity_register(task)
+            return task
         return None
     
-    def find_by_user_id(self, user_id: int) -> List[Task]:
+    def find_by_user_id(self, user_id: int,
+                        projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca todas as tarefas de um usuário"""
-        task_models = TaskModel.query.filter_by(user_id=user_id).all()
-        return [self._to_domain_entity(tm) for tm in task_models]
+        # Ordem por ID (a de criação), servida pelo rowid no fim do índice por usuário
+        task_models = self._project(self._live_tasks().filter_by(user_id=user_id), projection).order_by(
+            TaskModel.id
+        ).all()
+        archived_models = self._project(
+            self._live_tasks(TaskArchiveModel).filter_by(user_id=user_id), projection, TaskArchiveModel
+        ).order_by(TaskArchiveModel.id).all()
+        return [self._to_domain_entity(tm) for tm in heapq.merge(task_models, archived_models, key=lambda tm: tm.id)]
     
-    def find_by_status(self, user_id: int, status: TaskStatus) -> List[Task]:
+    def find_by_status(self, user_id: int, status: TaskStatus,
+                       projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por status"""
-        status_map = {
-            TaskStatus.PENDING: TaskStatusEnum.PENDING,
-            TaskStatus.IN_PROGRESS: TaskStatusEnum.IN_PROGRESS,
-            TaskStatus.COMPLETED: TaskStatusEnum.COMPLETED,
-            TaskStatus.CANCELLED: TaskStatusEnum.CANCELLED
-        }
-        
-        task_models = TaskModel.query.filter_by(
+        task_models = self._project(self._live_tasks().filter_by(
             user_id=user_id, 
-            status=status_map[status]
-        ).all()
+            status=self.STATUS_TO_DATABASE[status]
+        ), projection).all()
+        
+        if status == TaskStatus.COMPLETED:
+            task_models += self._project(
+                self._live_tasks(TaskArchiveModel).filter_by(user_id=user_id), projection, TaskArchiveModel
+            ).all()
         
         return [self._to_domain_entity(tm) for tm in task_models]
     
-    def find_by_priority(self, user_id: int, priority: Priority) -> List[Task]:
+    def find_by_priority(self, user_id: int, priority: Priority,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por prioridade"""
-        priority_map = {
-            Priority.LOW: PriorityEnum.LOW,
-            Priority.MEDIUM: PriorityEnum.MEDIUM,
-            Priority.HIGH: PriorityEnum.HIGH,
-            Priority.URGENT: PriorityEnum.URGENT
-        }
-        
-        task_models = TaskModel.query.filter_by(
+        task_models = self._project(self._live_tasks().filter_by(
             user_id=user_id, 
-            priority=priority_map[priority]
-        ).all()
+            priority=self.PRIORITY_TO_DATABASE[priority]
+        ), projection).all()
         
         return [self._to_domain_entity(tm) for tm in task_models]
     
-    def find_by_due_date(self, user_id: int, due_date: date) -> List[Task]:
+    def find_by_due_date(self, user_id: int, due_date: date,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
         """Busca tarefas por data de vencimento"""
-        task_models = TaskModel.query.filter_by(
+        task_models = self._project(self._live_tasks().filter_by(
             user_id=user_id, 
             due_date=due_date
-        ).all()
+        ), projection).all()
         
         return [self._to_domain_entity(tm) for tm in task_models]
     
+    def find_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                         sort_keys: List[TaskSortKey],
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        """Busca tarefas filtradas e ordenadas em uma única consulta (mais uma no arquivo)"""
+        rows = self._ordered_rows(user_id, criteria, sort_keys, projection)
+        return [self._row_to_domain(row, projection) for row in rows]
+    
+    def find_page(self, user_id: int, criteria: List[TaskCriterion],
+                  sort_keys: List[TaskSortKey], limit: int,
+                  cursor: Optional[str] = None,
+                  projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        """Busca uma página usando cursor (chave de ordenação, id)
+        
+        O custo independe da posição da página: o cursor vira uma condição
+        WHERE sobre as chaves de ordenação em vez de um OFFSET.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        
+        # Uma linha extra indica se existe próxima página; as chaves do cursor vêm no fim da linha
+        rows = self._ordered_rows(user_id, criteria, sort_keys, projection, after, limit + 1)
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        key_count = len(self._ordering(sort_keys, criteria))
+        items = [self._row_to_domain(row, projection) for row in rows]
+        next_cursor = encode_cursor(list(rows[-1][-key_count:])) if has_more else None
+        return TaskPage(items=items, next_cursor=next_cursor)
+    
+    def stream_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                           sort_keys: List[TaskSortKey], chunk_size: int = 1000) -> Iterator[Task]:
+        """Percorre as tarefas filtradas e ordenadas sem carregar o resultado inteiro
+        
+        Nada é consultado antes da primeira tarefa pedida. Cada tabela é lida
+        por um cursor do banco em lotes de chunk_size linhas (yield_per), e
+        as linhas viram entidades uma a uma.
+        """
+        rows = self._merged_rows(user_id, criteria, sort_keys, TaskProjection.EXPORT, chunk_size=chunk_size)
+        for row in rows:
+            yield self._row_to_domain(row, TaskProjection.EXPORT)
+    
+    def _ordered_rows(self, user_id: int, criteria: List[TaskCriterion], sort_keys: List[TaskSortKey],
+                      projection: TaskProjection, after: Optional[list] = None,
+                      limit: Optional[int] = None) -> list:
+        """Linhas filtradas e ordenadas, com os valores das chaves de ordenação no fim"""
+        return list(itertools.islice(
+            self._merged_rows(user_id, criteria, sort_keys, projection, after, limit), limit
+        ))
+    
+    def _merged_rows(self, user_id: int, criteria: List[TaskCriterion], sort_keys: List[TaskSortKey],
+                     projection: TaskProjection, after: Optional[list] = None,
+                     limit: Optional[int] = None, chunk_size: Optional[int] = None) -> Iterable:
+        """Linhas ordenadas de tasks e, quando os critérios alcançam o arquivo, de tasks_archive
+        
+        A mesma consulta roda nas duas tabelas e as linhas, já ordenadas pelos
+        índices de cada uma, são intercaladas sob demanda.
+        """
+        rows = self._ordered_query(TaskModel, user_id, criteria, sort_keys, projection, after, limit, chunk_size)
+        if not reaches_archive(criteria):
+            return rows
+        
+        archived_rows = self._ordered_query(
+            TaskArchiveModel, user_id, self._archive_criteria(criteria), sort_keys, projection, after, limit,
+            chunk_size
+        )
+        descending = [flag for _, flag in self._ordering(sort_keys, criteria)]
+        
+        def compare(left, right) -> int:
+            keys = zip(descending, left[-len(descending):], right[-len(descending):])
+            for flag, left_value, right_value in keys:
+                if left_value == right_value:
+                    continue
+                # NULL vem antes, como no SQLite; só a data ausente chega aqui, já desempatada pelo marcador
+                before = left_value is None or (right_value is not None and left_value < right_value)
+                return (1 if before else -1) if flag else (-1 if before else 1)
+            return 0
+        
+        return heapq.merge(rows, archived_rows, key=cmp_to_key(compare))
+    
+    def _ordered_query(self, model, user_id: int, criteria: List[TaskCriterion],
+                       sort_keys: List[TaskSortKey], projection: TaskProjection,
+                       after: Optional[list], limit: Optional[int], chunk_size: Optional[int] = None) -> Iterable:
+        """Executa a consulta ordenada em uma das tabelas de tarefas
+        
+        Com chunk_size, devolve a consulta ainda não executada e lida em
+        lotes pelo cursor do banco, em vez da lista de linhas.
+        """
+        ordering = self._ordering(sort_keys, criteria, model)
+        query = self._project(self._criteria_query(user_id, criteria, model), projection, model)
+        
+        if after is not None:
+            query = query.filter(self._after_cursor(ordering, after))
+        
+        query = query.add_columns(*[
+            expression.label(f'cursor_{index}') for index, (expression, _) in enumerate(ordering)
+        ]).order_by(*self._order_by(ordering))
+        if limit is not None:
+            query = query.limit(limit)
+        if chunk_size is not None:
+            return query.yield_per(chunk_size)
+        return query.all()
+    
+    def _row_to_domain(self, row, projection: TaskProjection) -> Task:
+        """Converte uma linha de _ordered_rows, ignorando as chaves de ordenação"""
+        return self._to_domain_entity(row[0] if projection == TaskProjection.DETAIL else row)
+    
+    def _archive_criteria(self, criteria: List[TaskCriterion]) -> List[TaskCriterion]:
+        """Critérios da consulta ao arquivo: o status concluído vale para todas as linhas dele"""
+        return [criterion for criterion in criteria
+                if not (criterion.field == 'status' and criterion.operator == 'eq'
+                        and criterion.value == TaskStatus.COMPLETED)]
+    
+    def find_batch(self, user_id: int, include_archived: bool = False) -> TaskBatch:
+        """Projeção só das colunas de filtro e ordenação, direto para o formato colunar"""
+        # Status e prioridade chegam como os códigos gravados, que são os mesmos do lote colunar
+        def batch_query(model):
+            return select(
+                model.id,
+                type_coerce(model.status, SmallInteger),
+                type_coerce(model.priority, SmallInteger),
+                model.due_date,
+                model.created_at
+            ).where(model.user_id == user_id)
+        
+        rows = db.session.execute(batch_query(TaskModel).where(TaskModel.deleted_at.is_(None))).all()
+        if include_archived:
+            rows += db.session.execute(batch_query(TaskArchiveModel)).all()
+        
+        return TaskBatch.from_rows(rows)
+    
+    def search(self, user_id: int, query: str, limit: int,
+               cursor: Optional[str] = None,
+               projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        """Busca textual em título e descrição, paginada por cursor (relevância, id)
+        
+        Tarefas com todos os termos no título vêm antes; em cada grupo, as mais
+        recentes primeiro. Usa o índice FTS5 quando disponível, com prefixo no
+        último termo; sem ele, recorre a LIKE. Pelo FTS5 só as
+        MAX_SEARCH_CANDIDATES tarefas mais recentes que casam com a busca são
+        ordenadas: termos e prefixos presentes em quase todas as tarefas custam
+        o mesmo que uma busca seletiva.
+        """
+        terms = [term.lower() for term in self.SEARCH_TERM_PATTERN.findall(query)][:self.MAX_SEARCH_TERMS]
+        if not terms:
+            return TaskPage(items=[])
+        
+        after = None
+        if cursor:
+            after = decode_cursor(cursor)
+            if len(after) != 2:
+                raise ValueError("Cursor de paginação inválido")
+        
+        if self._has_search_index():
+            rows = self._search_index(user_id, terms, limit + 1, after)
+        else:
+            rows = self._search_like(user_id, terms, limit + 1, after)
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][1], rows[-1][0]]) if has_more else None
+        return TaskPage(items=self.find_by_ids([row[0] for row in rows], projection), next_cursor=next_cursor)
+    
+    def find_by_ids(self, task_ids: List[int],
+                    projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        """Busca tarefas pelos IDs em uma única consulta, na ordem informada"""
+        if not task_ids:
+            return []
+        task_models = self._project(self._live_tasks().filter(TaskModel.id.in_(task_ids)), projection).all()
+        tasks_by_id = {task_model.id: self._to_domain_entity(task_model) for task_model in task_models}
+        
+        missing = [task_id for task_id in task_ids if task_id not in tasks_by_id]
+        if missing:
+            archived_models = self._project(
+                self._live_tasks(TaskArchiveModel).filter(TaskArchiveModel.id.in_(missing)), projection, TaskArchiveModel
+            ).all()
+            tasks_by_id.update((task_model.id, self._to_domain_entity(task_model)) for task_model in archived_models)
+        return [tasks_by_id[task_id] for task_id in task_ids if task_id in tasks_by_id]
+    
+    def _has_search_index(self) -> bool:
+        """Verifica uma única vez se o banco tem o índice FTS5 de busca"""
+        if self._search_index_available is None:
+            self._search_index_available = inspect(db.engine).has_table(SEARCH_INDEX_TABLE)
+        return self._search_index_available
+    
+    def _search_index(self, user_id: int, terms: List[str], limit: int, after: Optional[list]) -> list:
+        """Pares (id, relevância) pelo FTS5: todos os termos no título valem 0, senão 1"""
+        # Termos exatos entre aspas, mais o token do dono. Só o último termo vira prefixo
+        # (busca enquanto digita), de 3 a 6 letras: os prefixos do índice são lidos como um
+        # único termo; um prefixo maior é encurtado, pois juntaria as listas de todos os usuários
+        def phrase(index: int, term: str) -> str:
+            if index < len(terms) - 1 or len(term) < self.MIN_SEARCH_PREFIX:
+                return '"{}"'.format(term.replace('"', '""'))
+            return '"{}"*'.format(term[:self.MAX_SEARCH_PREFIX].replace('"', '""'))
+        
+        phrases = ' AND '.join(phrase(index, term) for index, term in enumerate(terms))
+        
+        after_condition = ''
+        parameters = {
+            'match': f'owner:u{user_id} AND {{title description}}: ({phrases})',
+            'title_match': f'owner:u{user_id} AND {{title}}: ({phrases})',
+            'user_id': user_id, 'limit': limit, 'candidates': self.MAX_SEARCH_CANDIDATES,
+        }
+        if after is not None:
+            after_condition = 'WHERE score > :after_score OR (score = :after_score AND id < :after_id)'
+            parameters.update(after_score=after[0], after_id=after[1])
+        
+        # O FTS5 percorre as ocorrências do rowid maior para o menor e para nos candidatos.
+        # Sem bm25: ele conta as ocorrências de cada termo no índice inteiro a cada busca.
+        # Todo acerto no título também casa com a busca inteira: um candidato que acerta
+        # o título está entre os MAX_SEARCH_CANDIDATES acertos no título mais recentes
+        return db.session.execute(text(f"""
+            WITH candidates AS (
+                SELECT rowid AS id FROM {SEARCH_INDEX_TABLE}
+                WHERE {SEARCH_INDEX_TABLE} MATCH :match
+                ORDER BY rowid DESC LIMIT :candidates
+            ), title_hits AS (
+                SELECT rowid AS id FROM {SEARCH_INDEX_TABLE}
+                WHERE {SEARCH_INDEX_TABLE} MATCH :title_match
+                ORDER BY rowid DESC LIMIT :candidates
+            )
+            SELECT id, score FROM (
+                SELECT tasks.id AS id,
+                       CASE WHEN tasks.id IN (SELECT id FROM title_hits) THEN 0.0 ELSE 1.0 END AS score
+                FROM candidates JOIN tasks ON tasks.id = candidates.id
+                WHERE tasks.user_id = :user_id AND tasks.deleted_at IS NULL
+            )
+            {after_condition}
+            ORDER BY score, id DESC
+            LIMIT :limit
+        """), parameters).all()
+    
+    def _search_like(self, user_id: int, terms: List[str], limit: int, after: Optional[list]) -> list:
+        """Pares (id, relevância) por LIKE: todos os termos no título valem 0, senão 1"""
+        def contains(column, term):
+            return func.lower(column).contains(term, autoescape=True)
+        
+        score = case(
+            (and_(*[contains(TaskModel.title, term) for term in terms]), 0.0), else_=1.0
+        )
+        query = select(TaskModel.id, score.label('score')).where(
+            TaskModel.user_id == user_id,
+            TaskModel.deleted_at.is_(None),
+            *[or_(contains(TaskModel.title, term), contains(TaskModel.description, term)) for term in terms]
+        )
+        if after is not None:
+            query = query.where(or_(score > after[0], and_(score == after[0], TaskModel.id < after[1])))
+        return db.session.execute(query.order_by(score, TaskModel.id.desc()).limit(limit)).all()
+    
+    def _criteria_query(self, user_id: int, criteria: List[TaskCriterion], model=TaskModel):
+        """Monta a consulta das tarefas do usuário com os critérios aplicados"""
+        query = self._live_tasks(model).filter(model.user_id == user_id)
+        for criterion in criteria:
+            query = query.filter(self._criterion_to_sql(criterion, model))
+        return query
+    
+    def _ordering(self, sort_keys: List[TaskSortKey], criteria: List[TaskCriterion], model=TaskModel) -> list:
+        """Lista de pares (expressão, decrescente) terminando no desempate por ID"""
+        # Critérios de data em AND só aceitam tarefas com vencimento: o marcador de
+        # data ausente é constante e sai da ordenação, que o índice de due_date atende
+        has_due_date = any(criterion.field == 'due_date' for criterion in criteria)
+        
+        ordering = []
+        for sort_key in sort_keys:
+            for expression in self._sort_key_to_sql(sort_key.field, model):
+                if has_due_date and expression is self._due_date_missing:
+                    continue
+                ordering.append((expression, sort_key.descending))
+        
+        # Desempate por ID mantém a mesma ordem estável da ordenação em memória
+        ordering.append((model.id, False))
+        return ordering
+    
+    def _order_by(self, ordering: list) -> list:
+        """Converte os pares de ordenação em cláusulas ORDER BY"""
+        return [expression.desc() if descending else expression
+                for expression, descending in ordering]
+    
+    def _after_cursor(self, ordering: list, values: list):
+        """Condição que seleciona apenas as linhas posteriores ao cursor"""
+        if len(values) != len(ordering):
+            raise ValueError("Cursor de paginação inválido")
+        
+        conditions = []
+        for index, ((expression, descending), value) in enumerate(zip(ordering, values)):
+            # Nada vem depois de NULL: nulos sempre ficam no fim da ordenação
+            if value is None:
+                comparison = false()
+            elif descending:
+                comparison = expression < value
+            else:
+                comparison = expression > value
+            
+            previous = [
+                previous_expression.is_(None) if previous_value is None
+                else previous_expression == previous_value
+                for (previous_expression, _), previous_value in zip(ordering[:index], values[:index])
+            ]
+            conditions.append(and_(*previous, comparison))
+        
+        return or_(*conditions)
+    
+    def _criterion_to_sql(self, criterion: TaskCriterion, model=TaskModel):
+        """Converte um critério do domínio em expressão SQLAlchemy"""
+        if criterion.operator == 'or':
+            # Sem grupos, nenhuma tarefa atende
+            return or_(false(), *[self._group_to_sql(group, model) for group in criterion.value])
+        if criterion.operator == 'not':
+            # NULL de datas ausentes conta como falso antes da negação, como em memória
+            return not_(func.coalesce(self._group_to_sql(criterion.value, model), false()))
+        
+        columns = {
+            'status': model.status,
+            'priority': model.priority,
+            'due_date': model.due_date
+        }
+        to_database = {'status': self.STATUS_TO_DATABASE, 'priority': self.PRIORITY_TO_DATABASE}
+        
+        if criterion.field not in columns:
+            raise ValueError(f"Campo de filtro não suportado: {criterion.field}")
+        
+        column = columns[criterion.field]
+        value = criterion.value
+        
+        conversion = to_database.get(criterion.field)
+        if conversion is not None and value is not None:
+            if criterion.operator == 'in':
+                value = [conversion[item] for item in value]
+            else:
+                value = conversion[value]
+        
+        if criterion.operator == 'eq':
+            return column == value
+        if criterion.operator == 'ne':
+            return column != value
+        if criterion.operator == 'in':
+            return column.in_(value)
+        if criterion.operator == 'lt':
+            return column < value
+        if criterion.operator == 'ge':
+            return column >= value
+        
+        raise ValueError(f"Operador de filtro não suportado: {criterion.operator}")
+    
+    def _group_to_sql(self, group: tuple, model=TaskModel):
+        """Combina um grupo de critérios compostos em AND"""
+        return and_(true(), *[self._criterion_to_sql(criterion, model) for criterion in group])
+    
+    def _sort_key_to_sql(self, field: str, model=TaskModel) -> list:
+        """Converte um campo de ordenação em expressões SQLAlchemy"""
+        # Mesmas expressões dos índices de TaskModel, para o banco ordenar pelo índice.
+        # Status e prioridade ordenam pelo código cru, que também é o valor do cursor
+        if field == 'priority':
+            return [type_coerce(model.priority, SmallInteger)]
+        if field == 'status':
+            return [type_coerce(model.status, SmallInteger)]
+        if field == 'due_date':
+            # Tarefas sem data de vencimento vão para o final
+            return [self._due_date_missing, model.due_date]
+        if field == 'created_at':
+            # Texto gravado, também no cursor: o default do banco grava sem microssegundos,
+            # e o datetime reconvertido com ".000000" nunca empataria com a própria linha
+            return [type_coerce(model.created_at, String)]
+        if field == 'title':
+            return [literal_column(TITLE_SORT_SQL, String)]
+        
+        raise ValueError(f"Campo de ordenação não suportado: {field}")
+    
+    def count_tasks(self, user_id: int) -> TaskCounts:
+        """Lê os contadores mantidos incrementalmente em user_task_stats
+        
+        Sem a linha do usuário, conta com o GROUP BY sem gravar nada: a leitura
+        pode estar em uma réplica. A linha nasce na primeira escrita do usuário
+        ou no comando rebuild-task-stats.
+        """
+        stats_model = db.session.get(UserTaskStatsModel, user_id)
+        if stats_model is None:
+            return self._aggregate_counts(user_id)
+        
+        return TaskCounts(
+            total=stats_model.total,
+            by_status={status: getattr(stats_model, status.name.lower()) for status in TaskStatus},
+            by_priority={priority: getattr(stats_model, priority.name.lower()) for priority in Priority}
+        )
+    
+    def rebuild_stats(self) -> List[tuple]:
+        """Reconstrói todos os contadores a partir da tabela de tarefas
+        
+        Retorna as divergências encontradas como (user_id, contador, armazenado, real).
+        """
+        rows = db.session.query(
+            TaskModel.user_id, TaskModel.status, TaskModel.priority, func.count(TaskModel.id)
+        ).filter(
+            TaskModel.deleted_at.is_(None)
+        ).group_by(TaskModel.user_id, TaskModel.status, TaskModel.priority).all()
+        
+        # Tarefas arquivadas continuam contadas
+        rows += db.session.query(
+            TaskArchiveModel.user_id, TaskArchiveModel.status, TaskArchiveModel.priority, func.count(TaskArchiveModel.id)
+        ).group_by(TaskArchiveModel.user_id, TaskArchiveModel.status, TaskArchiveModel.priority).all()
+        
+        actual = {}
+        for user_id, status, priority, count in rows:
+            counts = actual.setdefault(user_id, self._empty_counts())
+            self._add_to_counts(counts, status, priority, count)
+        
+        stored = {model.user_id: model for model in UserTaskStatsModel.query.all()}
+        drift = []
+        
+        for user_id in sorted(set(actual) | set(stored)):
+            fresh_model = self._to_stats_model(user_id, actual.get(user_id, self._empty_counts()))
+            stored_model = stored.get(user_id)
+            
+            for column in self._stats_columns():
+                expected = getattr(fresh_model, column)
+                current = getattr(stored_model, column) if stored_model else None
+                if current != expected:
+                    drift.append((user_id, column, current, expected))
+            
+            db.session.merge(fresh_model)
+        
+        self._commit()
+        return drift
+    
+    def _aggregate_counts(self, user_id: int) -> TaskCounts:
+        """Conta as tarefas com um GROUP BY status, prioridade em cada tabela de tarefas"""
+        rows = db.session.query(
+            TaskModel.status, TaskModel.priority, func.count(TaskModel.id)
+        ).filter(
+            TaskModel.user_id == user_id,
+            TaskModel.deleted_at.is_(None)
+        ).group_by(TaskModel.status, TaskModel.priority).all()
+        
+        rows += db.session.query(
+            TaskArchiveModel.status, TaskArchiveModel.priority, func.count(TaskArchiveModel.id)
+        ).filter(
+            TaskArchiveModel.user_id == user_id
+        ).group_by(TaskArchiveModel.status, TaskArchiveModel.priority).all()
+        
+        counts = self._empty_counts()
+        for status, priority, count in rows:
+            self._add_to_counts(counts, status, priority, count)
+        
+        return counts
+    
+    def _empty_counts(self) -> TaskCounts:
+        """Cria contadores zerados"""
+        return TaskCounts(
+            total=0,
+            by_status={status: 0 for status in TaskStatus},
+            by_priority={priority: 0 for priority in Priority}
+        )
+    
+    def _add_to_counts(self, counts: TaskCounts, status: TaskStatusEnum,
+                       priority: PriorityEnum, count: int) -> None:
+        """Soma uma linha agregada aos contadores"""
+        counts.total += count
+        counts.by_status[self.STATUS_TO_DOMAIN[status]] += count
+        counts.by_priority[self.PRIORITY_TO_DOMAIN[priority]] += count
+    
+    def _stats_columns(self) -> List[str]:
+        """Nomes das colunas de contadores em user_task_stats"""
+        return (['total'] + [status.name.lower() for status in TaskStatus]
+                + [priority.name.lower() for priority in Priority])
+    
+    def _to_stats_model(self, user_id: int, counts: TaskCounts) -> UserTaskStatsModel:
+        """Converte contadores agregados para o modelo de user_task_stats"""
+        stats_model = UserTaskStatsModel(user_id=user_id, total=counts.total)
+        for status, count in counts.by_status.items():
+            setattr(stats_model, status.name.lower(), count)
+        for priority, count in counts.by_priority.items():
+            setattr(stats_model, priority.name.lower(), count)
+        return stats_model
+    
+    def _stats_values(self, task_model: Optional[TaskModel]) -> Optional[tuple]:
+        """Par (status, prioridade) de uma tarefa, usado nos contadores"""
+        if task_model is None:
+            return None
+        return (task_model.status, task_model.priority)
+    
+    def _record_stats_change(self, user_id: int, before: Optional[tuple],
+                             after: Optional[tuple]) -> None:
+        """Aplica nos contadores a troca de (status, prioridade) de uma tarefa
+        
+        Executa na mesma transação da escrita da tarefa; before=None indica
+        criação e after=None indica remoção. Tuplas só com o status também
+        são aceitas quando a prioridade não muda.
+        """
+        self._record_stats_changes(user_id, [(before, after)])
+    
+    def _record_stats_changes(self, user_id: int, transitions: List[tuple]) -> None:
+        """Aplica nos contadores, em um único UPDATE, as trocas (antes, depois) de várias tarefas"""
+        changes = {}
+        for before, after in transitions:
+            for values, delta in ((before, -1), (after, 1)):
+                if values is None:
+                    continue
+                changes['total'] = changes.get('total', 0) + delta
+                for value in values:
+                    column = value.name.lower()
+                    changes[column] = changes.get(column, 0) + delta
+        
+        changes = {column: delta for column, delta in changes.items() if delta}
+        if not changes:
+            return
+        
+        table = UserTaskStatsModel.__table__
+        result = db.session.execute(
+            table.update().where(table.c.user_id == user_id).values(
+                {table.c[column]: table.c[column] + delta for column, delta in changes.items()}
+            )
+        )
+        
+        if result.rowcount == 0:
+            self._create_stats_row(user_id)
+    
+    def _record_stats_change_from_row(self, task_id: int, user_id: int,
+                                      new_values: Optional[Dict[str, Any]]) -> int:
+        """Ajusta os contadores lendo os valores atuais da tarefa dentro do próprio SQL
+        
+        Um único UPDATE ... FROM tasks, executado antes da escrita da tarefa;
+        new_values=None indica remoção. Retorna o número de linhas afetadas.
+        """
+        table = UserTaskStatsModel.__table__
+        values = {}
+        
+        if new_values is None:
+            values[table.c.total] = table.c.total - 1
+        
+        for field, enum_type, task_column in (('status', TaskStatusEnum, TaskModel.status),
+                                              ('priority', PriorityEnum, TaskModel.priority)):
+            if new_values is not None and field not in new_values:
+                continue
+            for member in enum_type:
+                column = table.c[member.name.lower()]
+                expression = column - case((task_column == member, 1), else_=0)
+                if new_values is not None and new_values[field] == member:
+                    expression = expression + 1
+                values[column] = expression
+        
+        result = db.session.execute(
+            table.update().where(
+                table.c.user_id == TaskModel.user_id,
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_(None)
+            ).values(values)
+        )
+        return result.rowcount
+    
+    def _record_stats_restore_from_row(self, task_id: int, user_id: int) -> int:
+        """Soma aos contadores uma tarefa restaurada, lendo seus valores no próprio SQL"""
+        table = UserTaskStatsModel.__table__
+        values = {table.c.total: table.c.total + 1}
+        
+        for enum_type, task_column in ((TaskStatusEnum, TaskModel.status),
+                                       (PriorityEnum, TaskModel.priority)):
+            for member in enum_type:
+                column = table.c[member.name.lower()]
+                values[column] = column + case((task_column == member, 1), else_=0)
+        
+        result = db.session.execute(
+            table.update().where(
+                table.c.user_id == TaskModel.user_id,
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_(None)
+            ).values(values)
+        )
+        return result.rowcount
+    
+    def _record_stats_change_from_rows(self, user_id: int, task_ids: List[int],
+                                       new_values: Optional[Dict[str, Any]]) -> int:
+        """Ajusta os contadores para várias tarefas, contando seus valores atuais no próprio SQL
+        
+        Versão em lote de _record_stats_change_from_row: cada contador recebe
+        uma subconsulta de contagem sobre as tarefas vivas informadas, em um
+        único UPDATE executado antes da escrita das tarefas.
+        """
+        table = UserTaskStatsModel.__table__
+        
+        def matching(*conditions):
+            return select(func.count()).select_from(TaskModel).where(
+                TaskModel.user_id == user_id,
+                TaskModel.id.in_(task_ids),
+                TaskModel.deleted_at.is_(None),
+                *conditions
+            ).scalar_subquery()
+        
+        values = {}
+        if new_values is None:
+            values[table.c.total] = table.c.total - matching()
+        
+        for field, enum_type, task_column in (('status', TaskStatusEnum, TaskModel.status),
+                                              ('priority', PriorityEnum, TaskModel.priority)):
+            if new_values is not None and field not in new_values:
+                continue
+            for member in enum_type:
+                column = table.c[member.name.lower()]
+                expression = column - matching(task_column == member)
+                if new_values is not None and new_values[field] == member:
+                    expression = expression + matching()
+                values[column] = expression
+        
+        result = db.session.execute(table.update().where(table.c.user_id == user_id).values(values))
+        return result.rowcount
+    
+    def _record_stats_restore_from_rows(self, user_id: int, task_ids: List[int]) -> int:
+        """Soma aos contadores as tarefas com lápide que serão restauradas, contadas no próprio SQL"""
+        table = UserTaskStatsModel.__table__
+        
+        def matching(*conditions):
+            return select(func.count()).select_from(TaskModel).where(
+                TaskModel.user_id == user_id,
+                TaskModel.id.in_(task_ids),
+                TaskModel.deleted_at.is_not(None),
+                *conditions
+            ).scalar_subquery()
+        
+        values = {table.c.total: table.c.total + matching()}
+        for enum_type, task_column in ((TaskStatusEnum, TaskModel.status),
+                                       (PriorityEnum, TaskModel.priority)):
+            for member in enum_type:
+                column = table.c[member.name.lower()]
+                values[column] = column + matching(task_column == member)
+        
+        result = db.session.execute(table.update().where(table.c.user_id == user_id).values(values))
+        return result.rowcount
+    
+    def _create_stats_row(self, user_id: int) -> None:
+        """Primeira escrita do usuário: os contadores nascem da própria tabela de tarefas"""
+        db.session.flush()
+        db.session.merge(self._to_stats_model(user_id, self._aggregate_counts(user_id)))
+    
+    def get_version(self, user_id: int) -> int:
+        """Lê a versão dos dados do usuário com uma busca pela chave primária"""
+        version = db.session.query(UserTaskStatsModel.version).filter(
+            UserTaskStatsModel.user_id == user_id
+        ).scalar()
+        return version or 0
+    
+    def bump_version(self, user_id: int) -> int:
+        """Avança a versão dos dados do usuário na transação da escrita"""
+        table = UserTaskStatsModel.__table__
+        statement = table.update().where(table.c.user_id == user_id).values(
+            version=table.c.version + 1
+        ).returning(table.c.version)
+        
+        version = db.session.execute(statement).scalar()
+        if version is None:
+            self._create_stats_row(user_id)
+            db.session.flush()
+            version = db.session.execute(statement).scalar()
+        
+        self._commit()
+        return version
+    
+    def count_overdue(self, user_id: int) -> int:
+        """Conta as tarefas atrasadas sem carregar as entidades"""
+        return db.session.query(func.count(TaskModel.id)).filter(
+            TaskModel.user_id == user_id,
+            TaskModel.due_date < date.today(),
+            TaskModel.status != TaskStatusEnum.COMPLETED,
+            TaskModel.deleted_at.is_(None)
+        ).scalar()
+    
     def update(self, task: Task) -> Task:
         """Atualiza uma tarefa"""
         if not task.id:
             raise ValueError("Não é possível atualizar tarefa sem ID")
         
+        before = self._stats_values(self._get_model_for_write(task.id))
         task_model = self._to_database_model(task)
-        db.session.commit()
+        if before:
+            self._record_stats_change(task_model.user_id, before, self._stats_values(task_model))
+        
+        self._commit()
+        self._identity_register(task)
         return task
     
+    def update_status_if(self, task_id: int, user_id: int,
+                         expected_status: TaskStatus, new_status: TaskStatus) -> int:
+        """Troca o status em um único UPDATE condicional
+        
+        Só afeta a tarefa se ela pertence ao usuário e está no status esperado.
+        """
+        expected = self.STATUS_TO_DATABASE[expected_status]
+        new = self.STATUS_TO_DATABASE[new_status]
+        
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.status == expected,
+                TaskModel.deleted_at.is_(None)
+            ).values(status=new, updated_at=datetime.now())
+        )
+        
+        if result.rowcount == 0 and self._unarchive([task_id], user_id):
+            return self.update_status_if(task_id, user_id, expected_status, new_status)
+        
+        if result.rowcount:
+            self._record_stats_change(user_id, (expected,), (new,))
+        
+        self._commit()
+        self._identity_evict(Task, task_id)
+        return result.rowcount
+    
+    def complete_if_owned(self, task_id: int, user_id: int) -> Optional[TaskStatus]:
+        """Conclui a tarefa em um único UPDATE condicional, retornando o status anterior
+        
+        O status de antes vem de uma CTE materializada, lida pelo próprio WHERE
+        antes da troca e devolvida pelo RETURNING. Tarefas arquivadas já estão
+        concluídas, então não há o que trazer de volta do arquivo.
+        """
+        completed = TaskStatusEnum.COMPLETED
+        before = select(TaskModel.status.label('status')).where(
+            TaskModel.id == task_id,
+            TaskModel.user_id == user_id,
+            TaskModel.deleted_at.is_(None)
+        ).cte('before').prefix_with('MATERIALIZED')
+        previous_status = select(before.c.status).scalar_subquery()
+        
+        previous = db.session.execute(
+            sql_update(TaskModel).add_cte(before).where(
+                TaskModel.id == task_id,
+                TaskModel.status == previous_status,
+                TaskModel.status != completed
+            ).values(status=completed, updated_at=datetime.now()).returning(previous_status)
+        ).scalar()
+        
+        if previous is None:
+            return None
+        
+        self._record_stats_change(user_id, (previous,), (completed,))
+        self._commit()
+        self._identity_evict(Task, task_id)
+        return TaskStatus[previous.name]
+    
+    def update_fields_if_owned(self, task_id: int, user_id: int, fields: Dict[str, Any]) -> int:
+        """Atualiza os campos informados em um único UPDATE condicional à posse da tarefa"""
+        values = self._update_values(fields)
+        
+        stats_rows = None
+        if 'priority' in values:
+            stats_rows = self._record_stats_change_from_row(
+                task_id, user_id, {'priority': values['priority']}
+            )
+        
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_(None)
+            ).values(**values, updated_at=datetime.now())
+        )
+        
+        if result.rowcount == 0 and self._unarchive([task_id], user_id):
+            return self.update_fields_if_owned(task_id, user_id, fields)
+        
+        if result.rowcount and stats_rows == 0:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        self._identity_evict(Task, task_id)
+        return result.rowcount
+    
+    def _update_values(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Valida os campos editáveis e converte a prioridade para o enum do banco"""
+        values = dict(fields)
+        if values.get('priority') is not None:
+            values['priority'] = self.PRIORITY_TO_DATABASE[values['priority']]
+        
+        unknown_fields = set(values) - {'title', 'description', 'priority', 'due_date'}
+        if unknown_fields:
+            raise ValueError(f"Campos não suportados: {', '.join(sorted(unknown_fields))}")
+        return values
+    
+    def delete_if_owned(self, task_id: int, user_id: int) -> int:
+        """Remove logicamente a tarefa: um único UPDATE que grava a lápide
+        
+        A linha só é apagada de fato pela limpeza periódica (purge_deleted).
+        """
+        stats_rows = self._record_stats_change_from_row(task_id, user_id, None)
+        
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_(None)
+            ).values(deleted_at=datetime.now())
+        )
+        
+        if result.rowcount == 0 and self._unarchive([task_id], user_id):
+            return self.delete_if_owned(task_id, user_id)
+        
+        if result.rowcount and stats_rows == 0:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        self._identity_evict(Task, task_id)
+        return result.rowcount
+    
+    def restore_if_owned(self, task_id: int, user_id: int) -> int:
+        """Restaura uma tarefa removida logicamente, limpando a lápide"""
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id == task_id,
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_not(None)
+            ).values(deleted_at=None)
+        )
+        
+        if result.rowcount and self._record_stats_restore_from_row(task_id, user_id) == 0:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        self._identity_evict(Task, task_id)
+        return result.rowcount
+    
+    def update_fields_many_if_owned(self, user_id: int, fields_by_task: Dict[int, Dict[str, Any]]) -> int:
+        """Atualiza campos de várias tarefas do usuário com UPDATEs em lote
+        
+        As tarefas são agrupadas pelo conjunto de campos alterados e cada grupo
+        vira um único UPDATE por chave primária executado com a lista de
+        parâmetros (executemany). Os contadores recebem um UPDATE por nova prioridade.
+        """
+        self._unarchive(list(fields_by_task), user_id)
+        
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        ids_by_priority: Dict[PriorityEnum, List[int]] = {}
+        
+        for task_id, fields in fields_by_task.items():
+            values = self._update_values(fields)
+            if not values:
+                continue
+            # Parâmetros com prefixo: os nomes das colunas são reservados no UPDATE
+            parameters = {f'new_{name}': value for name, value in values.items()}
+            groups.setdefault(tuple(sorted(values)), []).append({'task_id': task_id, **parameters})
+            if 'priority' in values:
+                ids_by_priority.setdefault(values['priority'], []).append(task_id)
+        
+        missing_stats = False
+        for priority, task_ids in ids_by_priority.items():
+            missing_stats |= self._record_stats_change_from_rows(user_id, task_ids, {'priority': priority}) == 0
+        
+        table = TaskModel.__table__
+        now = datetime.now()
+        updated = 0
+        for names, parameters in groups.items():
+            statement = table.update().where(
+                table.c.id == bindparam('task_id'),
+                table.c.user_id == user_id,
+                table.c.deleted_at.is_(None)
+            ).values({table.c.updated_at: now, **{table.c[name]: bindparam(f'new_{name}') for name in names}})
+            updated += db.session.execute(statement, parameters).rowcount
+        
+        if updated and missing_stats:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        self._expire_loaded_models(fields_by_task)
+        return updated
+    
+    def _expire_loaded_models(self, task_ids) -> None:
+        """Descarta as versões já carregadas das tarefas, que os UPDATEs em lote não sincronizam"""
+        for task_id in task_ids:
+            task_model = db.session.identity_map.get(db.session.identity_key(TaskModel, task_id))
+            if task_model is not None:
+                db.session.expire(task_model)
+            self._identity_evict(Task, task_id)
+    
+    def update_status_many_if(self, user_id: int, transitions: List[tuple]) -> int:
+        """Aplica trocas (task_id, status esperado, novo status) com um UPDATE por par de status
+        
+        Como cada UPDATE só afeta tarefas no status esperado, o número de
+        linhas afetadas basta para ajustar os contadores.
+        """
+        self._unarchive([task_id for task_id, _, _ in transitions], user_id)
+        
+        ids_by_change: Dict[tuple, List[int]] = {}
+        for task_id, expected_status, new_status in transitions:
+            change = (self.STATUS_TO_DATABASE[expected_status], self.STATUS_TO_DATABASE[new_status])
+            ids_by_change.setdefault(change, []).append(task_id)
+        
+        updated = 0
+        stats_transitions = []
+        now = datetime.now()
+        for (expected, new), task_ids in ids_by_change.items():
+            result = db.session.execute(
+                sql_update(TaskModel).where(
+                    TaskModel.id.in_(task_ids),
+                    TaskModel.user_id == user_id,
+                    TaskModel.status == expected,
+                    TaskModel.deleted_at.is_(None)
+                ).values(status=new, updated_at=now)
+            )
+            updated += result.rowcount
+            stats_transitions.extend([((expected,), (new,))] * result.rowcount)
+        
+        self._record_stats_changes(user_id, stats_transitions)
+        self._commit()
+        for task_id, _, _ in transitions:
+            self._identity_evict(Task, task_id)
+        return updated
+    
+    def delete_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        """Remove logicamente várias tarefas do usuário em um único UPDATE"""
+        if not task_ids:
+            return 0
+        
+        self._unarchive(task_ids, user_id)
+        stats_rows = self._record_stats_change_from_rows(user_id, task_ids, None)
+        
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id.in_(task_ids),
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_(None)
+            ).values(deleted_at=datetime.now())
+        )
+        
+        if result.rowcount and stats_rows == 0:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        for task_id in task_ids:
+            self._identity_evict(Task, task_id)
+        return result.rowcount
+    
+    def restore_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        """Restaura várias tarefas removidas do usuário em um único UPDATE"""
+        if not task_ids:
+            return 0
+        
+        stats_rows = self._record_stats_restore_from_rows(user_id, task_ids)
+        
+        result = db.session.execute(
+            sql_update(TaskModel).where(
+                TaskModel.id.in_(task_ids),
+                TaskModel.user_id == user_id,
+                TaskModel.deleted_at.is_not(None)
+            ).values(deleted_at=None)
+        )
+        
+        if result.rowcount and stats_rows == 0:
+            self._create_stats_row(user_id)
+        
+        self._commit()
+        for task_id in task_ids:
+            self._identity_evict(Task, task_id)
+        return result.rowcount
+    
     def delete(self, task_id: int) -> bool:
-        """Remove uma tarefa"""
-        task_model = TaskModel.query.get(task_id)
+        """Remove logicamente uma tarefa"""
+        task_model = self._get_model_for_write(task_id)
         if task_model:
-            db.session.delete(task_model)
-            db.session.commit()
+            task_model.deleted_at = datetime.now()
+            self._record_stats_change(task_model.user_id, self._stats_values(task_model), None)
+            self._commit()
+            self._identity_evict(Task, task_id)
             return True
         return False
+    
+    def purge_deleted(self, deleted_before: datetime, batch_size: int = 500) -> int:
+        """Apaga de fato as tarefas com lápide anterior ao limite
+        
+        Roda fora das requisições, em lotes pequenos com commit próprio para
+        nunca segurar o lock de escrita por muito tempo.
+        """
+        removed = 0
+        while True:
+            batch = select(TaskModel.id).where(
+                TaskModel.deleted_at.is_not(None),
+                TaskModel.deleted_at < deleted_before
+            ).limit(batch_size)
+            result = db.session.execute(
+                sql_delete(TaskModel).where(TaskModel.id.in_(batch))
+            )
+            db.session.commit()
+            removed += result.rowcount
+            if result.rowcount < batch_size:
+                return removed
+    
+    def archive_completed(self, completed_before: datetime, batch_size: int = 500) -> Dict[int, int]:
+        """Move para tasks_archive as tarefas concluídas antes do limite
+        
+        Roda fora das requisições, em lotes com commit próprio. Os contadores
+        não mudam (a tarefa continua existindo), mas a versão de cada usuário
+        afetado avança: os filtros da tabela quente deixam de mostrá-las.
+        Retorna o total arquivado por usuário.
+        """
+        tasks = TaskModel.__table__
+        archive = TaskArchiveModel.__table__
+        stats = UserTaskStatsModel.__table__
+        archivable = and_(
+            tasks.c.status == TaskStatusEnum.COMPLETED,
+            tasks.c.deleted_at.is_(None),
+            tasks.c.updated_at < completed_before
+        )
+        
+        archived: Dict[int, int] = {}
+        while True:
+            task_ids = db.session.execute(select(tasks.c.id).where(archivable).limit(batch_size)).scalars().all()
+            if not task_ids:
+                return archived
+            
+            # As mesmas condições no INSERT e no DELETE: a escrita de uma requisição entre a
+            # leitura dos IDs e o INSERT tira a tarefa do lote, e o INSERT já trava o banco
+            batch = and_(tasks.c.id.in_(task_ids), archivable)
+            db.session.execute(archive.insert().from_select(
+                ARCHIVED_TASK_COLUMNS + ['archived_at'],
+                select(*[tasks.c[column] for column in ARCHIVED_TASK_COLUMNS], literal(datetime.now())).where(batch)
+            ))
+            counts: Dict[int, int] = {}
+            for user_id in db.session.execute(tasks.delete().where(batch).returning(tasks.c.user_id)).scalars():
+                counts[user_id] = counts.get(user_id, 0) + 1
+            if counts:
+                db.session.execute(
+                    stats.update().where(stats.c.user_id.in_(counts)).values(version=stats.c.version + 1)
+                )
+            db.session.commit()
+            
+            for user_id, count in counts.items():
+                archived[user_id] = archived.get(user_id, 0) + count
+            if len(task_ids) < batch_size:
+                return archived
+    
+    def _unarchive(self, task_ids: List[int], user_id: Optional[int] = None) -> int:
+        """Devolve tarefas arquivadas para tasks antes de uma escrita; retorna quantas voltaram"""
+        if not task_ids:
+            return 0
+        
+        tasks = TaskModel.__table__
+        archive = TaskArchiveModel.__table__
+        condition = archive.c.id.in_(task_ids)
+        if user_id is not None:
+            condition = and_(condition, archive.c.user_id == user_id)
+        
+        result = db.session.execute(tasks.insert().from_select(
+            ARCHIVED_TASK_COLUMNS, select(*[archive.c[column] for column in ARCHIVED_TASK_COLUMNS]).where(condition)
+        ))
+        if result.rowcount:
+            db.session.execute(archive.delete().where(condition))
+        return result.rowcount
 
 
-class UserRepositoryImpl(IUserRepository):
+class UserRepositoryImpl(SqlAlchemyRepository, IUserRepository):
     """Implementação concreta do repositório de usuários usando SQLAlchemy"""
     
     def _to_domain_entity(self, user_model: UserModel) -> User:
@@ -203,7 +1390,7 @@ class UserRepositoryImpl(IUserRepository):
         if not user.id:
             db.session.add(user_model)
         
-        db.session.commit()
+        self._commit()
         
         # Atualizar o ID da entidade se for nova
         if not user.id:
@@ -231,5 +1418,120 @@ class UserRepositoryImpl(IUserRepository):
             raise ValueError("Não é possível atualizar usuário sem ID")
         
         user_model = self._to_database_model(user)
-        db.session.commit()
-        return user 
\ No newline at end of file
+        self._commit()
+        return user 
+
+
+class CommandJournalRepositoryImpl(SqlAlchemyRepository, ICommandJournal):
+    """Journal de comandos em tabela, gravado na transação da requisição
+    
+    Só os comandos executados são acrescentados. Undo e redo são UPDATEs
+    condicionais da coluna undone, e cada append apaga os registros
+    desfeitos do usuário; o histórico não é um log append-only de eventos.
+    """
+    
+    _TABLE = CommandJournalModel.__table__
+    
+    _DISCARD_UNDONE = _TABLE.delete().where(
+        _TABLE.c.user_id == bindparam('user_id'),
+        _TABLE.c.undone.is_(True)
+    )
+    
+    # Parâmetros com prefixo: os nomes das colunas são reservados no INSERT
+    _APPEND = _TABLE.insert().values(
+        user_id=bindparam('new_user_id'),
+        seq=select(func.coalesce(func.max(_TABLE.c.seq), 0) + 1).where(
+            _TABLE.c.user_id == bindparam('new_user_id')
+        ).scalar_subquery(),
+        command_type=bindparam('new_command_type'),
+        payload=bindparam('new_payload'),
+        undone=False,
+        created_at=bindparam('new_created_at')
+    ).returning(_TABLE.c.id, _TABLE.c.seq)
+    
+    def _to_domain_entity(self, entry_model: CommandJournalModel) -> CommandJournalEntry:
+        """Converte modelo do banco para entidade do domínio"""
+        return CommandJournalEntry(
+            id=entry_model.id,
+            user_id=entry_model.user_id,
+            seq=entry_model.seq,
+            command_type=entry_model.command_type,
+            payload=json.loads(entry_model.payload),
+            undone=entry_model.undone
+        )
+    
+    def _encode_payload(self, payload: Dict[str, Any]) -> str:
+        return json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    
+    def append(self, user_id: int, command_type: str, payload: Dict[str, Any]) -> CommandJournalEntry:
+        """Acrescenta um comando ao journal, descartando os comandos desfeitos
+        
+        O número de sequência é calculado no próprio INSERT; o índice único
+        (user_id, seq) impede que duas escritas concorrentes o repitam. As
+        instruções são montadas uma única vez: a cada escrita só mudam os
+        parâmetros.
+        """
+        db.session.execute(self._DISCARD_UNDONE, {'user_id': user_id})
+        entry_id, seq = db.session.execute(self._APPEND, {
+            'new_user_id': user_id,
+            'new_command_type': command_type,
+            'new_payload': self._encode_payload(payload),
+            'new_created_at': datetime.now()
+        }).one()
+        
+        self._commit()
+        return CommandJournalEntry(entry_id, user_id, seq, command_type, payload)
+    
+    def last_done(self, user_id: int) -> Optional[CommandJournalEntry]:
+        """Busca o último comando ainda não desfeito"""
+        entry_model = CommandJournalModel.query.filter_by(
+            user_id=user_id, undone=False
+        ).order_by(CommandJournalModel.seq.desc()).first()
+        return self._to_domain_entity(entry_model) if entry_model else None
+    
+    def first_undone(self, user_id: int) -> Optional[CommandJournalEntry]:
+        """Busca o comando desfeito mais antigo, o próximo a ser refeito"""
+        entry_model = CommandJournalModel.query.filter_by(
+            user_id=user_id, undone=True
+        ).order_by(CommandJournalModel.seq.asc()).first()
+        return self._to_domain_entity(entry_model) if entry_model else None
+    
+    def mark(self, entry: CommandJournalEntry, undone: bool) -> bool:
+        """Marca um comando como desfeito ou refeito, se ainda está no estado oposto
+        
+        O UPDATE é condicional ao estado anterior: de duas requisições que
+        leram o mesmo registro, só a primeira o marca e pode aplicá-lo.
+        """
+        result = db.session.execute(
+            sql_update(CommandJournalModel).where(
+                CommandJournalModel.id == entry.id,
+                CommandJournalModel.user_id == entry.user_id,
+                CommandJournalModel.undone.is_(not undone)
+            ).values(undone=undone)
+        )
+        self._commit()
+        return result.rowcount > 0
+    
+    def compact(self, keep_per_user: int, batch_size: int = 1000) -> int:
+        """Remove os registros antigos, mantendo os mais recentes de cada usuário
+        
+        Roda fora das requisições, em lotes com commit próprio para não
+        segurar o lock de escrita do banco por muito tempo.
+        """
+        newest = CommandJournalModel.__table__.alias('newest')
+        latest_seq = select(func.max(newest.c.seq)).where(
+            newest.c.user_id == CommandJournalModel.user_id
+        ).scalar_subquery()
+        
+        removed = 0
+        while True:
+            batch = select(CommandJournalModel.id).where(
+                CommandJournalModel.seq <= latest_seq - keep_per_user
+            ).limit(batch_size)
+            result = db.session.execute(
+                sql_delete(CommandJournalModel).where(CommandJournalModel.id.in_(batch))
+            )
+            db.session.commit()
+            removed += result.rowcount
+            if result.rowcount < batch_size:
+                return removed
\ No newline at end of file
@@ -0,0 +1,547 @@
+import bisect
+import hashlib
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+from sqlalchemy import Column, Integer, MetaData, Table, func, inspect, select, exists, or_
+from domain.entities import Task, Priority, TaskStatus, CommandJournalEntry
+from domain.interfaces import ITaskRepository, IUnitOfWork, IUserVersionTracker, ICommandJournal
+from domain.specifications import TaskCriterion, TaskSortKey, TaskPage, TaskCounts, TaskProjection
+from domain.task_batch import TaskBatch
+from .database import (
+    db, db_connection, TaskModel, TaskArchiveModel, UserModel, UserTaskStatsModel, CommandJournalModel, ACTIVE_SHARD
+)
+from .migrations import upgrade_schema, SEARCH_INDEX_TABLE
+from .repositories import SqlAlchemyRepository, TaskRepositoryImpl
+
+
+# IDs de tarefas alocados pelos shards: sequência * ID_STRIDE + índice do shard, de modo
+# que nunca colidam entre bancos. O primário usa o último índice para os usuários
+# que ainda não saíram dele
+ID_STRIDE = 1024
+PRIMARY_SHARD_INDEX = ID_STRIDE - 1
+
+# Valor de users.shard para tarefas que continuam nas tabelas do primário
+PRIMARY_LOCATION = 'primary'
+
+# Chave de Session.info com o shard de cada usuário já consultado na requisição e se ele
+# já está gravado no diretório
+SHARD_DIRECTORY_MEMO = 'task_shard_directory'
+
+# Contador de IDs de cada banco de tarefas, fora dos modelos da aplicação
+id_sequence_metadata = MetaData()
+TASK_ID_SEQUENCE = Table(
+    'task_id_sequence', id_sequence_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('next_value', Integer, nullable=False)
+)
+
+
+class ConsistentHashRing:
+    """Anel de hash consistente: incluir um shard só move a fração de usuários que cabe a ele"""
+    
+    def __init__(self, nodes: List[str], virtual_nodes: int = 64):
+        if not nodes:
+            raise ValueError("O anel precisa de ao menos um shard")
+        points = sorted((self._hash(f'{node}#{replica}'), node) for node in nodes for replica in range(virtual_nodes))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+    
+    def node_for(self, key: Any) -> str:
+        """Shard responsável pela chave: o primeiro ponto do anel a partir do hash dela"""
+        position = bisect.bisect(self._hashes, self._hash(str(key))) % len(self._hashes)
+        return self._nodes[position]
+
+
+@contextmanager
+def on_shard(bind_key: Optional[str]) -> Iterator[None]:
+    """Envia ao shard informado as instruções sobre tarefas e contadores; None é o primário"""
+    previous = db.session.info.get(ACTIVE_SHARD)
+    db.session.info[ACTIVE_SHARD] = bind_key
+    try:
+        yield
+    finally:
+        db.session.info[ACTIVE_SHARD] = previous
+
+
+def create_shard_schema(database) -> None:
+    """Cria as tabelas de tarefas nos shards e o contador de IDs em cada banco de tarefas
+    
+    Os contadores começam acima do maior ID já gravado no primário, de modo
+    que os IDs antigos, movidos para os shards pelo rebalanceamento, continuem
+    únicos.
+    """
+    first_sequence = (database.session.query(func.max(TaskModel.id)).scalar() or 0) // ID_STRIDE + 1
+    tables = [TaskModel.__table__, TaskArchiveModel.__table__, UserTaskStatsModel.__table__,
+              CommandJournalModel.__table__]
+    
+    for bind_key in [None] + db_connection.shard_binds():
+        engine = db_connection.engine_for(bind_key)
+        if bind_key is not None:
+            database.metadata.create_all(engine, tables=tables)
+            upgrade_schema(database, engine)
+        id_sequence_metadata.create_all(engine)
+        with engine.begin() as connection:
+            if connection.execute(select(TASK_ID_SEQUENCE.c.id)).first() is None:
+                connection.execute(TASK_ID_SEQUENCE.insert().values(id=1, next_value=first_sequence))
+
+
+class ShardTaskRepository(TaskRepositoryImpl):
+    """Repositório de tarefas de um único shard, com IDs alocados pelo contador do shard"""
+    
+    def __init__(self, bind_key: Optional[str], shard_index: int,
+                 unit_of_work: Optional[IUnitOfWork] = None):
+        super().__init__(unit_of_work)
+        self.bind_key = bind_key
+        self.shard_index = shard_index
+    
+    def _allocate_ids(self, count: int) -> Optional[List[int]]:
+        """Reserva count valores do contador do shard em um único UPDATE ... RETURNING"""
+        if count == 0:
+            return []
+        last = db.session.execute(
+            TASK_ID_SEQUENCE.update().where(TASK_ID_SEQUENCE.c.id == 1).values(
+                next_value=TASK_ID_SEQUENCE.c.next_value + count
+            ).returning(TASK_ID_SEQUENCE.c.next_value)
+        ).scalar_one()
+        return [sequence * ID_STRIDE + self.shard_index for sequence in range(last - count, last)]
+    
+    def _has_search_index(self) -> bool:
+        """Verifica uma única vez se o banco do shard tem o índice FTS5 de busca"""
+        if self._search_index_available is None:
+            engine = db_connection.engine_for(self.bind_key)
+            self._search_index_available = inspect(engine).has_table(SEARCH_INDEX_TABLE)
+        return self._search_index_available
+
+
+class ShardedTaskRepository(SqlAlchemyRepository, ITaskRepository, IUserVersionTracker):
+    """Repositório de tarefas particionado por usuário entre vários bancos - Proxy Pattern
+    
+    O shard de cada usuário fica em users.shard, no primário, gravado na
+    primeira escrita de tarefas do usuário. Usuários novos recebem o shard do
+    anel de hash consistente; os que já tinham tarefas antes do sharding
+    continuam no primário até o rebalanceamento. Leituras só por ID consultam
+    primeiro o shard codificado no ID e depois os demais.
+    """
+    
+    def __init__(self, unit_of_work: Optional[IUnitOfWork] = None, virtual_nodes: int = 64):
+        super().__init__(unit_of_work)
+        self._virtual_nodes = virtual_nodes
+        self._ring: Optional[ConsistentHashRing] = None
+        self._repositories: Dict[Optional[str], ShardTaskRepository] = {}
+    
+    # --- Roteamento ---
+    
+    def ring(self) -> ConsistentHashRing:
+        """Anel dos shards configurados, montado no primeiro uso"""
+        if self._ring is None:
+            self._ring = ConsistentHashRing(db_connection.shard_binds(), self._virtual_nodes)
+        return self._ring
+    
+    def repository(self, bind_key: Optional[str]) -> ShardTaskRepository:
+        """Repositório de um shard; None é o das tarefas que continuam no primário"""
+        if bind_key not in self._repositories:
+            shard_index = PRIMARY_SHARD_INDEX if bind_key is None else db_connection.shard_binds().index(bind_key)
+            self._repositories[bind_key] = ShardTaskRepository(bind_key, shard_index, self._unit_of_work)
+        return self._repositories[bind_key]
+    
+    def locations(self) -> List[Optional[str]]:
+        """Todos os bancos com tarefas: os shards e o primário"""
+        return db_connection.shard_binds() + [None]
+    
+    def location_of(self, user_id: int, assign: bool = False) -> Optional[str]:
+        """Bind do shard do usuário, lido do diretório uma vez por requisição
+        
+        Sem shard no diretório, as leituras usam o que seria atribuído, sem
+        gravá-lo: só as escritas (assign=True) gravam o diretório, de modo que
+        um GET nunca escreve no primário nem falha em uma réplica só de leitura.
+        """
+        memo = db.session.info.setdefault(SHARD_DIRECTORY_MEMO, {})
+        if user_id not in memo or (assign and not memo[user_id][1]):
+            stored = db.session.execute(select(UserModel.shard).where(UserModel.id == user_id)).scalar()
+            assigned = stored is not None
+            if not assigned:
+                stored = self._assign_location(user_id) if assign else self._default_location(user_id)
+                assigned = assign
+            memo[user_id] = (None if stored == PRIMARY_LOCATION else stored, assigned)
+        return memo[user_id][0]
+    
+    def _default_location(self, user_id: int) -> str:
+        """Shard de um usuário ainda sem shard no diretório
+        
+        Quem já tem tarefas no primário fica nele até o rebalanceamento; os
+        demais vão para o shard do anel.
+        """
+        legacy = db.session.execute(select(or_(
+            exists().where(TaskModel.user_id == user_id),
+            exists().where(UserTaskStatsModel.user_id == user_id)
+        ))).scalar()
+        return PRIMARY_LOCATION if legacy else self.ring().node_for(user_id)
+    
+    def _assign_location(self, user_id: int) -> str:
+        """Grava no diretório o shard de um usuário ainda sem shard
+        
+        O UPDATE só vale se ninguém gravou antes, e a releitura (já no
+        primário) devolve o valor vencedor.
+        """
+        location = self._default_location(user_id)
+        users = UserModel.__table__
+        result = db.session.execute(
+            users.update().where(users.c.id == user_id, users.c.shard.is_(None)).values(shard=location)
+        )
+        if result.rowcount == 0:
+            return db.session.execute(select(UserModel.shard).where(UserModel.id == user_id)).scalar() or location
+        self._commit()
+        return location
+    
+    def forget_locations(self) -> None:
+        """Descarta os shards já consultados, depois de o diretório mudar"""
+        db.session.info.pop(SHARD_DIRECTORY_MEMO, None)
+    
+    @contextmanager
+    def _for_user(self, user_id: int, write: bool = False) -> Iterator[ShardTaskRepository]:
+        """Repositório do shard do usuário, com o roteamento da sessão ativo"""
+        bind_key = self.location_of(user_id, assign=write)
+        with on_shard(bind_key):
+            yield self.repository(bind_key)
+    
+    def _locations_for_id(self, task_id: int) -> List[Optional[str]]:
+        """Bancos em que procurar uma tarefa, começando pelo shard que alocou o ID"""
+        shards = db_connection.shard_binds()
+        shard_index = task_id % ID_STRIDE
+        if shard_index == PRIMARY_SHARD_INDEX:
+            hinted = None
+        elif shard_index < len(shards):
+            hinted = shards[shard_index]
+        else:
+            return self.locations()
+        return [hinted] + [location for location in self.locations() if location != hinted]
+    
+    # --- Operações por usuário ---
+    
+    def save(self, task: Task) -> Task:
+        with self._for_user(task.user_id, write=True) as repository:
+            return repository.save(task)
+    
+    def save_many(self, tasks: List[Task]) -> List[Task]:
+        tasks_by_location = {}
+        for task in tasks:
+            tasks_by_location.setdefault(self.location_of(task.user_id, assign=True), []).append(task)
+        for bind_key, location_tasks in tasks_by_location.items():
+            with on_shard(bind_key):
+                self.repository(bind_key).save_many(location_tasks)
+        return tasks
+    
+    def find_by_user_id(self, user_id: int,
+                        projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        with self._for_user(user_id) as repository:
+            return repository.find_by_user_id(user_id, projection)
+    
+    def find_by_status(self, user_id: int, status: TaskStatus,
+                       projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        with self._for_user(user_id) as repository:
+            return repository.find_by_status(user_id, status, projection)
+    
+    def find_by_priority(self, user_id: int, priority: Priority,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        with self._for_user(user_id) as repository:
+            return repository.find_by_priority(user_id, priority, projection)
+    
+    def find_by_due_date(self, user_id: int, due_date: date,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        with self._for_user(user_id) as repository:
+            return repository.find_by_due_date(user_id, due_date, projection)
+    
+    def find_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                         sort_keys: List[TaskSortKey],
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        with self._for_user(user_id) as repository:
+            return repository.find_by_criteria(user_id, criteria, sort_keys, projection)
+    
+    def find_page(self, user_id: int, criteria: List[TaskCriterion],
+                  sort_keys: List[TaskSortKey], limit: int,
+                  cursor: Optional[str] = None,
+                  projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        with self._for_user(user_id) as repository:
+            return repository.find_page(user_id, criteria, sort_keys, limit, cursor, projection)
+    
+    def stream_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                           sort_keys: List[TaskSortKey], chunk_size: int = 1000) -> Iterator[Task]:
+        # O shard fica ativo enquanto a leitura em fluxo durar
+        with self._for_user(user_id) as repository:
+            yield from repository.stream_by_criteria(user_id, criteria, sort_keys, chunk_size)
+    
+    def find_batch(self, user_id: int, include_archived: bool = False) -> TaskBatch:
+        with self._for_user(user_id) as repository:
+            return repository.find_batch(user_id, include_archived)
+    
+    def search(self, user_id: int, query: str, limit: int,
+               cursor: Optional[str] = None,
+               projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        with self._for_user(user_id) as repository:
+            return repository.search(user_id, query, limit, cursor, projection)
+    
+    def count_tasks(self, user_id: int) -> TaskCounts:
+        with self._for_user(user_id) as repository:
+            return repository.count_tasks(user_id)
+    
+    def count_overdue(self, user_id: int) -> int:
+        with self._for_user(user_id) as repository:
+            return repository.count_overdue(user_id)
+    
+    def update(self, task: Task) -> Task:
+        with self._for_user(task.user_id, write=True) as repository:
+            return repository.update(task)
+    
+    def update_status_if(self, task_id: int, user_id: int,
+                         expected_status: TaskStatus, new_status: TaskStatus) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.update_status_if(task_id, user_id, expected_status, new_status)
+    
+    def complete_if_owned(self, task_id: int, user_id: int) -> Optional[TaskStatus]:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.complete_if_owned(task_id, user_id)
+    
+    def update_fields_if_owned(self, task_id: int, user_id: int, fields: Dict[str, Any]) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.update_fields_if_owned(task_id, user_id, fields)
+    
+    def delete_if_owned(self, task_id: int, user_id: int) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.delete_if_owned(task_id, user_id)
+    
+    def restore_if_owned(self, task_id: int, user_id: int) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.restore_if_owned(task_id, user_id)
+    
+    def update_fields_many_if_owned(self, user_id: int, fields_by_task: Dict[int, Dict[str, Any]]) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.update_fields_many_if_owned(user_id, fields_by_task)
+    
+    def update_status_many_if(self, user_id: int, transitions: List[tuple]) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.update_status_many_if(user_id, transitions)
+    
+    def delete_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.delete_many_if_owned(user_id, task_ids)
+    
+    def restore_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.restore_many_if_owned(user_id, task_ids)
+    
+    def get_version(self, user_id: int) -> int:
+        with self._for_user(user_id) as repository:
+            return repository.get_version(user_id)
+    
+    def bump_version(self, user_id: int) -> int:
+        with self._for_user(user_id, write=True) as repository:
+            return repository.bump_version(user_id)
+    
+    # --- Operações só por ID: consultam os shards até encontrar ---
+    
+    def find_by_id(self, task_id: int) -> Optional[Task]:
+        for bind_key in self._locations_for_id(task_id):
+            with on_shard(bind_key):
+                task = self.repository(bind_key).find_by_id(task_id)
+            if task is not None:
+                return task
+        return None
+    
+    def find_by_ids(self, task_ids: List[int],
+                    projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        """Busca os IDs agrupados pelo shard que os alocou; os não encontrados seguem para os demais"""
+        tasks_by_id = {}
+        missing = list(dict.fromkeys(task_ids))
+        for attempt in range(len(self.locations())):
+            ids_by_location = {}
+            for task_id in missing:
+                ids_by_location.setdefault(self._locations_for_id(task_id)[attempt], []).append(task_id)
+            for bind_key, location_ids in ids_by_location.items():
+                with on_shard(bind_key):
+                    for task in self.repository(bind_key).find_by_ids(location_ids, projection):
+                        tasks_by_id[task.id] = task
+            missing = [task_id for task_id in missing if task_id not in tasks_by_id]
+            if not missing:
+                break
+        return [tasks_by_id[task_id] for task_id in task_ids if task_id in tasks_by_id]
+    
+    def delete(self, task_id: int) -> bool:
+        for bind_key in self._locations_for_id(task_id):
+            with on_shard(bind_key):
+                if self.repository(bind_key).delete(task_id):
+                    return True
+        return False
+    
+    # --- Manutenção em todos os shards ---
+    
+    def purge_deleted(self, deleted_before: datetime, batch_size: int = 500) -> int:
+        removed = 0
+        for bind_key in self.locations():
+            with on_shard(bind_key):
+                removed += self.repository(bind_key).purge_deleted(deleted_before, batch_size)
+        return removed
+    
+    def archive_completed(self, completed_before: datetime, batch_size: int = 500) -> Dict[int, int]:
+        archived = {}
+        for bind_key in self.locations():
+            with on_shard(bind_key):
+                archived.update(self.repository(bind_key).archive_completed(completed_before, batch_size))
+        return archived
+    
+    def rebuild_stats(self) -> List[tuple]:
+        """Reconstrói os contadores de cada shard e junta as divergências encontradas"""
+        drift = []
+        for bind_key in self.locations():
+            with on_shard(bind_key):
+                drift.extend(self.repository(bind_key).rebuild_stats())
+        return drift
+
+
+class ShardedCommandJournal(ICommandJournal):
+    """Journal de comandos gravado no shard de cada usuário - Proxy Pattern
+    
+    Cada comando fica no mesmo banco das tarefas que ele altera: as escritas
+    de usuários de shards diferentes não disputam o lock do primário.
+    """
+    
+    def __init__(self, journal: ICommandJournal, task_repository: ShardedTaskRepository):
+        self._journal = journal
+        self._task_repository = task_repository
+    
+    def append(self, user_id: int, command_type: str, payload: Dict[str, Any]) -> CommandJournalEntry:
+        with on_shard(self._task_repository.location_of(user_id, assign=True)):
+            return self._journal.append(user_id, command_type, payload)
+    
+    def last_done(self, user_id: int) -> Optional[CommandJournalEntry]:
+        with on_shard(self._task_repository.location_of(user_id)):
+            return self._journal.last_done(user_id)
+    
+    def first_undone(self, user_id: int) -> Optional[CommandJournalEntry]:
+        with on_shard(self._task_repository.location_of(user_id)):
+            return self._journal.first_undone(user_id)
+    
+    def mark(self, entry: CommandJournalEntry, undone: bool) -> bool:
+        with on_shard(self._task_repository.location_of(entry.user_id, assign=True)):
+            return self._journal.mark(entry, undone)
+    
+    def compact(self, keep_per_user: int, batch_size: int = 1000) -> int:
+        removed = 0
+        for bind_key in self._task_repository.locations():
+            with on_shard(bind_key):
+                removed += self._journal.compact(keep_per_user, batch_size)
+        return removed
+
+
+class TaskShardRebalancer:
+    """Move os usuários para o shard indicado pelo anel, em lotes
+    
+    Para cada lote: copia tarefas, contadores e journal para o destino, troca o shard
+    no diretório, copia de novo o que foi escrito na origem durante a troca
+    e só então apaga os dados da origem. Cada banco tem sua própria
+    transação; uma falha no meio deixa cópias no destino que a próxima
+    execução substitui.
+    """
+    
+    def __init__(self, repository: ShardedTaskRepository):
+        self._repository = repository
+    
+    def rebalance(self, batch_size: int = 100) -> int:
+        """Move os usuários fora do shard do anel; retorna quantos foram movidos"""
+        ring = self._repository.ring()
+        users = UserModel.__table__
+        primary = db_connection.engine_for(None)
+        moved = 0
+        last_id = 0
+        
+        while True:
+            with primary.connect() as connection:
+                rows = connection.execute(
+                    select(users.c.id, users.c.shard).where(users.c.id > last_id).order_by(users.c.id).limit(batch_size)
+                ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            
+            moves = {}
+            for user_id, stored in rows:
+                source = None if stored in (None, PRIMARY_LOCATION) else stored
+                target = ring.node_for(user_id)
+                if source != target:
+                    moves.setdefault((source, target), []).append(user_id)
+            
+            for (source, target), user_ids in moves.items():
+                self.move_users(source, target, user_ids)
+                moved += len(user_ids)
+        
+        self._repository.forget_locations()
+        return moved
+    
+    def move_users(self, source: Optional[str], target: str, user_ids: List[int]) -> None:
+        """Move as tarefas e os contadores dos usuários entre dois bancos de tarefas"""
+        users = UserModel.__table__
+        self._copy(source, target, user_ids)
+        
+        with db_connection.engine_for(None).begin() as connection:
+            connection.execute(users.update().where(users.c.id.in_(user_ids)).values(shard=target))
+        
+        # Escritas de requisições que leram o diretório antes da troca
+        self._copy(source, target, user_ids)
+        
+        with db_connection.engine_for(source).begin() as connection:
+            for table in (TaskModel.__table__, TaskArchiveModel.__table__, UserTaskStatsModel.__table__,
+                          CommandJournalModel.__table__):
+                connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+    
+    def _copy(self, source: Optional[str], target: str, user_ids: List[int]) -> None:
+        """Substitui no destino as tarefas e o journal dos usuários pelos da origem e refaz os contadores
+        
+        A versão de cada usuário avança, de modo que caches e ETags da
+        versão anterior deixem de valer. Os registros do journal recebem IDs
+        novos no destino; a ordem de cada usuário está em seq.
+        """
+        tasks = TaskModel.__table__
+        archive = TaskArchiveModel.__table__
+        stats = UserTaskStatsModel.__table__
+        journal = CommandJournalModel.__table__
+        
+        with db_connection.engine_for(source).connect() as connection:
+            task_rows = [dict(row) for row in connection.execute(
+                select(tasks).where(tasks.c.user_id.in_(user_ids))
+            ).mappings()]
+            archived_rows = [dict(row) for row in connection.execute(
+                select(archive).where(archive.c.user_id.in_(user_ids))
+            ).mappings()]
+            versions = dict(connection.execute(
+                select(stats.c.user_id, stats.c.version).where(stats.c.user_id.in_(user_ids))
+            ).all())
+            journal_rows = [dict(row) for row in connection.execute(
+                select(*[column for column in journal.c if column.name != 'id']).where(journal.c.user_id.in_(user_ids))
+            ).mappings()]
+        
+        stats_rows = {user_id: self._empty_stats(user_id, versions.get(user_id, 0) + 1) for user_id in user_ids}
+        for row in task_rows + archived_rows:
+            if row.get('deleted_at') is None:
+                counters = stats_rows[row['user_id']]
+                for column in ('total', row['status'].name.lower(), row['priority'].name.lower()):
+                    counters[column] += 1
+        
+        with db_connection.engine_for(target).begin() as connection:
+            for table in (tasks, archive, stats, journal):
+                connection.execute(table.delete().where(table.c.user_id.in_(user_ids)))
+            if task_rows:
+                connection.execute(tasks.insert(), task_rows)
+            if archived_rows:
+                connection.execute(archive.insert(), archived_rows)
+            if journal_rows:
+                connection.execute(journal.insert(), journal_rows)
+            connection.execute(stats.insert(), list(stats_rows.values()))
+    
+    def _empty_stats(self, user_id: int, version: int) -> Dict[str, int]:
+        """Linha de user_task_stats zerada para o usuário"""
+        columns = ['total'] + [status.name.lower() for status in TaskStatus] + [priority.name.lower() for priority in Priority]
+        return {'user_id': user_id, 'version': version, **{column: 0 for column in columns}}
\ No newline at end of file
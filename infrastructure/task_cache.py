@@ -0,0 +1,287 @@
+import copy
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set
+from domain.entities import Task, Priority, TaskStatus
+from domain.interfaces import ITaskRepository, IUserVersionTracker
+from domain.specifications import TaskCriterion, TaskSortKey, TaskPage, TaskCounts, TaskProjection
+from domain.task_batch import TaskBatch
+
+
+class _CacheEntry:
+    """Valor em cache com validade e tamanho estimado"""
+    
+    __slots__ = ('user_id', 'value', 'size', 'expires_at')
+    
+    def __init__(self, user_id: int, value: Any, size: int, expires_at: float):
+        self.user_id = user_id
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class TaskCache:
+    """Cache LRU com TTL e orçamento de memória para leituras de tarefas
+    
+    As chaves incluem a versão do usuário gravada no banco, lida antes de
+    cada leitura. Uma escrita de qualquer processo avança essa versão, e as
+    entradas antigas deixam de ser encontradas em todos os workers; uma
+    leitura que tenha começado antes da escrita fica gravada sob a versão
+    antiga, sem nunca ser servida.
+    """
+    
+    def __init__(self, version_tracker: IUserVersionTracker, max_entries: int = 1000,
+                 ttl_seconds: float = 30, max_bytes: int = 16 * 1024 * 1024):
+        self._version_tracker = version_tracker
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, _CacheEntry]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Hashable]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        
+        # Contadores expostos por stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get_or_load(self, user_id: int, key: tuple, loader: Callable[[], Any]) -> Any:
+        """Devolve uma cópia do valor em cache ou o carrega com loader"""
+        version = self._version_tracker.get_version(user_id)
+        cache_key = key + (version,)
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return self._copy(entry.value)
+            if entry is not None:
+                self._remove(cache_key)
+            self.misses += 1
+        
+        value = loader()
+        self._store(cache_key, user_id, version, value, now + self._ttl_seconds)
+        return self._copy(value)
+    
+    def stats(self) -> Dict[str, int]:
+        """Contadores de acertos, faltas e descartes, e o uso atual"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes
+            }
+    
+    def _store(self, cache_key: Hashable, user_id: int, version: int, value: Any, expires_at: float) -> None:
+        size = self._estimate_size(value)
+        if size > self._max_bytes:
+            return
+        
+        with self._lock:
+            # Entradas do usuário sob outras versões nunca mais serão encontradas
+            for stale_key in [key for key in self._keys_by_user.get(user_id, ()) if key[-1] != version]:
+                self._remove(stale_key)
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            self._entries[cache_key] = _CacheEntry(user_id, self._copy(value), size, expires_at)
+            self._keys_by_user.setdefault(user_id, set()).add(cache_key)
+            self._bytes += size
+            
+            # Descarta as menos usadas até caber no limite de entradas e de memória
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def _remove(self, cache_key: Hashable) -> None:
+        entry = self._entries.pop(cache_key)
+        self._bytes -= entry.size
+        user_keys = self._keys_by_user.get(entry.user_id)
+        if user_keys is not None:
+            user_keys.discard(cache_key)
+            if not user_keys:
+                del self._keys_by_user[entry.user_id]
+    
+    def _copy(self, value: Any) -> Any:
+        """Cópia defensiva: entidades devolvidas podem ser alteradas por quem as recebe"""
+        if isinstance(value, Task):
+            return copy.copy(value)
+        if isinstance(value, list):
+            return [self._copy(item) for item in value]
+        if isinstance(value, TaskPage):
+            return TaskPage(items=self._copy(value.items), next_cursor=value.next_cursor)
+        if isinstance(value, TaskCounts):
+            return TaskCounts(value.total, dict(value.by_status), dict(value.by_priority))
+        return value
+    
+    def _estimate_size(self, value: Any) -> int:
+        """Estimativa barata do tamanho em bytes de um valor em cache"""
+        if isinstance(value, Task):
+            return (sys.getsizeof(value) + sys.getsizeof(value.__dict__)
+                    + sys.getsizeof(value.title) + sys.getsizeof(value.description))
+        if isinstance(value, list):
+            return sys.getsizeof(value) + sum(self._estimate_size(item) for item in value)
+        if isinstance(value, TaskPage):
+            return sys.getsizeof(value) + self._estimate_size(value.items)
+        if isinstance(value, TaskCounts):
+            return sys.getsizeof(value) + 2 * sys.getsizeof(value.by_status)
+        return sys.getsizeof(value)
+
+
+class CachedTaskRepository(ITaskRepository):
+    """Decorator de ITaskRepository que serve as leituras a partir do TaskCache
+    
+    As escritas são repassadas sem alteração; a invalidação vem do avanço da
+    versão do usuário no banco, feito pelo invoker de comandos.
+    """
+    
+    def __init__(self, repository: ITaskRepository, cache: TaskCache):
+        self._repository = repository
+        self._cache = cache
+    
+    def find_by_id(self, task_id: int) -> Optional[Task]:
+        # Busca pela chave primária, do mesmo custo que a leitura da versão que validaria o cache
+        return self._repository.find_by_id(task_id)
+    
+    def find_by_user_id(self, user_id: int,
+                        projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        return self._cache.get_or_load(
+            user_id, ('find_by_user_id', user_id, projection),
+            lambda: self._repository.find_by_user_id(user_id, projection)
+        )
+    
+    def find_by_status(self, user_id: int, status: TaskStatus,
+                       projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        return self._cache.get_or_load(
+            user_id, ('find_by_status', user_id, status, projection),
+            lambda: self._repository.find_by_status(user_id, status, projection)
+        )
+    
+    def find_by_priority(self, user_id: int, priority: Priority,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        return self._cache.get_or_load(
+            user_id, ('find_by_priority', user_id, priority, projection),
+            lambda: self._repository.find_by_priority(user_id, priority, projection)
+        )
+    
+    def find_by_due_date(self, user_id: int, due_date: date,
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        return self._cache.get_or_load(
+            user_id, ('find_by_due_date', user_id, due_date, projection),
+            lambda: self._repository.find_by_due_date(user_id, due_date, projection)
+        )
+    
+    def find_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                         sort_keys: List[TaskSortKey],
+                         projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        # Critérios relativos à data atual mudam de resultado na virada do dia
+        return self._cache.get_or_load(
+            user_id, ('find_by_criteria', user_id, date.today(),
+                      self._freeze(criteria), tuple(sort_keys), projection),
+            lambda: self._repository.find_by_criteria(user_id, criteria, sort_keys, projection)
+        )
+    
+    def find_page(self, user_id: int, criteria: List[TaskCriterion],
+                  sort_keys: List[TaskSortKey], limit: int,
+                  cursor: Optional[str] = None,
+                  projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        return self._cache.get_or_load(
+            user_id, ('find_page', user_id, date.today(), self._freeze(criteria),
+                      tuple(sort_keys), limit, cursor, projection),
+            lambda: self._repository.find_page(user_id, criteria, sort_keys, limit, cursor, projection)
+        )
+    
+    def stream_by_criteria(self, user_id: int, criteria: List[TaskCriterion],
+                           sort_keys: List[TaskSortKey], chunk_size: int = 1000) -> Iterator[Task]:
+        # Leituras em fluxo não cabem no cache
+        return self._repository.stream_by_criteria(user_id, criteria, sort_keys, chunk_size)
+    
+    def find_batch(self, user_id: int, include_archived: bool = False) -> TaskBatch:
+        # Lotes colunares são grandes e já baratos de montar; não passam pelo cache
+        return self._repository.find_batch(user_id, include_archived)
+    
+    def find_by_ids(self, task_ids: List[int],
+                    projection: TaskProjection = TaskProjection.LIST) -> List[Task]:
+        return self._repository.find_by_ids(task_ids, projection)
+    
+    def search(self, user_id: int, query: str, limit: int,
+               cursor: Optional[str] = None,
+               projection: TaskProjection = TaskProjection.LIST) -> TaskPage:
+        return self._cache.get_or_load(
+            user_id, ('search', user_id, query, limit, cursor, projection),
+            lambda: self._repository.search(user_id, query, limit, cursor, projection)
+        )
+    
+    def count_tasks(self, user_id: int) -> TaskCounts:
+        return self._cache.get_or_load(
+            user_id, ('count_tasks', user_id),
+            lambda: self._repository.count_tasks(user_id)
+        )
+    
+    def count_overdue(self, user_id: int) -> int:
+        return self._cache.get_or_load(
+            user_id, ('count_overdue', user_id, date.today()),
+            lambda: self._repository.count_overdue(user_id)
+        )
+    
+    def save(self, task: Task) -> Task:
+        return self._repository.save(task)
+    
+    def update(self, task: Task) -> Task:
+        return self._repository.update(task)
+    
+    def update_status_if(self, task_id: int, user_id: int,
+                         expected_status: TaskStatus, new_status: TaskStatus) -> int:
+        return self._repository.update_status_if(task_id, user_id, expected_status, new_status)
+    
+    def complete_if_owned(self, task_id: int, user_id: int) -> Optional[TaskStatus]:
+        return self._repository.complete_if_owned(task_id, user_id)
+    
+    def update_fields_if_owned(self, task_id: int, user_id: int, fields: Dict[str, Any]) -> int:
+        return self._repository.update_fields_if_owned(task_id, user_id, fields)
+    
+    def delete_if_owned(self, task_id: int, user_id: int) -> int:
+        return self._repository.delete_if_owned(task_id, user_id)
+    
+    def restore_if_owned(self, task_id: int, user_id: int) -> int:
+        return self._repository.restore_if_owned(task_id, user_id)
+    
+    def save_many(self, tasks: List[Task]) -> List[Task]:
+        return self._repository.save_many(tasks)
+    
+    def update_fields_many_if_owned(self, user_id: int, fields_by_task: Dict[int, Dict[str, Any]]) -> int:
+        return self._repository.update_fields_many_if_owned(user_id, fields_by_task)
+    
+    def update_status_many_if(self, user_id: int, transitions: List[tuple]) -> int:
+        return self._repository.update_status_many_if(user_id, transitions)
+    
+    def delete_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        return self._repository.delete_many_if_owned(user_id, task_ids)
+    
+    def restore_many_if_owned(self, user_id: int, task_ids: List[int]) -> int:
+        return self._repository.restore_many_if_owned(user_id, task_ids)
+    
+    def delete(self, task_id: int) -> bool:
+        return self._repository.delete(task_id)
+    
+    def purge_deleted(self, deleted_before: datetime, batch_size: int = 500) -> int:
+        return self._repository.purge_deleted(deleted_before, batch_size)
+    
+    def archive_completed(self, completed_before: datetime, batch_size: int = 500) -> Dict[int, int]:
+        # O arquivamento avança a versão no banco dos usuários afetados
+        return self._repository.archive_completed(completed_before, batch_size)
+    
+    def _freeze(self, criteria: List[TaskCriterion]) -> tuple:
+        """Critérios como chave de cache; listas de valores viram tuplas"""
+        return tuple(
+            TaskCriterion(criterion.field, criterion.operator, tuple(criterion.value))
+            if isinstance(criterion.value, list) else criterion
+            for criterion in criteria
+        )
\ No newline at end of file
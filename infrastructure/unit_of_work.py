@@ -0,0 +1,74 @@
+from typing import Any, Callable, Optional
+from flask import g, has_app_context
+from domain.interfaces import IUnitOfWork
+
+
+class SqlAlchemyUnitOfWork(IUnitOfWork):
+    """Unit of Work por requisição sobre a sessão do SQLAlchemy
+    
+    O identity map fica em flask.g, então cada requisição tem o seu. Enquanto
+    a unidade está ativa os repositórios apenas fazem flush; o commit é único
+    e acontece ao final da requisição.
+    """
+    
+    _STATE_KEY = 'unit_of_work_identity_map'
+    _CALLBACKS_KEY = 'unit_of_work_commit_callbacks'
+    
+    def __init__(self, database):
+        self._db = database
+    
+    def begin(self) -> None:
+        """Inicia uma nova unidade de trabalho"""
+        setattr(g, self._STATE_KEY, {})
+    
+    def is_active(self) -> bool:
+        """Verifica se há uma unidade de trabalho em andamento"""
+        return has_app_context() and self._STATE_KEY in g
+    
+    def get(self, entity_type: type, entity_id: int) -> Optional[Any]:
+        """Busca uma entidade já carregada no identity map"""
+        if not self.is_active():
+            return None
+        return self._identity_map().get((entity_type, entity_id))
+    
+    def register(self, entity: Any) -> None:
+        """Registra uma entidade carregada ou alterada no identity map"""
+        if self.is_active() and entity.id is not None:
+            self._identity_map()[(type(entity), entity.id)] = entity
+    
+    def evict(self, entity_type: type, entity_id: int) -> None:
+        """Remove uma entidade do identity map"""
+        if self.is_active():
+            self._identity_map().pop((entity_type, entity_id), None)
+    
+    def commit(self) -> None:
+        """Confirma todas as escritas da unidade de trabalho de uma só vez"""
+        callbacks = g.get(self._CALLBACKS_KEY, [])
+        try:
+            self._db.session.commit()
+        finally:
+            self._end()
+        
+        for callback in callbacks:
+            callback()
+    
+    def rollback(self) -> None:
+        """Descarta todas as escritas da unidade de trabalho"""
+        try:
+            self._db.session.rollback()
+        finally:
+            self._end()
+    
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Agenda uma ação para depois do commit; sem unidade ativa, executa na hora"""
+        if self.is_active():
+            g.setdefault(self._CALLBACKS_KEY, []).append(callback)
+        else:
+            callback()
+    
+    def _identity_map(self) -> dict:
+        return getattr(g, self._STATE_KEY)
+    
+    def _end(self) -> None:
+        g.pop(self._STATE_KEY, None)
+        g.pop(self._CALLBACKS_KEY, None)
@@ -1,41 +1,94 @@
-from flask import Flask, Blueprint
+from flask import Flask, Blueprint, request, session
 from dotenv import load_dotenv
+from typing import Optional
 import os
+import time
 
 # Importações das camadas
 from infrastructure.database import db_connection
-from infrastructure.repositories import TaskRepositoryImpl, UserRepositoryImpl
+from infrastructure.repositories import TaskRepositoryImpl, UserRepositoryImpl, CommandJournalRepositoryImpl
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+from infrastructure.migrations import upgrade_schema
+from infrastructure.task_cache import TaskCache, CachedTaskRepository
+from infrastructure.sharding import ShardedTaskRepository, ShardedCommandJournal, create_shard_schema
+from infrastructure.background import PeriodicJob
 from infrastructure.password_service import BcryptPasswordHasher
-from application.commands import CommandInvoker
+from application.commands import CommandInvoker, JournalCommandInvoker
 from application.use_cases import (
     CreateTaskUseCase, UpdateTaskUseCase, CompleteTaskUseCase,
     DeleteTaskUseCase, ListTasksUseCase, GetTaskStatsUseCase,
-    RegisterUserUseCase, AuthenticateUserUseCase, UndoActionUseCase, RedoActionUseCase
+    RegisterUserUseCase, AuthenticateUserUseCase, UndoActionUseCase, RedoActionUseCase,
+    GetDataVersionUseCase, SearchTasksUseCase, GetTaskUseCase, BulkTaskUseCase
 )
 from presentation.controllers import AuthController, TaskController
+from cli import register_commands, purge_expired_tombstones, archive_completed_tasks
 
 
 class DependencyContainer:
     """Container de injeção de dependência - Dependency Injection Pattern"""
     
-    def __init__(self):
+    def __init__(self, config: Optional[dict] = None):
+        config = config or {}
+        
         # Infraestrutura
-        self.task_repository = TaskRepositoryImpl()
-        self.user_repository = UserRepositoryImpl()
+        self.unit_of_work = SqlAlchemyUnitOfWork(db_connection.db)
+        self.sql_task_repository = TaskRepositoryImpl(self.unit_of_work)
+        if config.get('DATABASE_SHARD_URLS'):
+            # Tarefas e contadores particionados por usuário entre os bancos dos shards
+            self.sql_task_repository = ShardedTaskRepository(self.unit_of_work)
+        self.task_repository = self.sql_task_repository
+        
+        # Cache de leitura das tarefas, invalidado pela versão de cada usuário gravada no banco
+        self.task_cache = None
+        if config.get('TASK_CACHE_ENABLED', True):
+            self.task_cache = TaskCache(
+                self.sql_task_repository,
+                max_entries=config.get('TASK_CACHE_MAX_ENTRIES', 1000),
+                ttl_seconds=config.get('TASK_CACHE_TTL', 30),
+                max_bytes=config.get('TASK_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+            )
+            self.task_repository = CachedTaskRepository(self.task_repository, self.task_cache)
+        
+        self.user_repository = UserRepositoryImpl(self.unit_of_work)
+        self.command_journal = CommandJournalRepositoryImpl(self.unit_of_work)
+        if config.get('DATABASE_SHARD_URLS'):
+            # Journal no shard do usuário, junto das tarefas: as escritas não passam pelo primário
+            self.command_journal = ShardedCommandJournal(self.command_journal, self.sql_task_repository)
         self.password_hasher = BcryptPasswordHasher()
-        self.command_invoker = CommandInvoker()
         
-        # Casos de uso
-        self.create_task_use_case = CreateTaskUseCase(self.task_repository, self.command_invoker)
-        self.update_task_use_case = UpdateTaskUseCase(self.task_repository, self.command_invoker)
-        self.complete_task_use_case = CompleteTaskUseCase(self.task_repository, self.command_invoker)
-        self.delete_task_use_case = DeleteTaskUseCase(self.task_repository, self.command_invoker)
-        self.list_tasks_use_case = ListTasksUseCase(self.task_repository)
+        # Versão dos dados por usuário, gravada no banco: vale entre processos para o ETag e o cache
+        version_trackers = [self.sql_task_repository]
+        
+        # Histórico de undo/redo: journal persistente (padrão) ou em memória do processo
+        if config.get('COMMAND_HISTORY_BACKEND', 'journal') == 'memory':
+            self.command_invoker = CommandInvoker(
+                max_depth=config.get('COMMAND_HISTORY_DEPTH', 50),
+                max_total_commands=config.get('COMMAND_HISTORY_MAX_COMMANDS', 10000),
+                version_trackers=version_trackers
+            )
+        else:
+            self.command_invoker = JournalCommandInvoker(
+                self.command_journal, self.sql_task_repository, version_trackers=version_trackers
+            )
+        
+        # Casos de uso; as escritas leem o banco, nunca o cache, pois outro processo pode ter
+        # alterado a tarefa e o delta dos comandos seria calculado sobre um valor antigo
+        self.create_task_use_case = CreateTaskUseCase(self.sql_task_repository, self.command_invoker)
+        self.update_task_use_case = UpdateTaskUseCase(self.sql_task_repository, self.command_invoker)
+        self.complete_task_use_case = CompleteTaskUseCase(self.sql_task_repository, self.command_invoker)
+        self.delete_task_use_case = DeleteTaskUseCase(self.sql_task_repository, self.command_invoker)
+        self.list_tasks_use_case = ListTasksUseCase(
+            self.task_repository, prefer_columnar=config.get('TASK_LIST_ENGINE', 'sql') == 'columnar'
+        )
         self.get_stats_use_case = GetTaskStatsUseCase(self.task_repository)
         self.register_user_use_case = RegisterUserUseCase(self.user_repository, self.password_hasher)
         self.authenticate_user_use_case = AuthenticateUserUseCase(self.user_repository, self.password_hasher)
         self.undo_action_use_case = UndoActionUseCase(self.command_invoker)
         self.redo_action_use_case = RedoActionUseCase(self.command_invoker)
+        self.data_version_use_case = GetDataVersionUseCase(self.sql_task_repository)
+        self.search_tasks_use_case = SearchTasksUseCase(self.task_repository)
+        self.get_task_use_case = GetTaskUseCase(self.task_repository)
+        self.bulk_task_use_case = BulkTaskUseCase(self.sql_task_repository, self.command_invoker)
         
         # Controladores
         self.auth_controller = AuthController(self.register_user_use_case, self.authenticate_user_use_case)
@@ -47,7 +100,11 @@ class DependencyContainer:
             self.list_tasks_use_case,
             self.get_stats_use_case,
             self.undo_action_use_case,
-            self.redo_action_use_case
+            self.redo_action_use_case,
+            self.data_version_use_case,
+            self.search_tasks_use_case,
+            self.get_task_use_case,
+            self.bulk_task_use_case
         )
 
 
@@ -63,27 +120,79 @@ def create_app() -> Flask:
     app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-taskflow-2024-change-in-production')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///tasks.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_timeout': 20,
-        'pool_recycle': -1,
-        'pool_pre_ping': True
-    }
+    
+    # Perfil da engine: pragmas do SQLite e pool de conexões ('dev', 'prod-sqlite' ou 'bulk-load')
+    app.config['DATABASE_PROFILE'] = os.getenv('DATABASE_PROFILE', 'dev')
+    
+    # Réplicas de leitura (URLs separadas por vírgula), tempo em que as leituras de quem acabou
+    # de escrever ficam no primário (tolerância ao atraso de replicação, em segundos) e
+    # intervalo de cópia das réplicas SQLite pela API de backup (0 desativa)
+    app.config['DATABASE_READ_URLS'] = [url for url in os.getenv('DATABASE_READ_URLS', '').split(',') if url]
+    app.config['DATABASE_REPLICA_LAG_SECONDS'] = float(os.getenv('DATABASE_REPLICA_LAG_SECONDS', 5))
+    app.config['DATABASE_REPLICA_SYNC_INTERVAL'] = int(os.getenv('DATABASE_REPLICA_SYNC_INTERVAL', 0))
+    
+    # Shards das tarefas por usuário (URLs separadas por vírgula, sempre acrescentadas no fim:
+    # o índice de cada shard faz parte dos IDs alocados nele)
+    app.config['DATABASE_SHARD_URLS'] = [url for url in os.getenv('DATABASE_SHARD_URLS', '').split(',') if url]
+    
+    # Histórico de undo/redo: backend ('journal' ou 'memory'), profundidade por usuário,
+    # limite total em memória e intervalo de compactação do journal (0 desativa)
+    app.config['COMMAND_HISTORY_BACKEND'] = os.getenv('COMMAND_HISTORY_BACKEND', 'journal')
+    app.config['COMMAND_HISTORY_DEPTH'] = int(os.getenv('COMMAND_HISTORY_DEPTH', 50))
+    app.config['COMMAND_HISTORY_MAX_COMMANDS'] = int(os.getenv('COMMAND_HISTORY_MAX_COMMANDS', 10000))
+    app.config['COMMAND_JOURNAL_COMPACT_INTERVAL'] = int(os.getenv('COMMAND_JOURNAL_COMPACT_INTERVAL', 3600))
+    
+    # Remoção lógica: tempo de retenção das lápides e limpeza periódica em lotes (0 desativa)
+    app.config['TASK_TOMBSTONE_RETENTION_HOURS'] = int(os.getenv('TASK_TOMBSTONE_RETENTION_HOURS', 168))
+    app.config['TASK_PURGE_INTERVAL'] = int(os.getenv('TASK_PURGE_INTERVAL', 3600))
+    app.config['TASK_PURGE_BATCH_SIZE'] = int(os.getenv('TASK_PURGE_BATCH_SIZE', 500))
+    
+    # Arquivamento: idade das concluídas movidas para tasks_archive e rotina periódica em lotes (0 desativa)
+    app.config['TASK_ARCHIVE_AFTER_DAYS'] = int(os.getenv('TASK_ARCHIVE_AFTER_DAYS', 30))
+    app.config['TASK_ARCHIVE_INTERVAL'] = int(os.getenv('TASK_ARCHIVE_INTERVAL', 3600))
+    app.config['TASK_ARCHIVE_BATCH_SIZE'] = int(os.getenv('TASK_ARCHIVE_BATCH_SIZE', 500))
+    
+    # Paginação do dashboard: 'sql' (keyset no banco) ou 'columnar' (lote colunar em memória)
+    app.config['TASK_LIST_ENGINE'] = os.getenv('TASK_LIST_ENGINE', 'sql')
+    
+    # Cache de leitura das tarefas: entradas, validade (segundos) e orçamento de memória (bytes)
+    app.config['TASK_CACHE_ENABLED'] = os.getenv('TASK_CACHE_ENABLED', 'true').lower() == 'true'
+    app.config['TASK_CACHE_MAX_ENTRIES'] = int(os.getenv('TASK_CACHE_MAX_ENTRIES', 1000))
+    app.config['TASK_CACHE_TTL'] = float(os.getenv('TASK_CACHE_TTL', 30))
+    app.config['TASK_CACHE_MAX_BYTES'] = int(os.getenv('TASK_CACHE_MAX_BYTES', 16 * 1024 * 1024))
     
     # Inicializar banco de dados
     db_connection.init_app(app)
     
     # Criar container de dependências
-    container = DependencyContainer()
+    container = DependencyContainer(app.config)
+    
+    # Um Unit of Work por requisição
+    register_unit_of_work(app, container)
+    
+    # Leituras nas réplicas, escritas no primário
+    register_read_routing(app)
     
     # Registrar blueprints
     register_blueprints(app, container)
     
-    # Criar tabelas do banco
+    # Registrar comandos de linha de comando
+    register_commands(app, container)
+    
+    # Tarefas periódicas em segundo plano
+    register_jobs(app, container)
+    
+    # Criar tabelas do banco primário; shards e réplicas são preparados a seguir
     with app.app_context():
-        db_connection.db.create_all()
+        db_connection.db.create_all(bind_key=None)
+        upgrade_schema(db_connection.db)
+        if app.config['DATABASE_SHARD_URLS']:
+            create_shard_schema(db_connection.db)
+        # Réplicas SQLite locais partem de uma cópia do primário já atualizado
+        db_connection.sync_read_replicas()
         print("\n=== SISTEMA DE TAREFAS INICIALIZADO ===")
         print("Banco de dados: tasks.db")
-        print("Tabelas: users, tasks")
+        print("Tabelas: users, tasks, user_task_stats, command_journal")
         print("Clean Architecture ✓")
         print("Padrões GoF implementados: Command, Strategy, Singleton")
         print("Princípios SOLID ✓")
@@ -92,6 +201,58 @@ def create_app() -> Flask:
     return app
 
 
+def register_unit_of_work(app: Flask, container: DependencyContainer):
+    """Delimita um Unit of Work por requisição, com um único commit ao final"""
+    unit_of_work = container.unit_of_work
+    
+    @app.before_request
+    def begin_unit_of_work():
+        unit_of_work.begin()
+    
+    @app.after_request
+    def complete_unit_of_work(response):
+        if unit_of_work.is_active():
+            if response.status_code < 500:
+                unit_of_work.commit()
+            else:
+                unit_of_work.rollback()
+        return response
+    
+    @app.teardown_request
+    def discard_unit_of_work(exception=None):
+        # Exceções não tratadas chegam aqui sem passar pelo commit
+        if unit_of_work.is_active():
+            unit_of_work.rollback()
+
+
+# Chave da sessão do usuário com o instante até o qual suas leituras ficam no primário
+PRIMARY_READS_UNTIL = 'primary_reads_until'
+
+
+def register_read_routing(app: Flask):
+    """Envia às réplicas as leituras de requisições GET, exceto logo após uma escrita do usuário
+    
+    Requisições que podem escrever usam só o primário. Depois delas, as leituras
+    do usuário continuam no primário por DATABASE_REPLICA_LAG_SECONDS, o atraso
+    tolerado até as réplicas receberem a escrita.
+    """
+    if not app.config['DATABASE_READ_URLS']:
+        return
+    
+    lag_seconds = app.config['DATABASE_REPLICA_LAG_SECONDS']
+    
+    @app.before_request
+    def route_reads():
+        reading = request.method in ('GET', 'HEAD')
+        db_connection.allow_replica_reads(reading and time.time() >= session.get(PRIMARY_READS_UNTIL, 0))
+    
+    @app.after_request
+    def keep_reads_on_primary(response):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 500:
+            session[PRIMARY_READS_UNTIL] = time.time() + lag_seconds
+        return response
+
+
 def register_blueprints(app: Flask, container: DependencyContainer):
     """Registra os blueprints com as rotas"""
     
@@ -158,6 +319,22 @@ def register_blueprints(app: Flask, container: DependencyContainer):
     def redo_action():
         return container.task_controller.redo_action()
     
+    @tasks_bp.route('/export')
+    def export_tasks():
+        return container.task_controller.export_tasks()
+    
+    @tasks_bp.route('/api/tasks')
+    def list_tasks_api():
+        return container.task_controller.list_tasks_api()
+    
+    @tasks_bp.route('/api/search')
+    def search_tasks_api():
+        return container.task_controller.search_tasks_api()
+    
+    @tasks_bp.route('/api/batch', methods=['POST'])
+    def batch_tasks_api():
+        return container.task_controller.batch_tasks_api()
+    
     @tasks_bp.route('/api/stats')
     def get_stats():
         return container.task_controller.get_task_stats_api()
@@ -173,6 +350,35 @@ def register_blueprints(app: Flask, container: DependencyContainer):
     app.register_blueprint(tasks_bp)
 
 
+def register_jobs(app: Flask, container: DependencyContainer):
+    """Inicia as tarefas periódicas de manutenção"""
+    if app.config['COMMAND_HISTORY_BACKEND'] == 'journal':
+        PeriodicJob(
+            app, 'compact-command-journal',
+            app.config['COMMAND_JOURNAL_COMPACT_INTERVAL'],
+            lambda: container.command_journal.compact(app.config['COMMAND_HISTORY_DEPTH'])
+        ).start()
+    
+    if app.config['DATABASE_READ_URLS']:
+        PeriodicJob(
+            app, 'sync-read-replicas',
+            app.config['DATABASE_REPLICA_SYNC_INTERVAL'],
+            db_connection.sync_read_replicas
+        ).start()
+    
+    PeriodicJob(
+        app, 'purge-deleted-tasks',
+        app.config['TASK_PURGE_INTERVAL'],
+        lambda: purge_expired_tombstones(app, container)
+    ).start()
+    
+    PeriodicJob(
+        app, 'archive-completed-tasks',
+        app.config['TASK_ARCHIVE_INTERVAL'],
+        lambda: archive_completed_tasks(app, container)
+    ).start()
+
+
 if __name__ == '__main__':
     app = create_app()
     print("\n=== INICIANDO APLICAÇÃO ===")
@@ -1,12 +1,19 @@
-from flask import request, session, render_template, redirect, url_for, flash, jsonify
-from typing import Optional, Dict, Any
+import hashlib
+from flask import (
+    request, session, render_template, redirect, url_for, flash, jsonify, make_response,
+    Response, stream_with_context
+)
+from typing import Optional, Dict, Any, List
 from datetime import datetime, date
 from domain.entities import Priority, TaskStatus
+from domain.specifications import TaskOperation
 from application.use_cases import (
     CreateTaskUseCase, UpdateTaskUseCase, CompleteTaskUseCase,
     DeleteTaskUseCase, ListTasksUseCase, GetTaskStatsUseCase,
-    RegisterUserUseCase, AuthenticateUserUseCase, UndoActionUseCase, RedoActionUseCase
+    RegisterUserUseCase, AuthenticateUserUseCase, UndoActionUseCase, RedoActionUseCase,
+    GetDataVersionUseCase, SearchTasksUseCase, GetTaskUseCase, BulkTaskUseCase
 )
+from presentation.exporters import TaskExporterFactory, encode_chunks
 
 
 class BaseController:
@@ -41,6 +48,47 @@ class BaseController:
             return datetime.strptime(date_str, '%Y-%m-%d').date()
         except ValueError:
             return None
+    
+    def parse_limit(self, limit_str: Optional[str], default: int, maximum: int) -> int:
+        """Converte string para tamanho de página, limitado ao máximo permitido"""
+        try:
+            limit = int(limit_str) if limit_str else default
+        except ValueError:
+            return default
+        return max(1, min(limit, maximum))
+    
+    def build_etag(self, *parts: Any) -> str:
+        """Gera um ETag forte a partir de tudo o que determina a resposta"""
+        return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    
+    def not_modified(self, etag: str):
+        """Resposta 304 se o cliente já tem a versão atual, senão None"""
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            response.set_etag(etag)
+            return response
+        return None
+    
+    def with_etag(self, body, etag: str):
+        """Anexa o ETag à resposta, exigindo revalidação a cada uso"""
+        response = make_response(body)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    
+    def serialize_task(self, task) -> Dict[str, Any]:
+        """Converte a entidade Task em dicionário serializável em JSON"""
+        return {
+            'id': task.id,
+            'title': task.title,
+            'description': task.description,
+            'priority': task.priority.value,
+            'status': task.status.value,
+            'due_date': task.due_date.isoformat() if task.due_date else None,
+            'created_at': task.created_at.isoformat() if task.created_at else None,
+            'updated_at': task.updated_at.isoformat() if task.updated_at else None,
+            'is_overdue': task.is_overdue()
+        }
 
 
 class AuthController(BaseController):
@@ -106,6 +154,13 @@ class AuthController(BaseController):
 class TaskController(BaseController):
     """Controlador responsável pelas operações de tarefas"""
     
+    DASHBOARD_PAGE_SIZE = 50
+    SEARCH_PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    
+    # Campos das operações em lote que só aceitam texto (ou null) no JSON
+    OPERATION_TEXT_FIELDS = ('title', 'description', 'priority', 'due_date')
+    
     def __init__(self, create_task_use_case: CreateTaskUseCase, 
                  update_task_use_case: UpdateTaskUseCase,
                  complete_task_use_case: CompleteTaskUseCase,
@@ -113,7 +168,11 @@ class TaskController(BaseController):
                  list_tasks_use_case: ListTasksUseCase,
                  get_stats_use_case: GetTaskStatsUseCase,
                  undo_use_case: UndoActionUseCase,
-                 redo_use_case: RedoActionUseCase):
+                 redo_use_case: RedoActionUseCase,
+                 data_version_use_case: GetDataVersionUseCase,
+                 search_tasks_use_case: SearchTasksUseCase,
+                 get_task_use_case: GetTaskUseCase,
+                 bulk_task_use_case: BulkTaskUseCase):
         self._create_task_use_case = create_task_use_case
         self._update_task_use_case = update_task_use_case
         self._complete_task_use_case = complete_task_use_case
@@ -122,6 +181,10 @@ class TaskController(BaseController):
         self._get_stats_use_case = get_stats_use_case
         self._undo_use_case = undo_use_case
         self._redo_use_case = redo_use_case
+        self._data_version_use_case = data_version_use_case
+        self._search_tasks_use_case = search_tasks_use_case
+        self._get_task_use_case = get_task_use_case
+        self._bulk_task_use_case = bulk_task_use_case
     
     def dashboard(self):
         """Exibe o dashboard com lista de tarefas"""
@@ -133,29 +196,50 @@ class TaskController(BaseController):
         filter_type = request.args.get('filter', 'all')
         sort_type = request.args.get('sort', 'creation_date')
         
+        # Obter a saudação baseada na hora
+        current_hour = datetime.now().hour
+        if current_hour < 12:
+            greeting = 'Bom dia'
+        elif current_hour < 18:
+            greeting = 'Boa tarde'
+        else:
+            greeting = 'Boa noite'
+        
+        # Mensagens flash pendentes precisam ser renderizadas; sem elas, o ETag
+        # cobre tudo o que muda a página e dispensa as consultas de listagem
+        etag = None
+        if '_flashes' not in session:
+            etag = self.build_etag(
+                'dashboard', user_id, self._data_version_use_case.execute(user_id),
+                filter_type, sort_type, greeting, date.today(), session.get('email')
+            )
+            not_modified = self.not_modified(etag)
+            if not_modified:
+                return not_modified
+        
         try:
-            tasks = self._list_tasks_use_case.execute(user_id, filter_type, sort_type)
+            page = self._list_tasks_use_case.execute_page(
+                user_id, filter_type, sort_type, limit=self.DASHBOARD_PAGE_SIZE
+            )
             stats = self._get_stats_use_case.execute(user_id)
             
-            # Obter a saudação baseada na hora
-            current_hour = datetime.now().hour
-            if current_hour < 12:
-                greeting = 'Bom dia'
-            elif current_hour < 18:
-                greeting = 'Boa tarde'
-            else:
-                greeting = 'Boa noite'
-            
-            return render_template('tasks/dashboard.html', 
-                                 tasks=tasks, 
+            body = render_template('tasks/dashboard.html', 
+                                 tasks=page.items, 
+                                 next_cursor=page.next_cursor,
                                  stats=stats,
                                  filter=filter_type,
                                  sort=sort_type,
                                  greeting=greeting,
                                  current_user_email=session.get('email'))
+            return self.with_etag(body, etag) if etag else body
         except Exception as e:
+            # Inclui filtros de expressão inválida, informados pelo usuário na URL
             flash(f'Erro ao carregar tarefas: {str(e)}', 'error')
-            return render_template('tasks/dashboard.html', tasks=[], stats={})
+            return render_template('tasks/dashboard.html', tasks=[], stats={},
+                                 filter=filter_type,
+                                 sort=sort_type,
+                                 greeting=greeting,
+                                 current_user_email=session.get('email'))
     
     def show_create_form(self):
         """Exibe o formulário de criação de tarefa"""
@@ -195,9 +279,20 @@ class TaskController(BaseController):
         if auth_check:
             return auth_check
         
-        # Aqui você precisaria buscar a tarefa para preencher o formulário
-        # Por simplicidade, vou apenas renderizar o template
-        return render_template('tasks/form.html', task_id=task_id, is_edit=True)
+        # Só aqui a tarefa é lida com a descrição completa (listagens trazem uma prévia)
+        try:
+            task = self._get_task_use_case.execute(task_id, self.get_current_user_id())
+        except ValueError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('tasks.dashboard'))
+        
+        return render_template('tasks/form.html', 
+                             task_id=task_id, 
+                             is_edit=True,
+                             title=task.title, 
+                             description=task.description,
+                             priority=task.priority.value,
+                             due_date=task.due_date)
     
     def update_task(self, task_id: int):
         """Atualiza uma tarefa existente"""
@@ -261,8 +356,10 @@ class TaskController(BaseController):
         if auth_check:
             return auth_check
         
+        user_id = self.get_current_user_id()
+        
         try:
-            success = self._undo_use_case.execute()
+            success = self._undo_use_case.execute(user_id)
             if success:
                 return jsonify({'success': True, 'message': 'Ação desfeita com sucesso!'})
             else:
@@ -276,8 +373,10 @@ class TaskController(BaseController):
         if auth_check:
             return auth_check
         
+        user_id = self.get_current_user_id()
+        
         try:
-            success = self._redo_use_case.execute()
+            success = self._redo_use_case.execute(user_id)
             if success:
                 return jsonify({'success': True, 'message': 'Ação refeita com sucesso!'})
             else:
@@ -285,6 +384,135 @@ class TaskController(BaseController):
         except Exception as e:
             return jsonify({'success': False, 'error': str(e)}), 500
     
+    def list_tasks_api(self):
+        """API para listar tarefas paginadas por cursor"""
+        auth_check = self.require_authentication()
+        if auth_check:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        user_id = self.get_current_user_id()
+        filter_type = request.args.get('filter', 'all')
+        sort_type = request.args.get('sort', 'creation_date')
+        cursor = request.args.get('cursor') or None
+        limit = self.parse_limit(request.args.get('limit'), self.DASHBOARD_PAGE_SIZE, self.MAX_PAGE_SIZE)
+        
+        try:
+            page = self._list_tasks_use_case.execute_page(
+                user_id, filter_type, sort_type, limit=limit, cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'tasks': [self.serialize_task(task) for task in page.items],
+            'next_cursor': page.next_cursor,
+            'html': render_template('tasks/_task_cards.html', tasks=page.items)
+        })
+    
+    def export_tasks(self):
+        """Exporta em CSV ou NDJSON as tarefas do filtro e da ordenação atuais
+        
+        A resposta é gerada em fluxo enquanto as tarefas são lidas do banco,
+        sem montar o arquivo em memória; gzip=1 comprime o arquivo.
+        """
+        auth_check = self.require_authentication()
+        if auth_check:
+            return auth_check
+        
+        user_id = self.get_current_user_id()
+        filter_type = request.args.get('filter', 'all')
+        sort_type = request.args.get('sort', 'creation_date')
+        compress = request.args.get('gzip', '').lower() in ('1', 'true')
+        
+        try:
+            exporter = TaskExporterFactory.create_exporter(request.args.get('format', 'csv'), self.serialize_task)
+            tasks = self._list_tasks_use_case.execute_stream(user_id, filter_type, sort_type)
+        except ValueError as e:
+            flash(f'Erro ao exportar tarefas: {str(e)}', 'error')
+            return redirect(url_for('tasks.dashboard', filter=filter_type, sort=sort_type))
+        
+        filename = f'tarefas.{exporter.extension}' + ('.gz' if compress else '')
+        return Response(
+            stream_with_context(encode_chunks(exporter.export(tasks), compress)),
+            mimetype='application/gzip' if compress else exporter.mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'Cache-Control': 'no-store'
+            }
+        )
+    
+    def search_tasks_api(self):
+        """API de busca textual nas tarefas, paginada por cursor"""
+        auth_check = self.require_authentication()
+        if auth_check:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        user_id = self.get_current_user_id()
+        query = request.args.get('q', '')
+        cursor = request.args.get('cursor') or None
+        limit = self.parse_limit(request.args.get('limit'), self.SEARCH_PAGE_SIZE, self.MAX_PAGE_SIZE)
+        
+        try:
+            page = self._search_tasks_use_case.execute(user_id, query, limit=limit, cursor=cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'tasks': [self.serialize_task(task) for task in page.items],
+            'next_cursor': page.next_cursor,
+            'html': render_template('tasks/_task_cards.html', tasks=page.items)
+        })
+    
+    def batch_tasks_api(self):
+        """API que aplica um lote de operações em uma única transação, desfeito por um único undo"""
+        auth_check = self.require_authentication()
+        if auth_check:
+            return jsonify({'error': 'Authentication required'}), 401
+        
+        user_id = self.get_current_user_id()
+        
+        try:
+            operations = self.parse_operations(request.get_json(silent=True))
+            result = self._bulk_task_use_case.execute(user_id, operations)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        
+        return jsonify({
+            'success': True,
+            'created': [self.serialize_task(task) for task in result.created],
+            'updated': result.updated,
+            'completed': result.completed,
+            'deleted': result.deleted
+        })
+    
+    def parse_operations(self, payload: Any) -> List[TaskOperation]:
+        """Converte o corpo JSON {"operations": [{"op": ..., "id": ..., campos}]} em operações"""
+        items = payload.get('operations') if isinstance(payload, dict) else None
+        if not isinstance(items, list):
+            raise ValueError("Informe a lista de operações em 'operations'")
+        
+        operations = []
+        for number, item in enumerate(items, 1):
+            if not isinstance(item, dict):
+                raise ValueError(f"Operação {number}: formato inválido")
+            
+            task_id = item.get('id')
+            if task_id is not None and (not isinstance(task_id, int) or isinstance(task_id, bool)):
+                raise ValueError(f"Operação {number}: ID da tarefa inválido")
+            
+            for name in self.OPERATION_TEXT_FIELDS:
+                if item.get(name) is not None and not isinstance(item[name], str):
+                    raise ValueError(f"Operação {number}: o campo '{name}' deve ser texto")
+            
+            fields = {
+                'title': item.get('title'),
+                'description': item.get('description'),
+                'priority': self.parse_priority(item['priority']) if item.get('priority') else None,
+                'due_date': self.parse_date(item.get('due_date') or '')
+            }
+            operations.append(TaskOperation(str(item.get('op', '')), task_id, fields))
+        return operations
+    
     def get_task_stats_api(self):
         """API para obter estatísticas das tarefas"""
         auth_check = self.require_authentication()
@@ -294,7 +522,14 @@ class TaskController(BaseController):
         user_id = self.get_current_user_id()
         
         try:
+            etag = self.build_etag(
+                'stats', user_id, self._data_version_use_case.execute(user_id), date.today()
+            )
+            not_modified = self.not_modified(etag)
+            if not_modified:
+                return not_modified
+            
             stats = self._get_stats_use_case.execute(user_id)
-            return jsonify(stats)
+            return self.with_etag(jsonify(stats), etag)
         except Exception as e:
             return jsonify({'error': str(e)}), 500 
\ No newline at end of file
@@ -0,0 +1,115 @@
+import csv
+import io
+import json
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Iterator
+from domain.entities import Task
+
+
+# Tamanho aproximado, em caracteres, de cada pedaço enviado na resposta
+EXPORT_CHUNK_CHARS = 64 * 1024
+
+# Prefixos que planilhas interpretam como fórmula (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class ITaskExporter(ABC):
+    """Formato de exportação de tarefas - Strategy Pattern"""
+    
+    mimetype: str = 'application/octet-stream'
+    extension: str = ''
+    
+    def __init__(self, serialize: Callable[[Task], Dict[str, Any]]):
+        self._serialize = serialize
+    
+    def export(self, tasks: Iterable[Task]) -> Iterator[str]:
+        """Gera o arquivo em pedaços de até EXPORT_CHUNK_CHARS, lendo as tarefas sob demanda"""
+        buffer = []
+        size = 0
+        for text in self._lines(tasks):
+            buffer.append(text)
+            size += len(text)
+            if size >= EXPORT_CHUNK_CHARS:
+                yield ''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer)
+    
+    @abstractmethod
+    def _lines(self, tasks: Iterable[Task]) -> Iterator[str]:
+        """Gera o cabeçalho, se houver, e uma linha por tarefa"""
+        pass
+
+
+class CsvTaskExporter(ITaskExporter):
+    """Exportação em CSV, com uma coluna por campo serializado da tarefa
+    
+    O cabeçalho sai junto da primeira tarefa; sem tarefas, o arquivo fica vazio.
+    """
+    
+    mimetype = 'text/csv'
+    extension = 'csv'
+    
+    def _lines(self, tasks: Iterable[Task]) -> Iterator[str]:
+        line = io.StringIO()
+        writer = csv.writer(line)
+        header_written = False
+        
+        for task in tasks:
+            row = self._serialize(task)
+            if not header_written:
+                writer.writerow(row.keys())
+                header_written = True
+            writer.writerow([self._cell(value) for value in row.values()])
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+    
+    def _cell(self, value: Any) -> Any:
+        """Neutraliza textos que a planilha executaria como fórmula"""
+        if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+            return "'" + value
+        return value
+
+
+class NdjsonTaskExporter(ITaskExporter):
+    """Exportação em NDJSON: um objeto JSON por linha, como na API"""
+    
+    mimetype = 'application/x-ndjson'
+    extension = 'ndjson'
+    
+    def _lines(self, tasks: Iterable[Task]) -> Iterator[str]:
+        for task in tasks:
+            yield json.dumps(self._serialize(task), ensure_ascii=False) + '\n'
+
+
+class TaskExporterFactory:
+    """Factory para criar os formatos de exportação"""
+    
+    EXPORTERS = {
+        'csv': CsvTaskExporter,
+        'ndjson': NdjsonTaskExporter,
+    }
+    
+    @staticmethod
+    def create_exporter(export_format: str, serialize: Callable[[Task], Dict[str, Any]]) -> ITaskExporter:
+        exporter_type = TaskExporterFactory.EXPORTERS.get(export_format)
+        if exporter_type is None:
+            raise ValueError(f"Formato de exportação desconhecido: {export_format}")
+        return exporter_type(serialize)
+
+
+def encode_chunks(chunks: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    """Codifica os pedaços em UTF-8 e, com compress, em um único fluxo gzip"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        if compressor is None:
+            yield data
+        else:
+            data = compressor.compress(data)
+            if data:
+                yield data
+    if compressor is not None:
+        yield compressor.flush()
\ No newline at end of file
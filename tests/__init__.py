@@ -0,0 +1 @@
+# Testes - Aplicação completa sobre bancos SQLite temporários
\ No newline at end of file
@@ -0,0 +1,37 @@
+import pytest
+from main import create_app
+from infrastructure.query_plans import seeded_database
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """Cria aplicações sobre o mesmo banco temporário, como workers independentes"""
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'tasks.db'))
+    
+    # Sem tarefas periódicas em segundo plano durante os testes
+    for name in ('TASK_PURGE_INTERVAL', 'TASK_ARCHIVE_INTERVAL', 'COMMAND_JOURNAL_COMPACT_INTERVAL'):
+        monkeypatch.setenv(name, '0')
+    
+    def factory(**config):
+        for name, value in config.items():
+            monkeypatch.setenv(name, str(value))
+        return create_app()
+    
+    return factory
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def seeded_user_ids():
+    """Banco temporário pequeno com tarefas de exemplo, ativo na aplicação própria do seeded_database"""
+    with seeded_database(users=3, tasks_per_user=200) as user_ids:
+        yield user_ids
\ No newline at end of file
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from infrastructure.database import db_connection
+
+
+def sign_in(client, email: str = 'ana@example.com', password: str = 'senha-segura-123') -> int:
+    """Cadastra o usuário, se ainda não existir, faz login e retorna o seu ID"""
+    client.post('/auth/register', data={'email': email, 'password': password, 'confirm_password': password})
+    client.post('/auth/login', data={'email': email, 'password': password})
+    with client.session_transaction() as session:
+        return session['user_id']
+
+
+def create_task(client, title: str, **fields) -> int:
+    """Cria uma tarefa pelo formulário e retorna o seu ID"""
+    client.post('/tasks/new', data={'title': title, 'priority': 'media', **fields})
+    with client.application.app_context():
+        return db_connection.db.session.execute(db_connection.db.text('SELECT max(id) FROM tasks')).scalar()
+
+
+def task_row(app, task_id: int):
+    """Linha atual da tarefa no banco, sem passar pelos repositórios"""
+    with app.app_context():
+        return db_connection.db.session.execute(
+            db_connection.db.text('SELECT * FROM tasks WHERE id = :id'), {'id': task_id}
+        ).mappings().one()
+
+
+@contextmanager
+def count_statements(app, bind_key: Optional[str] = None) -> Iterator[List[str]]:
+    """Registra os comandos SQL enviados ao banco durante o bloco, com 'COMMIT' a cada commit
+    
+    bind_key escolhe outro banco que não o primário, como uma réplica de leitura.
+    """
+    statements = []
+    
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(' '.join(statement.split()))
+    
+    def record_commit(connection):
+        statements.append('COMMIT')
+    
+    with app.app_context():
+        engine = db_connection.engine_for(bind_key)
+    event.listen(engine, 'before_cursor_execute', record)
+    event.listen(engine, 'commit', record_commit)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+        event.remove(engine, 'commit', record_commit)
\ No newline at end of file
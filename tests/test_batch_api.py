@@ -0,0 +1,29 @@
+import pytest
+from tests.helpers import sign_in, create_task
+
+
+@pytest.mark.parametrize('fields', [
+    {'title': 123},
+    {'title': ['A']},
+    {'description': {'texto': 'B'}},
+    {'priority': ['alta']},
+    {'due_date': 20300101},
+    {'due_date': True},
+])
+def test_non_text_fields_are_rejected_with_400(client, fields):
+    sign_in(client)
+    task_id = create_task(client, 'A')
+    
+    for operation in ({'op': 'create', 'title': 'Nova', **fields}, {'op': 'update', 'id': task_id, **fields}):
+        response = client.post('/tasks/api/batch', json={'operations': [operation]})
+        assert response.status_code == 400
+        assert 'deve ser texto' in response.get_json()['error']
+
+
+def test_null_fields_are_accepted(client):
+    sign_in(client)
+    response = client.post('/tasks/api/batch', json={'operations': [
+        {'op': 'create', 'title': 'Nova', 'description': None, 'priority': None, 'due_date': None}
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['created'][0]['title'] == 'Nova'
\ No newline at end of file
@@ -0,0 +1,53 @@
+from application.commands import JournalCommandInvoker
+from domain.entities import TaskStatus
+from infrastructure.repositories import TaskRepositoryImpl, CommandJournalRepositoryImpl
+from tests.helpers import sign_in, create_task
+
+
+def test_mark_only_changes_entries_in_the_opposite_state(app, client):
+    user_id = sign_in(client)
+    create_task(client, 'A')
+    with app.app_context():
+        journal = CommandJournalRepositoryImpl()
+        entry = journal.last_done(user_id)
+        assert journal.mark(entry, undone=True)
+        assert not journal.mark(entry, undone=True)
+        assert journal.mark(entry, undone=False)
+
+
+def test_concurrent_undo_applies_the_entry_once(app, client, monkeypatch):
+    """Duas requisições que leram o mesmo registro: só a primeira desfaz e avança a versão"""
+    user_id = sign_in(client)
+    task_id = create_task(client, 'X')
+    client.post(f'/tasks/{task_id}/edit', data={'title': 'Y', 'priority': 'media'})
+    
+    with app.app_context():
+        repository = TaskRepositoryImpl()
+        journal = CommandJournalRepositoryImpl()
+        invoker = JournalCommandInvoker(journal, repository, version_trackers=[repository])
+        stale_entry = journal.last_done(user_id)
+        
+        assert invoker.undo(user_id)
+        version = repository.get_version(user_id)
+        
+        monkeypatch.setattr(journal, 'last_done', lambda user_id: stale_entry)
+        assert not invoker.undo(user_id)
+        assert repository.get_version(user_id) == version
+        assert repository.find_by_id(task_id).title == 'X'
+
+
+def test_undo_reports_a_command_that_changed_nothing(app, client):
+    """Desfazer a conclusão de uma tarefa já reaberta não altera nada e retorna False"""
+    user_id = sign_in(client)
+    task_id = create_task(client, 'X')
+    client.post(f'/tasks/{task_id}/complete')
+    
+    with app.app_context():
+        repository = TaskRepositoryImpl()
+        repository.update_status_if(task_id, user_id, TaskStatus.COMPLETED, TaskStatus.IN_PROGRESS)
+        version = repository.get_version(user_id)
+        
+        invoker = JournalCommandInvoker(CommandJournalRepositoryImpl(), repository, version_trackers=[repository])
+        assert not invoker.undo(user_id)
+        assert repository.get_version(user_id) == version
+        assert repository.find_by_id(task_id).status == TaskStatus.IN_PROGRESS
\ No newline at end of file
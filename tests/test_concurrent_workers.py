@@ -0,0 +1,55 @@
+from tests.helpers import sign_in, create_task, task_row
+
+
+def test_edit_after_another_worker_is_not_lost(make_app):
+    """A edição compara os valores pedidos com o banco, não com o cache do worker"""
+    worker_a, worker_b = make_app(), make_app()
+    client_a, client_b = worker_a.test_client(), worker_b.test_client()
+    sign_in(client_a)
+    sign_in(client_b)
+    
+    task_id = create_task(client_a, 'X')
+    assert client_a.get(f'/tasks/{task_id}/edit').status_code == 200
+    
+    client_b.post(f'/tasks/{task_id}/edit', data={'title': 'Y', 'priority': 'media'})
+    assert task_row(worker_a, task_id)['title'] == 'Y'
+    
+    client_a.post(f'/tasks/{task_id}/edit', data={'title': 'X', 'priority': 'media'})
+    assert task_row(worker_a, task_id)['title'] == 'X'
+
+
+def test_complete_after_another_worker_deleted(make_app):
+    """A explicação de uma conclusão recusada lê o banco, não a tarefa em cache"""
+    worker_a, worker_b = make_app(), make_app()
+    client_a, client_b = worker_a.test_client(), worker_b.test_client()
+    sign_in(client_a)
+    sign_in(client_b)
+    
+    task_id = create_task(client_a, 'X')
+    client_a.get(f'/tasks/{task_id}/edit')
+    client_b.post(f'/tasks/{task_id}/delete')
+    
+    response = client_a.post(f'/tasks/{task_id}/complete')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Tarefa não encontrada'
+
+def test_cached_reads_see_another_workers_write(make_app):
+    """O cache de um worker é chaveado pela versão do banco, que avança com as escritas de todos"""
+    worker_a, worker_b = make_app(TASK_CACHE_TTL=3600), make_app(TASK_CACHE_TTL=3600)
+    client_a, client_b = worker_a.test_client(), worker_b.test_client()
+    sign_in(client_a)
+    sign_in(client_b)
+    
+    task_id = create_task(client_a, 'X')
+    client_a.get('/tasks/dashboard')
+    assert client_a.get('/tasks/api/tasks').get_json()['tasks'][0]['status'] == 'pendente'
+    assert client_a.get('/tasks/api/stats').get_json()['completed_tasks'] == 0
+    
+    client_b.post(f'/tasks/{task_id}/complete')
+    
+    assert client_a.get('/tasks/api/tasks').get_json()['tasks'][0]['status'] == 'concluida'
+    stats = client_a.get('/tasks/api/stats')
+    assert stats.get_json()['completed_tasks'] == 1
+    
+    # O corpo servido sob o novo ETag é o atual, então um 304 posterior não fixa dados velhos
+    assert client_b.get('/tasks/api/stats').headers['ETag'] == stats.headers['ETag']
@@ -0,0 +1,37 @@
+import pytest
+from application.use_cases import ListTasksUseCase, GetTaskStatsUseCase
+from tests.helpers import sign_in, create_task
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("consulta executada apesar do ETag válido")
+
+
+@pytest.mark.parametrize('url', ['/tasks/dashboard', '/tasks/api/stats'])
+def test_matching_etag_skips_the_listing_queries(client, monkeypatch, url):
+    sign_in(client)
+    create_task(client, 'A')
+    client.get('/tasks/dashboard')  # consome as mensagens flash do login e da criação
+    
+    etag = client.get(url).headers['ETag'].strip('"')
+    monkeypatch.setattr(ListTasksUseCase, 'execute_page', fail)
+    monkeypatch.setattr(ListTasksUseCase, 'execute', fail)
+    monkeypatch.setattr(GetTaskStatsUseCase, 'execute', fail)
+    
+    response = client.get(url, headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert response.headers['ETag'].strip('"') == etag
+
+
+@pytest.mark.parametrize('url', ['/tasks/dashboard', '/tasks/api/stats'])
+def test_write_changes_the_etag(client, url):
+    sign_in(client)
+    client.get('/tasks/dashboard')
+    etag = client.get(url).headers['ETag']
+    
+    create_task(client, 'A')
+    client.get('/tasks/dashboard')
+    
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
\ No newline at end of file
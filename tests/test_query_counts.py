@@ -0,0 +1,75 @@
+import pytest
+from tests.helpers import sign_in, create_task, count_statements
+
+# Mais tarefas que uma página do dashboard: as contagens não podem crescer com elas
+TASKS = 60
+
+
+@pytest.fixture
+def seeded(make_app):
+    """Aplicação sem o cache de leitura, para contar as idas ao banco, e um usuário com tarefas"""
+    app = make_app(TASK_CACHE_ENABLED='false')
+    client = app.test_client()
+    sign_in(client)
+    task_ids = [create_task(client, f'Tarefa {number}') for number in range(TASKS)]
+    client.get('/tasks/dashboard')
+    return app, client, task_ids
+
+
+def queries(statements):
+    return [statement for statement in statements if statement != 'COMMIT']
+
+
+def reads_of(statements, table):
+    return [statement for statement in statements if statement.startswith('SELECT') and f'FROM {table} ' in statement]
+
+
+def writes_of(statements, table):
+    return [statement for statement in statements
+            if statement.startswith(f'UPDATE {table} ') or (statement.startswith('WITH') and f'UPDATE {table} ' in statement)]
+
+
+def test_dashboard_query_count(seeded):
+    app, client, _ = seeded
+    with count_statements(app) as statements:
+        assert client.get('/tasks/dashboard').status_code == 200
+    
+    # Versão (ETag), a página em tasks e no arquivo, contadores e atrasadas
+    assert len(queries(statements)) <= 5
+    assert len(reads_of(statements, 'tasks')) == 2
+
+
+def test_list_api_query_count(seeded):
+    app, client, _ = seeded
+    with count_statements(app) as statements:
+        response = client.get('/tasks/api/tasks?filter=all&sort=creation_date')
+    
+    assert response.status_code == 200
+    assert len(response.get_json()['tasks']) == 50
+    assert len(queries(statements)) <= 2
+    assert len(reads_of(statements, 'tasks')) == 1
+
+
+def test_edit_query_count(seeded):
+    """Editar lê a tarefa uma vez e grava com um UPDATE, em um único commit"""
+    app, client, task_ids = seeded
+    with count_statements(app) as statements:
+        client.post(f'/tasks/{task_ids[0]}/edit', data={'title': 'Nova', 'priority': 'alta'})
+    
+    assert len(reads_of(statements, 'tasks')) == 1
+    assert len(writes_of(statements, 'tasks')) == 1
+    assert statements.count('COMMIT') == 1
+    # Contadores, versão do usuário e o registro no journal (limpeza do redo e INSERT)
+    assert len(queries(statements)) <= 6
+
+
+def test_complete_query_count(seeded):
+    """Concluir não lê a tarefa antes: o próprio UPDATE devolve o status anterior"""
+    app, client, task_ids = seeded
+    with count_statements(app) as statements:
+        assert client.post(f'/tasks/{task_ids[0]}/complete').status_code == 200
+    
+    assert reads_of(statements, 'tasks') == []
+    assert len(writes_of(statements, 'tasks')) == 1
+    assert statements.count('COMMIT') == 1
+    assert len(queries(statements)) <= 5
\ No newline at end of file
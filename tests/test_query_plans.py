@@ -0,0 +1,9 @@
+from cli import check_query_plans_for
+
+
+def test_repository_queries_use_indexes(seeded_user_ids):
+    """Nenhuma consulta do repositório varre a tabela inteira ou ordena sem índice"""
+    reports = check_query_plans_for(seeded_user_ids[0])
+    
+    assert len(reports) > 100
+    assert [(report.name, report.problems) for report in reports if not report.ok] == []
\ No newline at end of file
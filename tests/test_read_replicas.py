@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from main import PRIMARY_READS_UNTIL
+from infrastructure.database import db_connection
+from tests.helpers import sign_in, count_statements
+
+
+def make_replicated_app(make_app, tmp_path):
+    """Aplicação com uma réplica de leitura SQLite e atraso tolerado de um minuto"""
+    return make_app(DATABASE_READ_URLS='sqlite:///' + str(tmp_path / 'replica.db'), DATABASE_REPLICA_LAG_SECONDS=60)
+
+
+def sync_replicas(app) -> None:
+    with app.app_context():
+        assert db_connection.sync_read_replicas() == 1
+
+
+def expire_replica_lag(client) -> None:
+    """Faz de conta que o atraso tolerado desde a última escrita do usuário já passou"""
+    with client.session_transaction() as session:
+        session.pop(PRIMARY_READS_UNTIL, None)
+
+
+def test_reads_go_to_the_replica_except_right_after_a_write(make_app, tmp_path):
+    """GETs leem a réplica; POSTs e os GETs dentro de DATABASE_REPLICA_LAG_SECONDS usam o primário"""
+    app = make_replicated_app(make_app, tmp_path)
+    client = app.test_client()
+    sign_in(client)
+    sync_replicas(app)
+    expire_replica_lag(client)
+    
+    with count_statements(app) as primary, count_statements(app, 'read_0') as replica:
+        assert client.get('/tasks/api/tasks?filter=all').status_code == 200
+    assert primary == []
+    assert any(statement.startswith('SELECT') for statement in replica)
+    
+    with count_statements(app) as primary, count_statements(app, 'read_0') as replica:
+        client.post('/tasks/new', data={'title': 'Recém-criada', 'priority': 'media'})
+    assert any(statement.startswith('INSERT INTO tasks') for statement in primary)
+    assert replica == []
+    
+    # A réplica ainda não recebeu a tarefa, mas o usuário a vê: lê o primário até o atraso passar
+    with count_statements(app) as primary, count_statements(app, 'read_0') as replica:
+        titles = [task['title'] for task in client.get('/tasks/api/tasks?filter=all').get_json()['tasks']]
+    assert titles == ['Recém-criada']
+    assert any(statement.startswith('SELECT') for statement in primary)
+    assert replica == []
+    
+    expire_replica_lag(client)
+    with count_statements(app, 'read_0') as replica:
+        assert client.get('/tasks/api/tasks?filter=all').get_json()['tasks'] == []
+    assert replica
+
+
+def test_replica_rejects_writes(make_app, tmp_path):
+    """Uma escrita que chegue à réplica falha (query_only) em vez de divergir do primário"""
+    app = make_replicated_app(make_app, tmp_path)
+    sign_in(app.test_client())
+    sync_replicas(app)
+    
+    with app.app_context():
+        with pytest.raises(OperationalError, match='readonly'):
+            with db_connection.engine_for('read_0').begin() as connection:
+                connection.execute(text("UPDATE users SET email = 'outro@example.com'"))
+        
+        with db_connection.engine_for('read_0').connect() as connection:
+            assert connection.execute(text('SELECT email FROM users')).scalars().all() == ['ana@example.com']
\ No newline at end of file
@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from urllib.parse import quote
+import pytest
+from infrastructure.repositories import TaskRepositoryImpl
+from tests.helpers import sign_in, create_task
+
+
+@pytest.mark.parametrize('expression, archived_listed', [
+    ('completed', True),
+    ('completed|high_priority', True),
+    ('!pending', True),
+    ('!(pending|in_progress)', True),
+    ('pending', False),
+    ('!completed', False),
+])
+def test_filters_that_admit_completed_tasks_read_the_archive(app, client, expression, archived_listed):
+    """Grupos 'or' e 'not' que admitem tarefas concluídas também listam as arquivadas"""
+    sign_in(client)
+    archived_id = create_task(client, 'Arquivada')
+    client.post(f'/tasks/{archived_id}/complete')
+    pending_id = create_task(client, 'Pendente')
+    
+    with app.app_context():
+        assert sum(TaskRepositoryImpl().archive_completed(datetime.now() + timedelta(minutes=1)).values()) == 1
+    
+    listed = {task['id'] for task in client.get(f'/tasks/api/tasks?filter={quote(expression)}').get_json()['tasks']}
+    assert (archived_id in listed) == archived_listed
+    assert (pending_id in listed) == (expression in ('pending', '!completed'))
\ No newline at end of file
@@ -0,0 +1,90 @@
+import pytest
+from application.commands import ICommand, CommandInvoker
+from domain.entities import Task, Priority, TaskStatus
+from infrastructure.repositories import TaskRepositoryImpl
+from tests.helpers import sign_in, create_task, count_statements
+
+
+def test_complete_is_one_conditional_update(app, client):
+    """Concluir devolve o status anterior com um único UPDATE em tasks"""
+    user_id = sign_in(client)
+    with app.app_context():
+        repository = TaskRepositoryImpl()
+        task = repository.save(Task('A', None, Priority.MEDIUM, None, user_id))
+        repository.update_status_if(task.id, user_id, TaskStatus.PENDING, TaskStatus.IN_PROGRESS)
+        
+        with count_statements(app) as statements:
+            assert repository.complete_if_owned(task.id, user_id) == TaskStatus.IN_PROGRESS
+        task_writes = [statement for statement in statements if 'UPDATE tasks' in statement]
+        assert len(task_writes) == 1 and 'RETURNING' in task_writes[0]
+        
+        assert repository.complete_if_owned(task.id, user_id) is None
+        assert repository.find_by_id(task.id).status == TaskStatus.COMPLETED
+        assert repository.rebuild_stats() == []
+
+
+def test_complete_ignores_other_users_tasks(app, client):
+    user_id = sign_in(client)
+    with app.app_context():
+        repository = TaskRepositoryImpl()
+        task = repository.save(Task('A', None, Priority.MEDIUM, None, user_id))
+        assert repository.complete_if_owned(task.id, user_id + 1) is None
+        assert repository.find_by_id(task.id).status == TaskStatus.PENDING
+
+
+def test_undo_complete_restores_previous_status(app, client):
+    sign_in(client)
+    task_id = create_task(client, 'A')
+    
+    assert client.post(f'/tasks/{task_id}/complete').status_code == 200
+    assert client.post(f'/tasks/{task_id}/complete').get_json()['error'] == 'Tarefa já está concluída'
+    client.post('/tasks/undo')
+    
+    with app.app_context():
+        assert TaskRepositoryImpl().find_by_id(task_id).status == TaskStatus.PENDING
+
+
+class FlakyCommand(ICommand):
+    """Comando cujo undo/redo devolve os resultados programados, em ordem; exceções são lançadas"""
+    
+    def __init__(self, *results):
+        self.results = list(results)
+    
+    def execute(self):
+        return True
+    
+    def undo(self):
+        return self._next()
+    
+    def redo(self):
+        return self._next()
+    
+    def to_record(self):
+        return {}
+    
+    @classmethod
+    def from_record(cls, task_repository, record):
+        return cls()
+    
+    def _next(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_failed_undo_and_redo_keep_the_command_in_place():
+    invoker = CommandInvoker()
+    invoker.execute_command(FlakyCommand(False, RuntimeError('falha'), True, False, True), user_id=1)
+    
+    assert not invoker.undo(1)
+    with pytest.raises(RuntimeError):
+        invoker.undo(1)
+    assert invoker.can_undo(1) and not invoker.can_redo(1)
+    
+    assert invoker.undo(1)
+    assert not invoker.redo(1)
+    assert invoker.can_redo(1) and not invoker.can_undo(1)
+    
+    assert invoker.redo(1)
+    assert invoker.can_undo(1) and not invoker.can_redo(1)
\ No newline at end of file
@@ -0,0 +1,54 @@
+import tracemalloc
+import pytest
+from infrastructure.database import db_connection, TaskModel, PriorityEnum, TaskStatusEnum
+from tests.helpers import sign_in
+
+
+# Descrições de 1 KB: o arquivo exportado cresce bem mais rápido que qualquer buffer do fluxo
+DESCRIPTION = 'x' * 1024
+
+
+def insert_tasks(app, user_id: int, count: int) -> None:
+    """Insere tarefas direto na tabela, sem passar pelos casos de uso"""
+    with app.app_context():
+        session = db_connection.db.session
+        session.execute(TaskModel.__table__.insert(), [
+            {'title': f'Tarefa {number}', 'description': DESCRIPTION, 'priority': PriorityEnum.MEDIUM,
+             'status': TaskStatusEnum.PENDING, 'user_id': user_id}
+            for number in range(count)
+        ])
+        session.commit()
+
+
+def export(client, export_format: str) -> tuple:
+    """Consome a exportação em fluxo; retorna (linhas, bytes, pico de memória alocada)"""
+    lines = size = 0
+    tracemalloc.start()
+    try:
+        response = client.get(f'/tasks/export?format={export_format}', buffered=False)
+        for data in response.response:
+            lines += data.count(b'\n')
+            size += len(data)
+        response.close()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return lines, size, peak
+
+
+@pytest.mark.parametrize('export_format, header_lines', [('csv', 1), ('ndjson', 0)])
+def test_export_memory_stays_bounded_as_rows_grow(app, client, export_format, header_lines):
+    """Quadruplicar as tarefas quadruplica o arquivo, mas não o pico de memória"""
+    user_id = sign_in(client)
+    client.get('/tasks/dashboard')
+    
+    insert_tasks(app, user_id, 4000)
+    small_lines, small_size, small_peak = export(client, export_format)
+    insert_tasks(app, user_id, 12000)
+    large_lines, large_size, large_peak = export(client, export_format)
+    
+    assert small_lines == 4000 + header_lines
+    assert large_lines == 16000 + header_lines
+    assert large_size > 16000 * len(DESCRIPTION)
+    assert large_peak < large_size / 4
+    assert large_peak < small_peak * 1.5
\ No newline at end of file
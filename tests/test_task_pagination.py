@@ -0,0 +1,63 @@
+import pytest
+from types import SimpleNamespace
+from application.strategies import AlphabeticalSortStrategy
+from infrastructure.database import db_connection
+from tests.helpers import sign_in, create_task
+
+
+# Horários gravados como o default do banco, sem microssegundos: vários empates por segundo
+CREATED_AT = ['2026-03-01 10:00:00'] * 3 + ['2026-03-01 09:00:00'] * 3 + ['2026-03-01 08:00:00']
+
+
+def seed_equal_timestamps(app, client) -> list:
+    """Cria as tarefas e grava os horários de criação empatados; retorna os IDs na ordem esperada"""
+    task_ids = [create_task(client, f'Tarefa {number}') for number in range(len(CREATED_AT))]
+    with app.app_context():
+        session = db_connection.db.session
+        for task_id, created_at in zip(task_ids, CREATED_AT):
+            session.execute(db_connection.db.text('UPDATE tasks SET created_at = :created_at WHERE id = :id'),
+                            {'created_at': created_at, 'id': task_id})
+        session.commit()
+    
+    # Mais recentes primeiro; nos empates, pelo ID crescente
+    rows = sorted(zip(CREATED_AT, task_ids), key=lambda row: row[1])
+    return [task_id for _, task_id in sorted(rows, key=lambda row: row[0], reverse=True)]
+
+
+@pytest.mark.parametrize('filter_type', ['all', 'pending'])
+def test_creation_date_pages_cover_every_task_once(app, client, filter_type):
+    sign_in(client)
+    expected = seed_equal_timestamps(app, client)
+    
+    seen, cursor = [], ''
+    for _ in range(len(expected) + 1):
+        page = client.get(f'/tasks/api/tasks?filter={filter_type}&sort=creation_date&limit=2&cursor={cursor}').get_json()
+        seen += [task['id'] for task in page['tasks']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    
+    assert cursor is None
+    assert seen == expected
+
+
+def test_title_pages_follow_the_in_memory_order_for_accented_titles(client):
+    """O lower(title) do banco ordena acentos e maiúsculas como o str.lower da ordenação em memória"""
+    sign_in(client)
+    titles = ['banana', 'Éxito', 'água', 'Zebra', 'Água', 'abacate', 'élan', 'Ônibus']
+    task_ids = [create_task(client, title) for title in titles]
+    
+    sort_key = AlphabeticalSortStrategy().sort_key
+    expected = [task_id for _, task_id in sorted(
+        zip(titles, task_ids), key=lambda row: (sort_key(SimpleNamespace(title=row[0])), row[1])
+    )]
+    
+    seen, cursor = [], ''
+    for _ in range(len(expected) + 1):
+        page = client.get(f'/tasks/api/tasks?filter=all&sort=alphabetical&limit=3&cursor={cursor}').get_json()
+        seen += [task['id'] for task in page['tasks']]
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+    
+    assert seen == expected
\ No newline at end of file
@@ -0,0 +1,57 @@
+import sqlite3
+from tests.helpers import sign_in, count_statements
+
+
+def make_sharded_app(make_app, tmp_path, shards: int = 2):
+    """Aplicação com as tarefas particionadas entre shards SQLite no diretório temporário"""
+    urls = ','.join('sqlite:///' + str(tmp_path / f'shard_{number}.db') for number in range(shards))
+    return make_app(DATABASE_SHARD_URLS=urls)
+
+
+def count_rows(path, table: str, user_id: int) -> int:
+    with sqlite3.connect(path) as connection:
+        return connection.execute(f'SELECT count(*) FROM {table} WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+
+def stored_shard(path, user_id: int):
+    with sqlite3.connect(path) as connection:
+        return connection.execute('SELECT shard FROM users WHERE id = ?', (user_id,)).fetchone()[0]
+
+
+def test_reads_never_write_the_shard_directory(make_app, tmp_path):
+    """Os GETs de quem ainda não tem shard só leem o primário; a primeira escrita grava o diretório"""
+    app = make_sharded_app(make_app, tmp_path)
+    client = app.test_client()
+    user_id = sign_in(client)
+    
+    with count_statements(app) as statements:
+        assert client.get('/tasks/dashboard').status_code == 200
+        assert client.get('/tasks/api/tasks?filter=all').status_code == 200
+        assert client.get('/tasks/api/stats').status_code == 200
+    assert [statement for statement in statements if statement.split()[0] not in ('SELECT', 'COMMIT')] == []
+    assert stored_shard(tmp_path / 'tasks.db', user_id) is None
+    
+    client.post('/tasks/new', data={'title': 'A', 'priority': 'media'})
+    shard = stored_shard(tmp_path / 'tasks.db', user_id)
+    assert shard in ('shard_0', 'shard_1')
+
+
+def test_task_writes_and_journal_stay_on_the_users_shard(make_app, tmp_path):
+    """A tarefa, os contadores e o journal ficam no shard; desfazer lê o journal de lá"""
+    app = make_sharded_app(make_app, tmp_path)
+    client = app.test_client()
+    user_id = sign_in(client)
+    client.post('/tasks/new', data={'title': 'A', 'priority': 'media'})
+    
+    shard_path = tmp_path / (stored_shard(tmp_path / 'tasks.db', user_id) + '.db')
+    with count_statements(app) as statements:
+        client.post('/tasks/new', data={'title': 'B', 'priority': 'media'})
+    assert [statement for statement in statements if statement.split()[0] not in ('SELECT', 'COMMIT')] == []
+    
+    for table in ('tasks', 'command_journal'):
+        assert count_rows(shard_path, table, user_id) == 2
+        assert count_rows(tmp_path / 'tasks.db', table, user_id) == 0
+    
+    client.post('/tasks/undo')
+    assert count_rows(shard_path, 'tasks', user_id) == 2
+    assert client.get('/tasks/api/stats').get_json()['total_tasks'] == 1
\ No newline at end of file
@@ -0,0 +1,49 @@
+from infrastructure.database import db_connection
+from tests.helpers import sign_in, create_task, count_statements
+
+
+def drop_stats_row(app, user_id: int) -> None:
+    """Simula um usuário anterior aos contadores incrementais"""
+    with app.app_context():
+        db_connection.db.session.execute(
+            db_connection.db.text('DELETE FROM user_task_stats WHERE user_id = :id'), {'id': user_id}
+        )
+        db_connection.db.session.commit()
+
+
+def stats_rows(app, user_id: int) -> int:
+    with app.app_context():
+        return db_connection.db.session.execute(
+            db_connection.db.text('SELECT count(*) FROM user_task_stats WHERE user_id = :id'), {'id': user_id}
+        ).scalar()
+
+
+def test_stats_without_counter_row_are_read_only(make_app):
+    """Sem a linha de contadores, a API agrega as tarefas sem gravar nada no GET"""
+    app = make_app(TASK_CACHE_ENABLED='false')
+    client = app.test_client()
+    user_id = sign_in(client)
+    for title in ('A', 'B', 'C'):
+        create_task(client, title, priority='alta')
+    client.get('/tasks/dashboard')
+    drop_stats_row(app, user_id)
+    
+    with count_statements(app) as statements:
+        stats = client.get('/tasks/api/stats').get_json()
+    
+    assert stats['total_tasks'] == 3
+    assert stats['pending_tasks'] == 3
+    assert not [statement for statement in statements if statement.startswith(('INSERT', 'UPDATE', 'DELETE'))]
+    assert stats_rows(app, user_id) == 0
+
+
+def test_rebuild_command_creates_missing_counter_rows(app, client):
+    user_id = sign_in(client)
+    create_task(client, 'A')
+    drop_stats_row(app, user_id)
+    
+    result = app.test_cli_runner().invoke(args=['rebuild-task-stats'])
+    
+    assert result.exit_code == 0
+    assert stats_rows(app, user_id) == 1
+    assert client.get('/tasks/api/stats').get_json()['total_tasks'] == 1